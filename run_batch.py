@@ -0,0 +1,45 @@
+import argparse
+import json
+import sys
+import os
+import logging
+
+# IMPORTANT: modifying sys.path needs to be done before importing any custom module
+sys.path.append(f"{os.getcwd()}/src")
+sys.path.append(f"{os.getcwd()}/src/elements")
+
+from batch_runner import BatchRunner
+from functions_handler import auto_register_functions
+from limits import EngineLimits
+
+# Runs the rules (and the goal) of a configuration file against many fact files, for example:
+# python run_batch.py ./config/family.ini customers/*.jsonl --processes 8
+# -> one JSON line per fact file is printed as soon as it is processed
+parser = argparse.ArgumentParser(description="Runs the rules of a configuration file against many fact files")
+parser.add_argument("config_file", help="the configuration file with the rules and the goal (its facts are ignored)")
+parser.add_argument("fact_files", nargs="+", help="the .ini, .jsonl or .csv fact files (one fact set per file)")
+parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: nb of cpus)")
+parser.add_argument("--max-pending", type=int, default=None, help="max number of fact sets sent to the workers")
+parser.add_argument("--rete", action="store_true", help="use the Rete matcher")
+parser.add_argument("--max-firings", type=int, default=None, help="max number of firings per fact set")
+parser.add_argument("--max-seconds", type=float, default=None, help="max wall-clock time per fact set")
+parser.add_argument("--max-combinations", type=int, default=None,
+                    help="max number of combinations of facts generated by the joins per fact set")
+parser.add_argument("--max-state-visits", type=int, default=None,
+                    help="max number of times a fact set can reach the same state (loop detection)")
+args = parser.parse_args()
+
+# Important: the folder mentioned here must NOT be marked as a source directory in Intellij
+auto_register_functions('functions_root')
+
+logging.basicConfig(filename='logs.log',
+                    filemode="w",
+                    level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+# without any limit, the engines don't check anything (a LimitsChecker would slow down the joins for nothing)
+limits_values = (args.max_firings, args.max_seconds, args.max_combinations, args.max_state_visits)
+limits = EngineLimits(*limits_values) if any(value is not None for value in limits_values) else None
+runner = BatchRunner.from_config(args.config_file, processes=args.processes, max_pending=args.max_pending,
+                                 use_rete=args.rete, functions_package='functions_root', limits=limits)
+for result in runner.run((fact_file, fact_file) for fact_file in args.fact_files):
+    print(json.dumps(result.to_dict()), flush=True)
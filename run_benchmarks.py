@@ -0,0 +1,63 @@
+import argparse
+import json
+import sys
+import os
+import logging
+
+# IMPORTANT: modifying sys.path needs to be done before importing any custom module
+sys.path.append(f"{os.getcwd()}/src")
+sys.path.append(f"{os.getcwd()}/src/elements")
+
+from benchmark import WORKLOADS, run_workload, compare_results, format_report
+
+# Runs the generated workloads at several sizes and compares them with a baseline, for example:
+# python run_benchmarks.py                               -> all the workloads, compared with ./benchmarks/baseline.json
+# python run_benchmarks.py --workloads chain --sizes 50,100,200
+# python run_benchmarks.py --workloads fanout --processes 4 -> the parallel evaluation
+# python run_benchmarks.py --save-baseline              -> the results become the new baseline
+# -> the exit code is 1 when there is a regression
+parser = argparse.ArgumentParser(description="Runs the benchmark workloads")
+parser.add_argument("--workloads", default=",".join(WORKLOADS), help=f"comma separated list of {list(WORKLOADS)}")
+parser.add_argument("--sizes", default=None, help="comma separated sizes (default: the sizes of each workload)")
+parser.add_argument("--rete", action="store_true", help="use the Rete matcher")
+parser.add_argument("--processes", type=int, default=1, help="number of processes of the parallel evaluation")
+parser.add_argument("--repeat", type=int, default=3, help="number of runs of each workload (the fastest one is kept)")
+parser.add_argument("--baseline", default="./benchmarks/baseline.json", help="the baseline JSON file")
+parser.add_argument("--save-baseline", action="store_true", help="writes the results to the baseline file")
+parser.add_argument("--time-tolerance", type=float, default=0.5, help="allowed time increase (0.5 = 50%%)")
+parser.add_argument("--memory-tolerance", type=float, default=0.2, help="allowed peak memory increase (0.2 = 20%%)")
+args = parser.parse_args()
+
+# the debug logs would be measured too
+logging.basicConfig(level=logging.WARNING)
+baseline_key = "rete" if args.rete else "default"
+if args.processes > 1:
+    # the parallel evaluation has its own baseline (it depends on the number of cpus of the machine)
+    baseline_key += f"-p{args.processes}"
+baseline: dict = {}
+if os.path.exists(args.baseline):
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+
+results = []
+for name in args.workloads.split(","):
+    if name not in WORKLOADS:
+        parser.error(f"unknown workload '{name}'")
+    generator, sizes = WORKLOADS[name]
+    for size in map(int, args.sizes.split(",")) if args.sizes else sizes:
+        result = run_workload(generator(size), args.rete, args.repeat, args.processes)
+        print(f"{result.key}: {result.seconds:.3f}s", file=sys.stderr, flush=True)
+        results.append(result)
+
+print(format_report(results, baseline.get(baseline_key)))
+if args.save_baseline:
+    baseline.setdefault(baseline_key, {}).update((result.key, result.to_dict()) for result in results)
+    os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+    with open(args.baseline, "w") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+    print(f"\nBaseline saved to {args.baseline}")
+else:
+    regressions = compare_results(results, baseline.get(baseline_key, {}), args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(regressions))
+        sys.exit(1)
@@ -1,3 +1,4 @@
+import argparse
 import sys
 import os
 import logging
@@ -10,6 +11,17 @@ from context import Context
 from engine import RuleEngine
 from functions_handler import auto_register_functions
 
+# Runs a configuration file, then prints the results of the pattern queries (if any), for example:
+# python run_engine.py ./config/family.ini --query "grand_parent('george',X)" --query "parent(X,Y) and not man(X)"
+# python run_engine.py ./config/family.ini --cache-dir ~/.cache/yare
+parser = argparse.ArgumentParser(description="Runs the rules of a configuration file")
+parser.add_argument("config_file", nargs="?", default="./config/family.ini", help="the configuration file")
+parser.add_argument("--query", action="append", default=[], help="a pattern query to run on the final knowledge base")
+parser.add_argument("--cache-dir", help="caches the compiled rules in this directory (for example ~/.cache/yare): "
+                                        "the next runs with the same rules don't parse them again")
+parser.add_argument("--stats", choices=["text", "json"], help="prints the counters and timings of each rule")
+args = parser.parse_args()
+
 # Important: the folder mentioned here must NOT be marked as a source directory in Intellij
 auto_register_functions('functions_root')
 
@@ -23,8 +35,17 @@ log = f"Beginning of processing"
 logging.info(log)
 print(log)
 context = Context()
-context.load_from_file("./config/family.ini")
-engine = RuleEngine(context)
+# the cache files are unpickled, so there is no default cache directory (the current directory can belong to anybody)
+context.load_from_file(args.config_file, cache_dir=os.path.expanduser(args.cache_dir) if args.cache_dir else None)
+engine = RuleEngine(context, collect_stats=args.stats is not None)
 log = f"\nEnd of processing: result for goal={context.goal} is {engine.run()}"
 logging.info(log)
 print(log)
+for query in args.query:
+    print(f"\nResults for query={query}:")
+    # the results are printed as they are found
+    for variables_values in context.query(query):
+        print(", ".join(f"{variable}={value}" for variable, value in variables_values.items()) or "True")
+if args.stats:
+    print("\nStats (the most expensive rules first):")
+    print(engine.stats().to_text() if args.stats == "text" else engine.stats().to_json())
@@ -10,6 +10,23 @@ sys.path.append(f"{os.getcwd()}/test")
 from test_engine import TestEngine
 from test_parser import TestParser
 from test_evaluator import TestEvaluator
+from test_rete import TestRete
+from test_context import TestContext
+from test_agenda import TestAgenda
+from test_fact_loader import TestFactLoader
+from test_async_engine import TestAsyncEngine
+from test_functions_handler import TestFunctionsHandler
+from test_parallel_evaluator import TestParallelEvaluator
+from test_batch_runner import TestBatchRunner
+from test_ruleset_cache import TestRulesetCache
+from test_snapshot import TestSnapshot
+from test_relevance import TestRelevance
+from test_backward import TestBackward
+from test_query import TestQuery
+from test_limits import TestLimits
+from test_truth_maintenance import TestTruthMaintenance
+from test_stats import TestStats
+from test_benchmark import TestBenchmark
 
 # From https://stackoverflow.com/questions/15971735/running-a-single-test-from-unittest-testcase-via-the-command-line
 
@@ -31,3 +48,20 @@ def runs_all_tests(cls):
 runs_all_tests(TestParser)
 runs_all_tests(TestEvaluator)
 runs_all_tests(TestEngine)
+runs_all_tests(TestRete)
+runs_all_tests(TestContext)
+runs_all_tests(TestAgenda)
+runs_all_tests(TestFactLoader)
+runs_all_tests(TestAsyncEngine)
+runs_all_tests(TestFunctionsHandler)
+runs_all_tests(TestParallelEvaluator)
+runs_all_tests(TestBatchRunner)
+runs_all_tests(TestRulesetCache)
+runs_all_tests(TestSnapshot)
+runs_all_tests(TestRelevance)
+runs_all_tests(TestBackward)
+runs_all_tests(TestQuery)
+runs_all_tests(TestLimits)
+runs_all_tests(TestTruthMaintenance)
+runs_all_tests(TestStats)
+runs_all_tests(TestBenchmark)
@@ -0,0 +1,91 @@
+from enum import Enum
+import heapq
+import logging
+
+from context import Context
+from elements.fact import Fact
+from elements.rule import BoundRule, SatisfiedRule
+
+
+class AgendaStrategy(Enum):
+    # the highest salience first, then the rules in the order they're defined, then the oldest activation first
+    SALIENCE = "salience"
+    # depth-first: the newest activation first (LIFO)
+    DEPTH = "depth"
+    # breadth-first: the oldest activation first (FIFO)
+    BREADTH = "breadth"
+    # the activation matching the most recently added facts first, then the rules in the order they're defined
+    RECENCY = "recency"
+
+
+class Agenda:
+    """
+    The satisfied rules (aka activations) that are waiting to be fired, ordered by a conflict resolution strategy.
+
+    Activations are added as soon as they're found (by the Evaluator or pushed by the Rete network) and are
+    fired one at a time: the cost of a run is proportional to the number of firings, and not to the number of
+    firings times the number of rule templates.
+
+    An activation stays on the agenda until it is fired, even if one of its facts is removed in the meantime
+    (in the maze example, all the connections from a position are explored, even though moving through
+    the first one removes that position).
+    """
+
+    def __init__(self, context: Context, strategy: AgendaStrategy = AgendaStrategy.SALIENCE):
+        self.strategy = strategy
+        self._rule_template_indexes = {rule_template: index for index, rule_template in enumerate(context.rule_templates)}
+        # (priority, sequence number, activation): the sequence number makes the order reproducible
+        self._heap: list[tuple[tuple, int, SatisfiedRule]] = []
+        self._pending: set[BoundRule] = set()
+        self._sequence_number = 0
+        # fact -> when it was added (used by the RECENCY strategy): the facts that are already in the context
+        # are all equally old
+        self._fact_timestamps: dict[Fact, int] = dict.fromkeys(context.facts, 0)
+        self._clock = 0
+        # The agenda is notified first so that the facts are timestamped before any other listener reacts to them
+        context.fact_listeners.insert(0, self)
+
+    def add(self, satisfied_rule: SatisfiedRule):
+        if satisfied_rule in self._pending:
+            logging.debug(f"Skipping satisfied rule='{satisfied_rule}' (already on the agenda)")
+            return
+        self._sequence_number += 1
+        self._pending.add(satisfied_rule)
+        heapq.heappush(self._heap, (self._get_priority(satisfied_rule), self._sequence_number, satisfied_rule))
+
+    @property
+    def nb_added_activations(self) -> int:
+        # the number of activations added since the agenda was created (including the ones that were fired)
+        return self._sequence_number
+
+    def pop(self) -> SatisfiedRule:
+        _, _, satisfied_rule = heapq.heappop(self._heap)
+        self._pending.remove(satisfied_rule)
+        return satisfied_rule
+
+    def _get_priority(self, satisfied_rule: SatisfiedRule) -> tuple:
+        rule_template = satisfied_rule.rule_template
+        if self.strategy == AgendaStrategy.SALIENCE:
+            return -rule_template.salience, self._rule_template_indexes.get(rule_template, 0)
+        if self.strategy == AgendaStrategy.DEPTH:
+            return (-self._sequence_number,)
+        if self.strategy == AgendaStrategy.BREADTH:
+            return ()
+        # RECENCY: the timestamps are compared from the most recent one (a rule without facts comes last)
+        timestamps = tuple(sorted(-self._fact_timestamps[fact] for fact in satisfied_rule.facts)) or (0,)
+        return timestamps, self._rule_template_indexes.get(rule_template, 0)
+
+    def facts_added(self, facts: list[Fact]):
+        for fact in facts:
+            self._clock += 1
+            self._fact_timestamps[fact] = self._clock
+
+    def facts_removed(self, facts: list[Fact]):
+        for fact in facts:
+            del self._fact_timestamps[fact]
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
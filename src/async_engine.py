@@ -0,0 +1,107 @@
+from typing import AsyncIterator, Coroutine, Optional
+import asyncio
+import inspect
+import logging
+
+from agenda import AgendaStrategy
+from context import Context
+from elements.action import Action
+from elements.rule import RuleTemplate
+from engine import RuleEngine, Firing
+from functions_handler import evaluate_function, get_function_executor, FunctionExecutor
+from limits import EngineLimits
+
+
+class AsyncRuleEngine(RuleEngine):
+    """
+    asyncio version of the engine, where the functions registered with @register_function() can be coroutine
+    functions ("async def"):
+    - the facts are still added/removed synchronously, in the same order as RuleEngine
+    - the coroutine functions are scheduled as tasks and run concurrently with the matching, with at most
+      max_in_flight tasks at the same time (the engine waits for a task to finish when the limit is reached)
+    - the engine only waits for all the tasks at a barrier: wait_for_callbacks_async(), which is called at the end of run()
+      -> an exception raised by a function is raised by the next barrier
+    - regular functions are still called synchronously
+    """
+
+    def __init__(self, context: Context, use_rete: bool = False,
+                 strategy: AgendaStrategy = AgendaStrategy.SALIENCE, max_in_flight: int = 10, processes: int = 1,
+                 goal_directed: bool = False, limits: Optional[EngineLimits] = None,
+                 truth_maintenance: bool = False, collect_stats: bool = False):
+        super().__init__(context, use_rete, strategy, processes, goal_directed, limits, truth_maintenance,
+                         collect_stats)
+        self.max_in_flight = max_in_flight
+        # The coroutines of the last firing, scheduled by step_async()
+        self._coroutines: list[Coroutine] = []
+        self._tasks: set[asyncio.Task] = set()
+        self._errors: list[BaseException] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None  # created in the running event loop
+
+    async def run_async(self) -> bool:
+        logging.debug(">>")
+        nb_firings = 0
+        async for _ in self.run_until_quiescent_async():
+            nb_firings += 1
+        found_goal = self.context.goal in self.context.facts
+        logging.debug(f"<< found_goal={found_goal} nb_firings={nb_firings}")
+        return found_goal
+
+    def run(self) -> bool:
+        return asyncio.run(self.run_async())
+
+    async def step_async(self) -> Optional[Firing]:
+        firing = self.step()
+        coroutines, self._coroutines = self._coroutines, []
+        for coroutine in coroutines:
+            await self._schedule(coroutine)
+        if self._tasks:
+            # acquiring the semaphore doesn't suspend the step when it's not contended: the scheduled functions only
+            # start (and run concurrently with the matching) when the control is given back to the event loop
+            await asyncio.sleep(0)
+        return firing
+
+    async def run_until_quiescent_async(self) -> AsyncIterator[Firing]:
+        """
+        Same as run_until_quiescent(), and then waits for all the scheduled functions (barrier)
+        """
+        while not self._is_goal_reached() and (firing := await self.step_async()) is not None:
+            yield firing
+        await self.wait_for_callbacks_async()
+
+    async def wait_for_callbacks_async(self):
+        """
+        Waits for all the scheduled functions (and the ones dispatched to a pool), and raises the first exception
+        raised by one of them (if any)
+        """
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._semaphore = None  # the next run may use another event loop
+        if self._errors:
+            error, self._errors = self._errors[0], []
+            raise error
+        await asyncio.get_running_loop().run_in_executor(None, self.wait_for_callbacks)
+
+    def _call_function(self, action: Action, rule_template: RuleTemplate):
+        if get_function_executor(action.predicate.name) != FunctionExecutor.INLINE:
+            super()._call_function(action, rule_template)
+            return
+        result = evaluate_function(action.predicate.name, rule_template.name, *action.predicate.values)
+        if inspect.iscoroutine(result):
+            self._coroutines.append(result)
+
+    async def _schedule(self, coroutine: Coroutine):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._run_callback(coroutine))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_callback(self, coroutine: Coroutine):
+        try:
+            await coroutine
+        except Exception as error:
+            logging.error(f"function raised an exception: {error!r}")
+            self._errors.append(error)
+        finally:
+            self._semaphore.release()
@@ -0,0 +1,212 @@
+from typing import Iterator, Optional
+import logging
+
+from context import Context
+from elements.action import ActionType
+from elements.condition import Condition, ConditionType
+from elements.fact import Fact
+from elements.predicate import Predicate
+from elements.rule import RuleTemplate
+from elements.symbol import symbol_table
+
+# A call is a predicate where the variables are numbered in order of appearance, like parent(0,'larry',0)
+# -> its key is (name, values), where each value is either a symbol id (constant) or a variable number (negative)
+CallKey = tuple[str, tuple[int, ...]]
+
+
+class BackwardChainer:
+    """
+    Backward chaining solver: answers queries like grand_mother('sophia',X) by only proving the sub goals that the
+    query needs, instead of computing all the facts that can be derived from the knowledge base.
+
+    - the rules are used "backwards": to prove op3(X), the solver proves the LHS of the rules whose RHS contain
+      an "add:op3(...)" action (the facts of the knowledge base are answers too)
+    - each sub goal (aka call) has a table of answers (tabling): a sub goal that was already proved is answered
+      from its table, and a recursive rule (like "ancestor(A,B) and parent(B,C) => add:ancestor(A,C)") terminates:
+      the calls that depend on each other are evaluated again until their tables don't change anymore
+    - the answers are not added to the knowledge base, the functions are not called, and the tables are only valid
+      for the current knowledge base (see clear())
+
+    Only the rules whose actions are "add:" (and "function:") actions can be used, and 'not' can't be used on a
+    predicate that depends on itself (like "not ancestor(A,B) => add:ancestor(A,B)").
+    The LHS must be a conjunction of predicates, negated predicates and tests (like the Rete matcher).
+    """
+
+    def __init__(self, context: Context):
+        self.context = context
+        # (name, number of values) -> (rule template, conditions, RHS "add:" predicate)
+        self._rules: dict[tuple[str, int], list[tuple[RuleTemplate, list[Condition], Predicate]]] = {}
+        for rule_template in context.rule_templates:
+            conditions = None
+            for action in rule_template.right_expression.actions:
+                if action.action_type == ActionType.ADD:
+                    conditions = conditions or Condition.parse_conditions(rule_template.left_expression.expression)
+                    key = (action.predicate.name, len(action.predicate.symbol_ids))
+                    self._rules.setdefault(key, []).append((rule_template, conditions, action.predicate))
+        self._tables: dict[CallKey, dict[Fact, None]] = {}
+        self._complete: set[CallKey] = set()
+        # the calls being evaluated (a call that is found in the stack is a recursive call)
+        self._stack: list[CallKey] = []
+        # call -> the lowest stack index of the calls it depends on
+        self._lows: dict[CallKey, int] = {}
+        # the calls that depend on a call of the stack: they're complete when that call is complete
+        self._pending: list[CallKey] = []
+        self._nb_answers = 0
+
+    def query(self, query: Predicate) -> Iterator[Fact]:
+        """
+        Returns the facts matching the query that can be derived, for example:
+        query(Predicate.parse("grand_mother('sophia',X)")) -> [grand_mother('sophia','larry')]
+        """
+        logging.debug(f">> query='{query.to_string()}'")
+        table = self._solve(self._get_call_key(query))
+        logging.debug(f"<< nb answers={len(table)}")
+        return iter(list(table))
+
+    def is_derivable(self, fact: Fact) -> bool:
+        return any(True for _ in self.query(fact))
+
+    def clear(self):
+        """
+        Clears the tables (to be called when the knowledge base has changed)
+        """
+        self._tables = {}
+        self._complete = set()
+        self._pending = []
+
+    @staticmethod
+    def _get_call_key(predicate: Predicate, variables_values: Optional[dict[str, int]] = None) -> CallKey:
+        # the variables bound by variables_values are replaced by their value
+        variables_values = variables_values or {}
+        variable_numbers: dict[str, int] = {}
+        values = []
+        for value, symbol_id in zip(predicate.values, predicate.symbol_ids):
+            if symbol_table.is_constant(symbol_id):
+                values.append(symbol_id)
+            elif value in variables_values:
+                values.append(variables_values[value])
+            else:
+                values.append(-1 - variable_numbers.setdefault(value, len(variable_numbers)))
+        return predicate.name, tuple(values)
+
+    @staticmethod
+    def _matches_call(call_key: CallKey, fact: Fact) -> bool:
+        variables_values: dict[int, int] = {}
+        for value, symbol_id in zip(call_key[1], fact.symbol_ids):
+            if value >= 0:
+                if value != symbol_id:
+                    return False
+            elif variables_values.setdefault(value, symbol_id) != symbol_id:
+                return False
+        return True
+
+    def _solve(self, call_key: CallKey) -> dict[Fact, None]:
+        """
+        Returns the table of a call: complete, unless the call is part of a recursion that is still being evaluated
+        """
+        table = self._tables.setdefault(call_key, {})
+        if call_key in self._complete:
+            return table
+        if call_key in self._stack:
+            # recursive call: the current answers are returned, and the caller is evaluated again until the
+            # tables of the recursion don't change anymore
+            self._lows[self._stack[-1]] = min(self._lows[self._stack[-1]], self._stack.index(call_key))
+            return table
+        index = len(self._stack)
+        self._stack.append(call_key)
+        self._lows[call_key] = index
+        nb_pending = len(self._pending)
+        while True:
+            nb_answers = self._nb_answers
+            self._evaluate(call_key, table)
+            if self._lows[call_key] < index or self._nb_answers == nb_answers:
+                break
+            self._lows[call_key] = index
+        self._stack.pop()
+        low = self._lows.pop(call_key)
+        if low == index:
+            # the recursion led by this call is done: its tables (and the ones of the calls it used) are complete
+            self._complete.add(call_key)
+            self._complete.update(self._pending[nb_pending:])
+            del self._pending[nb_pending:]
+        else:
+            self._pending.append(call_key)
+            self._lows[self._stack[-1]] = min(self._lows[self._stack[-1]], low)
+        return table
+
+    def _evaluate(self, call_key: CallKey, table: dict[Fact, None]):
+        name, values = call_key
+        # the variables of the call match any value
+        call = Predicate.from_symbol_ids(name, tuple(value if value >= 0 else symbol_table.get_id("_") for value in values))
+        for fact in self.context.get_matching_facts(call):
+            if len(fact.symbol_ids) == len(values) and self._matches_call(call_key, fact):
+                self._add_answer(table, fact)
+        for rule_template, conditions, head in self._rules.get((name, len(values)), ()):
+            if any(action.action_type == ActionType.REMOVE for action in rule_template.right_expression.actions):
+                raise Exception(f"Rule='{rule_template.name}' removes facts: only the rules that add facts can be "
+                                f"used by backward chaining")
+            # the values of the call are bound to the variables of the head, like ancestor(A,B) for ancestor('a',X)
+            variables_values = self._unify(head, values)
+            if variables_values is None:
+                continue
+            for body_variables_values in self._prove(conditions, variables_values):
+                fact = Fact.from_symbol_ids(head.name, tuple(
+                    body_variables_values.get(value, symbol_id) for value, symbol_id in zip(head.values, head.symbol_ids)
+                ))
+                if all(symbol_table.is_constant(symbol_id) for symbol_id in fact.symbol_ids) and \
+                        self._matches_call(call_key, fact):
+                    self._add_answer(table, fact)
+
+    def _add_answer(self, table: dict[Fact, None], fact: Fact):
+        if fact not in table:
+            table[fact] = None
+            self._nb_answers += 1
+
+    @staticmethod
+    def _unify(predicate: Predicate, values: tuple[int, ...]) -> Optional[dict[str, int]]:
+        variables_values: dict[str, int] = {}
+        for value, symbol_id, call_value in zip(predicate.values, predicate.symbol_ids, values):
+            if call_value < 0:
+                continue  # a variable of the call matches any value
+            if symbol_table.is_constant(symbol_id):
+                if symbol_id != call_value:
+                    return None
+            elif variables_values.setdefault(value, call_value) != call_value:
+                return None
+        return variables_values
+
+    def _prove(self, conditions: list[Condition], variables_values: dict[str, int]) -> Iterator[dict[str, int]]:
+        """
+        Generates the values of the variables that make all the conditions True: the positive predicates are proved
+        in order, and the negations and tests as soon as their variables are bound
+        """
+        bound_variables = variables_values.keys()
+        ready = [condition for condition in conditions if condition.condition_type != ConditionType.POSITIVE
+                 and condition.variables <= bound_variables]
+        if not all(self._check(condition, variables_values) for condition in ready):
+            return
+        remaining = [condition for condition in conditions if condition not in ready]
+        positive = next((condition for condition in remaining if condition.condition_type == ConditionType.POSITIVE), None)
+        if positive is None:
+            # the remaining negations and tests use variables that are not bound by a positive predicate
+            if all(self._check(condition, variables_values) for condition in remaining):
+                yield variables_values
+            return
+        remaining.remove(positive)
+        predicate = positive.predicate
+        call_key = self._get_call_key(predicate, variables_values)
+        for fact in list(self._solve(call_key)):
+            fact_variables_values = dict(variables_values)
+            if all(fact_variables_values.setdefault(value, fact_id) == fact_id
+                   for value, symbol_id, fact_id in zip(predicate.values, predicate.symbol_ids, fact.symbol_ids)
+                   if not symbol_table.is_constant(symbol_id)):
+                yield from self._prove(remaining, fact_variables_values)
+
+    def _check(self, condition: Condition, variables_values: dict[str, int]) -> bool:
+        if condition.condition_type == ConditionType.TEST:
+            return condition.evaluate_test(variables_values)
+        call_key = self._get_call_key(condition.predicate, variables_values)
+        table = self._solve(call_key)
+        if call_key not in self._complete:
+            raise Exception(f"Unsupported recursion through 'not {condition.predicate.to_string()}'")
+        return not table
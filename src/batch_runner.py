@@ -0,0 +1,162 @@
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, Optional, Union
+import logging
+import multiprocessing
+import os
+
+from agenda import AgendaStrategy
+from context import Context
+from elements.fact import Fact
+from elements.rule import RuleTemplate
+from engine import RuleEngine
+from functions_handler import auto_register_functions
+from limits import EngineLimits
+
+# A fact set is given by a name (for example a customer id) and its facts: either a fact file (see
+# fact_loader.read_facts) or the facts themselves
+FactSource = Union[str, Iterable[Fact]]
+
+# The compiled rule templates of a worker process (compiled once per worker, and reset before each fact set)
+_worker_rule_templates: Optional[list[RuleTemplate]] = None
+
+
+class BatchResult:
+    """
+    The result of running the rules against one fact set:
+    - found_goal: whether the goal is in the knowledge base at the end of the run (None when there is no goal)
+    - derived_facts: the facts added by the rules that are still in the knowledge base at the end of the run
+    - error: the exception message when the run failed (the other fact sets are still processed)
+    """
+
+    def __init__(self, name: str, found_goal: Optional[bool] = None, derived_facts: Optional[list[Fact]] = None,
+                 error: Optional[str] = None):
+        self.name = name
+        self.found_goal = found_goal
+        self.derived_facts: list[Fact] = derived_facts or []
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "found_goal": self.found_goal,
+                "derived_facts": [fact.to_string() for fact in self.derived_facts], "error": self.error}
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return f"<{self.__class__.__name__} name='{self.name}' found_goal={self.found_goal} " \
+               f"nb_derived_facts={len(self.derived_facts)} error={self.error}>"
+
+
+class BatchRunner:
+    """
+    Runs the same rules against many independent fact sets (for example one per customer):
+    - the rules are compiled once per worker process (the workers forked by the runner reuse the rule templates
+      compiled by the runner) and reset before each fact set, instead of being parsed again for each fact set
+    - the fact sets are sent to a process pool, at most max_pending at a time, and the results are generated
+      as they finish (so not in the order of the fact sets): the memory stays bounded whatever the number of fact sets
+    With processes=1, the fact sets are run one after the other in the current process.
+    """
+
+    def __init__(self, rules: list[str], goal: Optional[Fact] = None, processes: Optional[int] = None,
+                 max_pending: Optional[int] = None, use_rete: bool = False,
+                 strategy: AgendaStrategy = AgendaStrategy.SALIENCE, functions_package: Optional[str] = None,
+                 limits: Optional[EngineLimits] = None):
+        self.rules = rules
+        self.goal = goal
+        self.processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.processes
+        self.use_rete = use_rete
+        self.strategy = strategy
+        # the package of the @register_function() functions, imported by the workers that are not forked
+        self.functions_package = functions_package
+        # the limits of each run: a fact set that exceeds them gets an error result, and the other ones still run
+        self.limits = limits
+        # the rules are compiled right away: the syntax errors are raised before any fact set is processed
+        self.rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in rules]
+
+    @classmethod
+    def from_config(cls, file_path: str, **kwargs):
+        """
+        Uses the rules and the goal of a configuration file (its facts are ignored)
+        """
+        config = Context.get_config(file_path)
+        return cls(config[Context.SECTION_RULES], Fact.parse(config[Context.SECTION_GOAL]), **kwargs)
+
+    def run(self, fact_sets: Iterable[tuple[str, FactSource]]) -> Iterator[BatchResult]:
+        logging.debug(f">> processes={self.processes} max_pending={self.max_pending}")
+        if self.processes < 2:
+            for name, fact_source in fact_sets:
+                yield run_fact_set(self.rule_templates, self.goal, name, fact_source, self.use_rete, self.strategy,
+                                   self.limits)
+            logging.debug("<<")
+            return
+
+        global _worker_rule_templates
+        is_fork = "fork" in multiprocessing.get_all_start_methods()
+        # the forked workers inherit the compiled rule templates, the other ones compile them again
+        _worker_rule_templates = self.rule_templates if is_fork else None
+        mp_context = multiprocessing.get_context("fork" if is_fork else "spawn")
+        try:
+            with ProcessPoolExecutor(self.processes, mp_context=mp_context, initializer=_init_worker,
+                                     initargs=(self.rules, self.functions_package)) as executor:
+                pending: set[Future] = set()
+                for name, fact_source in fact_sets:
+                    if len(pending) >= self.max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        yield from (future.result() for future in done)
+                    if not isinstance(fact_source, str):
+                        fact_source = list(fact_source)
+                    pending.add(executor.submit(_run_worker_fact_set, self.goal, name, fact_source,
+                                                self.use_rete, self.strategy, self.limits))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from (future.result() for future in done)
+        finally:
+            _worker_rule_templates = None
+        logging.debug("<<")
+
+
+def run_fact_set(rule_templates: list[RuleTemplate], goal: Optional[Fact], name: str, fact_source: FactSource,
+                 use_rete: bool = False, strategy: AgendaStrategy = AgendaStrategy.SALIENCE,
+                 limits: Optional[EngineLimits] = None) -> BatchResult:
+    """
+    Runs the rule templates against one fact set (the rule templates are reset first)
+    """
+    logging.debug(f">> name='{name}'")
+    try:
+        for rule_template in rule_templates:
+            rule_template.reset()
+        context = Context()
+        context.rule_templates = rule_templates
+        context.goal = goal
+        if isinstance(fact_source, str):
+            context.load_facts_from_file(fact_source)
+        else:
+            context.load_facts(fact_source)
+        engine = RuleEngine(context, use_rete, strategy, limits=limits)
+        # dicts are used as ordered sets: the derived facts are in the order they were added
+        added_facts: dict[Fact, None] = {}
+        for firing in engine.run_until_quiescent():
+            added_facts.update(dict.fromkeys(firing.added_facts))
+        engine.wait_for_callbacks()
+        result = BatchResult(name, goal in context.facts if goal else None,
+                             [fact for fact in added_facts if fact in context.facts])
+    except Exception as error:
+        logging.error(f"fact set='{name}' failed: {error!r}")
+        result = BatchResult(name, error=str(error))
+    logging.debug(f"<< result={result}")
+    return result
+
+
+def _init_worker(rules: list[str], functions_package: Optional[str]):
+    global _worker_rule_templates
+    if _worker_rule_templates is None:
+        if functions_package:
+            auto_register_functions(functions_package)
+        _worker_rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in rules]
+
+
+def _run_worker_fact_set(goal: Optional[Fact], name: str, fact_source: FactSource, use_rete: bool,
+                         strategy: AgendaStrategy, limits: Optional[EngineLimits]) -> BatchResult:
+    # Runs in a worker process
+    return run_fact_set(_worker_rule_templates, goal, name, fact_source, use_rete, strategy, limits)
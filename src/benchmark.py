@@ -0,0 +1,254 @@
+from typing import Callable, Optional
+import gc
+import logging
+import math
+import time
+import tracemalloc
+
+from context import Context
+from elements.fact import Fact
+from elements.rule import RuleTemplate
+from engine import RuleEngine
+
+
+class Workload:
+    """
+    A generated ruleset and its facts (and optionally its goal), like a configuration file
+    """
+
+    def __init__(self, name: str, size: int, rules: list[str], facts: list[str], goal: Optional[str] = None):
+        self.name = name
+        self.size = size
+        self.rules = rules
+        self.facts = facts
+        self.goal = goal
+
+    def get_context(self) -> Context:
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in self.rules]
+        context.load_facts(Fact.parse(fact) for fact in self.facts)
+        context.goal = Fact.parse(self.goal) if self.goal else None
+        return context
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return f"<{self.__class__.__name__} name='{self.name}' size={self.size} nb_facts={len(self.facts)}>"
+
+
+def generate_family_tree(size: int) -> Workload:
+    """
+    The rules of config/family.ini on a family tree of size persons: person i is a child of person (i-1)//2,
+    and the men and women alternate
+    """
+    rules = [
+        "rule1: man(A) and parent(A,B) => add:father(A,B)",
+        "rule2: woman(A) and parent(A,B) => add:mother(A,B)",
+        "rule3: man(A) and parent(B,A) => add:son(A,B)",
+        "rule4: woman(A) and parent(B,A) => add:daughter(A,B)",
+        "rule5: son(A,B) => add:child(A,B)",
+        "rule6: daughter(A,B) => add:child(A,B)",
+        "rule7: parent(A,B) and parent(A,C) and B!=C => add:siblings(B,C)",
+        "rule8: parent(A,B) and parent(B,C) => add:grand_parent(A,C)",
+        "rule9: woman(A) and grand_parent(A,B) => add:grand_mother(A,B)",
+        "rule10: man(A) and grand_parent(A,B) => add:grand_father(A,B)",
+    ]
+    facts = [f"{'man' if person % 2 == 0 else 'woman'}('p{person}')" for person in range(size)]
+    facts += [f"parent('p{(person - 1) // 2}','p{person}')" for person in range(1, size)]
+    return Workload("family", size, rules, facts, f"grand_parent('p0','p{min(3, size - 1)}')")
+
+
+def generate_maze(size: int) -> Workload:
+    """
+    The rule of config/maze.ini (without its function) on a maze of size rooms: room i leads to rooms 2i+1 and 2i+2
+    """
+    rules = ["move: current_position(X) and connection(X,Y) => remove:current_position(X), add:current_position(Y)"]
+    facts = [f"connection('R{(room - 1) // 2}','R{room}')" for room in range(1, size)] + ["current_position('R0')"]
+    return Workload("maze", size, rules, facts, f"current_position('R{size - 1}')")
+
+
+def generate_transitive_chain(size: int) -> Workload:
+    """
+    The transitive closure of a chain of size nodes: size*(size-1)/2 derived path facts
+    """
+    rules = ["rule1: edge(A,B) => add:path(A,B)",
+             "rule2: path(A,B) and edge(B,C) => add:path(A,C)"]
+    facts = [f"edge('n{node}','n{node + 1}')" for node in range(size - 1)]
+    return Workload("chain", size, rules, facts, f"path('n0','n{size - 1}')")
+
+
+def generate_negation(size: int) -> Workload:
+    """
+    Rules with several negated predicates on size items (every 3rd item is excluded, every 5th one is flagged and
+    every 7th one is archived): only the generated facts are negated, so the result doesn't depend on the order of
+    the firings
+    """
+    rules = ["rule1: item(X) and not excluded(X) => add:kept(X)",
+             "rule2: kept(X) and not flagged(X) and not archived(X) => add:active(X)",
+             "rule3: active(X) and next(X,Y) and not excluded(Y) => add:boundary(X,Y)",
+             "rule4: item(X) and not flagged(X) and not archived(X) and not excluded(X) => add:visible(X)"]
+    facts = [f"item('i{item}')" for item in range(size)]
+    facts += [f"excluded('i{item}')" for item in range(0, size, 3)]
+    facts += [f"flagged('i{item}')" for item in range(0, size, 5)]
+    facts += [f"archived('i{item}')" for item in range(0, size, 7)]
+    facts += [f"next('i{item}','i{item + 1}')" for item in range(size - 1)]
+    return Workload("negation", size, rules, facts)
+
+
+def generate_high_arity_join(size: int) -> Workload:
+    """
+    Joins of 3 predicates with 4 values sharing 3 variables each, on 3*size facts
+    """
+    rules = ["rule1: rel(A,B,C,D) and rel(B,C,D,E) and rel(C,D,E,F) => add:chain(A,F)",
+             "rule2: chain(A,B) and rel(A,B,C,D) and not rel(D,C,B,A) => add:forward(A,D)"]
+    facts = [f"rel('v{value}','v{(value + step) % size}','v{(value + 2 * step) % size}','v{(value + 3 * step) % size}')"
+             for value in range(size) for step in (1, 2, 3)]
+    return Workload("join", size, rules, facts)
+
+
+def generate_fan_out(size: int) -> Workload:
+    """
+    A walk along a chain of size nodes where each step is matched by 6 other rules (on 20 weights per node):
+    each firing makes 7 rule templates dirty, which is the case where evaluating them in parallel can help
+    """
+    rules = ["walk: step(X) and next(X,Y) => add:step(Y)"]
+    rules += [f"rule{kind}: step(X) and weight(X,W) and kind{kind}(W) => add:out{kind}(X,W)" for kind in range(6)]
+    facts = [f"next('n{node}','n{node + 1}')" for node in range(size)]
+    facts += [f"weight('n{node}','w{weight}')" for node in range(size + 1) for weight in range(20)]
+    facts += [f"kind{kind}('w{weight}')" for kind in range(6) for weight in range(0, 20, 2)]
+    return Workload("fanout", size, rules, facts + ["step('n0')"], f"step('n{size}')")
+
+
+# name -> (generator, default sizes)
+WORKLOADS: dict[str, tuple[Callable[[int], Workload], list[int]]] = {
+    "family": (generate_family_tree, [250, 500, 1000]),
+    "maze": (generate_maze, [250, 500, 1000]),
+    "chain": (generate_transitive_chain, [25, 50, 100]),
+    "negation": (generate_negation, [250, 500, 1000]),
+    "join": (generate_high_arity_join, [250, 500, 1000]),
+    "fanout": (generate_fan_out, [50, 100, 200]),
+}
+
+
+class BenchmarkResult:
+    """
+    The measures of a workload run: the time of the run (without loading the rules and the facts), the peak memory
+    allocated by the run (measured by a second run, as tracemalloc slows down the engine), the number of firings
+    and the final number of facts
+    """
+
+    def __init__(self, name: str, size: int, seconds: float, peak_memory: int, firings: int, facts: int):
+        self.name = name
+        self.size = size
+        self.seconds = seconds
+        self.peak_memory = peak_memory
+        self.firings = firings
+        self.facts = facts
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.size}"
+
+    def to_dict(self) -> dict:
+        return {"seconds": round(self.seconds, 6), "peak_memory": self.peak_memory, "firings": self.firings,
+                "facts": self.facts}
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return f"<{self.__class__.__name__} key='{self.key}' seconds={self.seconds:.3f} firings={self.firings}>"
+
+
+def run_workload(workload: Workload, use_rete: bool = False, repeat: int = 1, processes: int = 1) -> BenchmarkResult:
+    """
+    Runs a workload repeat times and keeps the fastest time (the slower runs are slowed down by something else)
+    -> with processes > 1, the time includes forking the worker processes of the parallel evaluation
+    """
+    logging.debug(f">> workload={workload} repeat={repeat} processes={processes}")
+    seconds = math.inf
+    for _ in range(repeat):
+        engine = RuleEngine(workload.get_context(), use_rete, processes=processes)
+        gc.collect()
+        start = time.perf_counter()
+        firings = sum(1 for _ in engine.run_until_quiescent())
+        seconds = min(seconds, time.perf_counter() - start)
+        nb_facts = len(engine.context.facts)
+
+    engine = RuleEngine(workload.get_context(), use_rete, processes=processes)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in engine.run_until_quiescent():
+            pass
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result = BenchmarkResult(workload.name, workload.size, seconds, peak_memory, firings, nb_facts)
+    logging.debug(f"<< result={result}")
+    return result
+
+
+def get_growth_exponents(results: list[BenchmarkResult]) -> dict[str, float]:
+    """
+    Returns the growth exponent of the time of each result compared to the previous size of the same workload:
+    ~1 when the time is linear in the size, ~2 when it is quadratic...
+    """
+    result: dict[str, float] = {}
+    previous: dict[str, BenchmarkResult] = {}
+    for benchmark_result in sorted(results, key=lambda benchmark_result: (benchmark_result.name, benchmark_result.size)):
+        previous_result = previous.get(benchmark_result.name)
+        if previous_result and previous_result.seconds > 0 and benchmark_result.seconds > 0:
+            result[benchmark_result.key] = math.log(benchmark_result.seconds / previous_result.seconds) / \
+                                           math.log(benchmark_result.size / previous_result.size)
+        previous[benchmark_result.name] = benchmark_result
+    return result
+
+
+def compare_results(results: list[BenchmarkResult], baseline: dict[str, dict], time_tolerance: float = 0.5,
+                    memory_tolerance: float = 0.2) -> list[str]:
+    """
+    Returns the regressions compared to a baseline (the to_dict() of the results, by key):
+    - the time or the peak memory is higher than the baseline by more than the tolerance (0.5 = 50%)
+    - the number of firings is different: the engine doesn't derive the same facts anymore
+    """
+    regressions = []
+    for benchmark_result in results:
+        expected = baseline.get(benchmark_result.key)
+        if expected is None:
+            continue
+        if benchmark_result.firings != expected["firings"]:
+            regressions.append(f"{benchmark_result.key}: {benchmark_result.firings} firings instead of "
+                               f"{expected['firings']}")
+        if benchmark_result.seconds > expected["seconds"] * (1 + time_tolerance):
+            regressions.append(f"{benchmark_result.key}: {benchmark_result.seconds:.3f}s instead of "
+                               f"{expected['seconds']:.3f}s")
+        if benchmark_result.peak_memory > expected["peak_memory"] * (1 + memory_tolerance):
+            regressions.append(f"{benchmark_result.key}: peak memory={benchmark_result.peak_memory} instead of "
+                               f"{expected['peak_memory']}")
+    return regressions
+
+
+def format_report(results: list[BenchmarkResult], baseline: Optional[dict[str, dict]] = None) -> str:
+    """
+    Returns a table with one line per result, like:
+    workload    size  seconds  baseline  growth  peak_memory  firings   facts
+    family:250   250    0.071     0.069            1.2 MB        1241    1741
+    family:500   500    0.146     0.140    1.04    2.4 MB        2491    3491
+    """
+    baseline = baseline or {}
+    growth_exponents = get_growth_exponents(results)
+    columns = ["workload", "size", "seconds", "baseline", "growth", "peak_memory", "firings", "facts"]
+    rows = []
+    for benchmark_result in results:
+        expected = baseline.get(benchmark_result.key)
+        growth = growth_exponents.get(benchmark_result.key)
+        rows.append([benchmark_result.key, str(benchmark_result.size), f"{benchmark_result.seconds:.3f}",
+                     f"{expected['seconds']:.3f}" if expected else "", f"{growth:.2f}" if growth is not None else "",
+                     f"{benchmark_result.peak_memory / 1_000_000:.1f} MB", str(benchmark_result.firings),
+                     str(benchmark_result.facts)])
+    widths = [max(len(row[index]) for row in [columns] + rows) for index in range(len(columns))]
+    return "\n".join("  ".join(value.ljust(width) if index == 0 else value.rjust(width)
+                               for index, (value, width) in enumerate(zip(row, widths)))
+                     for row in [columns] + rows)
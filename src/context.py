@@ -1,7 +1,28 @@
-from typing import Optional
+from typing import Optional, Iterable, Iterator, Union
+import gc
 import logging
 from elements.fact import Fact
-from elements.rule import RuleTemplate
+from elements.predicate import Predicate
+from elements.symbol import symbol_table
+from elements.rule import RuleTemplate, SatisfiedRule
+from fact_loader import batch, read_facts, DEFAULT_BATCH_SIZE
+from query import Query
+from ruleset_cache import load_rule_templates
+from snapshot import read_snapshot, write_snapshot
+
+_MASK_64 = (1 << 64) - 1
+
+
+def get_fact_key(fact: Fact) -> int:
+    """
+    The random-looking 64 bits key of a fact in the knowledge base fingerprint: the hash of the fact mixed by the
+    splitmix64 finalizer (the fingerprint XORs the keys, so the keys of similar facts must not be related)
+    """
+    key = (hash(fact) + 0x9E3779B97F4A7C15) & _MASK_64
+    key = ((key ^ (key >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return key ^ (key >> 31)
+
 
 class Context:
     SECTION_RULES = "rules"
@@ -9,10 +30,46 @@ class Context:
     SECTION_GOAL = "goal"
 
     def __init__(self):
-        self.rule_templates: list[RuleTemplate] = []
+        self._rule_templates: list[RuleTemplate] = []
+        # (predicate name, number of values) -> the rule templates whose LHS uses that predicate
+        self._rule_templates_by_predicate: dict[tuple[str, int], dict[RuleTemplate, None]] = {}
+        self._rule_template_indexes: dict[RuleTemplate, int] = {}
+        # The rule templates that need to be evaluated (see RuleTemplate.set_evaluate)
+        self._dirty_rule_templates: dict[RuleTemplate, None] = {}
         self._facts: set[Fact] = set()
-        self._facts_by_name: dict[str:set[Fact]] = {}
+        # dicts are used as ordered sets
+        self._facts_by_name: dict[str, dict[Fact, None]] = {}
+        # predicate name -> value index -> value symbol id -> facts: used to find the facts matching predicates like
+        # op1(X,'foo'). To keep the memory per fact low:
+        # - a value index is only built (and then maintained) the first time a predicate has a constant at that index
+        # - a value used by a single fact is mapped to that fact instead of a dict
+        self._facts_by_value: dict[str, dict[int, dict[int, Union[Fact, dict[Fact, None]]]]] = {}
+        # LHS predicate (like "op1('foo')" for "not op1('foo')") -> the satisfied rules using it:
+        # used to "unsatisfy" the rules using a fact when it is added/removed
+        self._satisfied_rules_by_predicate: dict[Predicate, dict[SatisfiedRule, None]] = {}
+        # Zobrist-style hash of the facts: the XOR of their keys (see get_fact_key), updated in O(1) per added or
+        # removed fact -> the same facts always have the same fingerprint (used to detect loops, see LimitsChecker)
+        self.fingerprint = 0
         self.goal: Optional[Fact] = None
+        # Objects with facts_added(facts) and facts_removed(facts) methods, notified of every knowledge base change
+        # (for example the Rete network)
+        self.fact_listeners: list = []
+
+    @property  # getter
+    def rule_templates(self) -> list[RuleTemplate]:
+        return self._rule_templates
+
+    @rule_templates.setter
+    def rule_templates(self, rule_templates: list[RuleTemplate]):
+        # the dependency index is built once per ruleset: a fact change only looks at the rule templates using it
+        self._rule_templates = rule_templates
+        self._rule_templates_by_predicate = {}
+        for rule_template in rule_templates:
+            for predicate in rule_template.left_expression.predicates:
+                key = (predicate.name, len(predicate.symbol_ids))
+                self._rule_templates_by_predicate.setdefault(key, {})[rule_template] = None
+        self._rule_template_indexes = {rule_template: index for index, rule_template in enumerate(rule_templates)}
+        self._dirty_rule_templates = {}
 
     @property  # getter
     def facts(self):
@@ -23,58 +80,196 @@ class Context:
         return self._facts_by_name
 
     def add_facts(self, facts: list[Fact]):
-        self._facts.update(facts)
+        added_facts = [fact for fact in dict.fromkeys(facts) if fact not in self._facts]
+        self._facts.update(added_facts)
         for fact in facts:
-            self.facts_by_name.setdefault(fact.name, []).append(fact)
             # After a bound rule like "not op1('foo')" is satisfied (which happens if there is NO op1('foo') fact),
             # it doesn't need to be evaluated again UNLESS that fact gets added.
             # -> if this happens, the satisfied rule needs to be "unsatisfied" so that it can get evaluated again
             # when that fact gets added again
             self.remove_satisfied_rules(fact)
-        for rule_template in self.rule_templates:
-            rule_template.set_evaluate(facts)
+        for fact in added_facts:
+            self.fingerprint ^= get_fact_key(fact)
+            self._facts_by_name.setdefault(fact.name, {})[fact] = None
+            value_indexes = self._facts_by_value.get(fact.name)
+            if value_indexes:
+                symbol_ids = fact.symbol_ids
+                for index, value_index in value_indexes.items():
+                    if index < len(symbol_ids):
+                        self._add_to_value_index(value_index, symbol_ids[index], fact)
+        self._set_evaluate(facts, is_added=True)
+        if added_facts:
+            for fact_listener in self.fact_listeners:
+                fact_listener.facts_added(added_facts)
 
     def remove_facts(self, facts: list[Fact]):
+        removed_facts = []
         for fact in facts:
             if fact in self._facts:
                 self._facts.remove(fact)  # key must exist
-            facts_by_name = self.facts_by_name.get(fact.name)  # returns None if the key does not exist
-            if facts_by_name:
-                facts_by_name.remove(fact)
-                if not facts_by_name:  # if the list is now empty
-                    del self.facts_by_name[fact.name]
-                # After a bound rule like "op1('foo')" is satisfied (which happens if there IS a op1('foo') fact),
-                # it doesn't need to be evaluated again UNLESS that fact gets removed.
-                # -> if this happens, the bound rule needs to be "unsatisfied" so that it can get evaluated again
-                # if that fact gets added again
+                removed_facts.append(fact)
+                self.fingerprint ^= get_fact_key(fact)
+                self._remove_from_index(self._facts_by_name, fact.name, fact)
+                value_indexes = self._facts_by_value.get(fact.name)
+                if value_indexes:
+                    symbol_ids = fact.symbol_ids
+                    for index, value_index in value_indexes.items():
+                        if index < len(symbol_ids):
+                            self._remove_from_value_index(value_index, symbol_ids[index], fact)
+            # After a bound rule like "op1('foo')" is satisfied (which happens if there IS a op1('foo') fact),
+            # it doesn't need to be evaluated again UNLESS that fact gets removed.
+            # -> if this happens, the bound rule needs to be "unsatisfied" so that it can get evaluated again
+            # if that fact gets added again
             self.remove_satisfied_rules(fact)
-        for rule_template in self.rule_templates:
-            rule_template.set_evaluate(facts)
+        self._set_evaluate(facts, is_added=False)
+        if removed_facts:
+            for fact_listener in self.fact_listeners:
+                fact_listener.facts_removed(removed_facts)
+
+    def _set_evaluate(self, facts: list[Fact], is_added: bool):
+        # Each rule template using the facts gets the facts it uses (and becomes dirty if it needs to be evaluated)
+        rule_templates_facts: dict[RuleTemplate, list[Fact]] = {}
+        for fact in facts:
+            for rule_template in self._rule_templates_by_predicate.get((fact.name, len(fact.symbol_ids)), ()):
+                rule_templates_facts.setdefault(rule_template, []).append(fact)
+        for rule_template, rule_template_facts in rule_templates_facts.items():
+            rule_template.set_evaluate(rule_template_facts, is_added)
+            if rule_template.evaluate:
+                self._dirty_rule_templates[rule_template] = None
+
+    def pop_dirty_rule_templates(self) -> list[RuleTemplate]:
+        """
+        Returns the rule templates that need to be evaluated (in the order they're defined) and clears the list
+        """
+        dirty_rule_templates = sorted(self._dirty_rule_templates, key=self._rule_template_indexes.__getitem__)
+        self._dirty_rule_templates = {}
+        return dirty_rule_templates
+
+    def invalidate_rule_templates(self, rule_templates: list[RuleTemplate]):
+        """
+        The rule templates are dirty and all their bindings are computed again by their next evaluation
+        (used when an evaluation is interrupted: its new satisfied rules are lost)
+        """
+        for rule_template in rule_templates:
+            rule_template.evaluate = True
+            rule_template.delta_facts = None
+            self._dirty_rule_templates[rule_template] = None
+
+    @staticmethod
+    def _remove_from_index(index: dict, key, item):
+        items = index[key]
+        del items[item]
+        if not items:  # if the dict is now empty
+            del index[key]
+
+    @staticmethod
+    def _add_to_value_index(value_index: dict, symbol_id: int, fact: Fact):
+        facts = value_index.get(symbol_id)
+        if facts is None:
+            value_index[symbol_id] = fact
+        elif type(facts) is dict:
+            facts[fact] = None
+        else:
+            value_index[symbol_id] = {facts: None, fact: None}
+
+    @staticmethod
+    def _remove_from_value_index(value_index: dict, symbol_id: int, fact: Fact):
+        facts = value_index[symbol_id]
+        if type(facts) is not dict:
+            del value_index[symbol_id]
+            return
+        del facts[fact]
+        if len(facts) == 1:
+            value_index[symbol_id] = next(iter(facts))
+
+    def _get_value_index(self, name: str, index: int) -> dict[int, Union[Fact, dict[Fact, None]]]:
+        value_indexes = self._facts_by_value.setdefault(name, {})
+        value_index = value_indexes.get(index)
+        if value_index is None:
+            # built from the facts in the order they were added: the same order as if it had been maintained
+            value_index = {}
+            for fact in self._facts_by_name.get(name, ()):
+                if index < len(fact.symbol_ids):
+                    self._add_to_value_index(value_index, fact.symbol_ids[index], fact)
+            value_indexes[index] = value_index
+        return value_index
 
     def set_facts(self, facts: list[Fact]):
+        """
+        Replaces the knowledge base: the rule templates are matched again from scratch (their satisfied rules are
+        cleared, so they can fire again)
+        -> the fact listeners are not notified of the removed facts: the engine must be created afterwards
+        """
         self._facts = set()
         self._facts_by_name = {}
+        self._facts_by_value = {}
+        self._satisfied_rules_by_predicate = {}
+        self._dirty_rule_templates = {}
+        self.fingerprint = 0
+        for rule_template in self.rule_templates:
+            rule_template.reset()  # the removed facts are not tracked: all the bindings need to be computed
         self.add_facts(facts)
 
+    def get_matching_facts(self, predicate: Predicate) -> Iterable[Fact]:
+        """
+        Returns the facts that match the constants of a predicate, using the (name, value index, value) index
+        -> the cost is proportional to the number of facts matching the most selective constant
+
+        Input predicate = op1(X, 'b')
+               Facts = op1('a', 'b') & op1('c', 'b') & op1('c', 'd') & op2('a', 'b')
+              Result = op1('a', 'b') & op1('c', 'b')
+        """
+        symbol_ids = [symbol_id if symbol_table.is_constant(symbol_id) else None for symbol_id in predicate.symbol_ids]
+        return self._get_facts_matching_symbol_ids(predicate.name, symbol_ids)
+
+    def has_matching_fact(self, name: str, symbol_ids: tuple) -> bool:
+        """
+        Returns True if there is a fact with that name and those values symbol ids (None matches any value)
+        has_matching_fact('op1', (symbol_table.get_id("'a'"), None)) -> is there a op1('a', X) fact
+        """
+        return any(True for _ in self._get_facts_matching_symbol_ids(name, symbol_ids))
+
+    def _get_facts_matching_symbol_ids(self, name: str, symbol_ids) -> Iterable[Fact]:
+        candidates = []
+        for index, symbol_id in enumerate(symbol_ids):
+            if symbol_id is not None:
+                facts = self._get_value_index(name, index).get(symbol_id)
+                candidates.append(() if facts is None else facts if type(facts) is dict else (facts,))
+        if not candidates:
+            return self._facts_by_name.get(name, {}).keys()
+        candidates.sort(key=len)
+        return [fact for fact in candidates[0] if all(fact in other_candidates for other_candidates in candidates[1:])]
+
+    def query(self, query: str) -> Iterator[dict[str, str]]:
+        """
+        Generates the values of the variables of a pattern query, see Query
+        query("grand_parent('george',X)") -> {'X': "'larry'"}, {'X': "'sophia'"}
+        """
+        return Query(query).run(self)
+
+    def add_satisfied_rule(self, satisfied_rule: SatisfiedRule):
+        """
+        Adds a (fired) satisfied rule to its rule template and indexes it by its LHS predicates
+        """
+        satisfied_rule.rule_template.satisfied_rules.add(satisfied_rule)
+        for predicate in satisfied_rule.left_predicates:
+            self._satisfied_rules_by_predicate.setdefault(predicate, {})[satisfied_rule] = None
+
     def remove_satisfied_rules(self, fact: Fact):
         """
-        Loops through all the rule templates and removes all the satisfied rules whose LHS contains
-        the input fact
+        Removes all the satisfied rules whose LHS contains the input fact from their rule template
+        -> only the satisfied rules using that fact are looked at (see add_satisfied_rule)
         """
+        matching_satisfied_rules = self._satisfied_rules_by_predicate.pop(fact, None)
+        if not matching_satisfied_rules:
+            return
         logging.debug(f">> fact='{fact}'")
-        for rule_template in self.rule_templates:
-            # Find the satisfied rules whose LHS match the input fact...
-            matching_satisfied_rules = {
-                satisfied_rule
-                for satisfied_rule in rule_template.satisfied_rules
-                # the condition below applies to each element returned by the 'for' loop above
-                if fact in satisfied_rule.left_expression.predicates
-            }
-            # ... and remove them
-            rule_template.satisfied_rules -= matching_satisfied_rules
-            logging.debug(
-                f"<< removed nbSatisfiedRules='{len(matching_satisfied_rules)}' from rule_template='{rule_template.name}'")
-        logging.debug("<<")
+        for satisfied_rule in matching_satisfied_rules:
+            satisfied_rule.rule_template.satisfied_rules.discard(satisfied_rule)
+            for predicate in satisfied_rule.left_predicates:
+                if predicate != fact:
+                    self._remove_from_index(self._satisfied_rules_by_predicate, predicate, satisfied_rule)
+        logging.debug(f"<< removed nbSatisfiedRules='{len(matching_satisfied_rules)}'")
 
     @staticmethod
     def get_config(file_path: str) -> dict:
@@ -114,20 +309,65 @@ class Context:
         logging.debug(f"<<")
         return config
 
-    def load_from_file(self, file_path: str):
+    def load_from_file(self, file_path: str, cache_dir: Optional[str] = None):
+        """
+        With a cache_dir, the compiled rules are read from the cache file of the rules (see ruleset_cache) instead
+        of being parsed again
+        -> the cache files are unpickled: the cache_dir must only be writable by trusted users (like ~/.cache/yare)
+        """
         logging.debug(f">>")
         config = self.get_config(file_path)
 
-        self.rule_templates = []
+        self._facts = set()
         self._facts_by_name = {}
-        for rule in config[Context.SECTION_RULES]:
-            rule_template = RuleTemplate.parse_rule_template(rule)
-            self.rule_templates.append(rule_template)
-        for fact in config[Context.SECTION_FACTS]:
-            fact = Fact.parse(fact)
-            self.add_facts([fact])
+        self._facts_by_value = {}
+        self._satisfied_rules_by_predicate = {}
+        self.fingerprint = 0
+        if cache_dir:
+            self.rule_templates = load_rule_templates(config[Context.SECTION_RULES], cache_dir)
+        else:
+            self.rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in config[Context.SECTION_RULES]]
+        self.load_facts(Fact.parse(fact) for fact in config[Context.SECTION_FACTS])
         self.goal = Fact.parse(config[Context.SECTION_GOAL])
         logging.debug(f"<<")
 
+    def load_facts(self, facts: Iterable[Fact], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Adds a stream of facts (for example from fact_loader.read_facts()) and returns the number of added facts
+        -> the facts are added by batches: the rule templates and the fact listeners are notified once per batch
+        """
+        logging.debug(f">> batch_size={batch_size}")
+        nb_facts = len(self._facts)
+        # The facts don't create reference cycles: the garbage collector would only keep scanning the growing indexes
+        is_gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for facts_batch in batch(facts, batch_size):
+                self.add_facts(facts_batch)
+        finally:
+            if is_gc_enabled:
+                gc.enable()
+        nb_added_facts = len(self._facts) - nb_facts
+        logging.debug(f"<< nb_added_facts={nb_added_facts}")
+        return nb_added_facts
+
+    def load_facts_from_file(self, file_path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Adds the facts of a .ini, .jsonl or .csv file (see fact_loader.read_facts()) without loading the whole file
+        """
+        return self.load_facts(read_facts(file_path), batch_size)
+
+    def save_snapshot(self, file_path: str):
+        """
+        Writes the knowledge base (facts, symbols, satisfied rules...) to a binary file, see snapshot.write_snapshot()
+        """
+        write_snapshot(self, file_path)
+
+    def restore_snapshot(self, file_path: str):
+        """
+        Replaces the knowledge base with the one of a snapshot file, see snapshot.read_snapshot()
+        """
+        read_snapshot(self, file_path)
+
     def __str__(self):
         return f"<{self.__name__} rule_templates='{self.rule_templates}' facts='{self._facts}' goal='{self.goal}'>"
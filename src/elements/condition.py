@@ -0,0 +1,253 @@
+from enum import Enum
+from typing import Optional
+from types import CodeType
+import ast
+
+from elements.predicate import Predicate
+from elements.symbol import symbol_table
+
+
+class ConditionType(Enum):
+    POSITIVE = "positive"
+    NEGATIVE = "negative"
+    TEST = "test"
+
+
+class Condition:
+    """
+    One of the top level conjuncts of a rule LHS:
+    - POSITIVE: a predicate that must match a fact, like "parent(A,B)"
+    - NEGATIVE: a predicate that must NOT match any fact, like "not parent(A,B)"
+    - TEST: a python expression that only uses variables, like "B!=C"
+    """
+
+    def __init__(self,
+                 condition_type: ConditionType,
+                 expression: str,
+                 predicate: Optional[Predicate] = None,
+                 test: Optional[CodeType] = None,
+                 variables: Optional[set[str]] = None):
+        self.condition_type = condition_type
+        self.expression = expression
+        self.predicate = predicate
+        # Only set for TEST conditions: the compiled expression, to be evaluated with a { variable: symbol id } dict
+        self.test = test
+        self.variables: set[str] = variables if variables is not None else predicate.get_variable_names()
+
+    @classmethod
+    def parse_conditions(cls, left_expression: str) -> list['Condition']:
+        """
+        Splits a LHS into its top level conjuncts.
+
+        Example:
+        - input = "parent(A,B) and not parent(B,A) and A!=B"
+        - output = [POSITIVE parent(A,B), NEGATIVE parent(B,A), TEST A!=B]
+
+        Raises an exception if the LHS is not a conjunction of predicates, negated predicates and tests
+        (for example "not (op1(X) and op2(X))")
+        """
+        left_expression = left_expression.strip()
+        try:
+            tree = ast.parse(left_expression, mode='eval')
+        except SyntaxError:
+            raise Exception(f"Incorrect syntax for left_expression={left_expression}")
+        conditions = []
+        for node in cls._get_conjuncts(tree.body):
+            expression = ast.get_source_segment(left_expression, node)
+            if isinstance(node, ast.Call):
+                conditions.append(cls(ConditionType.POSITIVE, expression, predicate=cls._get_predicate(node)))
+            elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not) and isinstance(node.operand, ast.Call):
+                conditions.append(cls(ConditionType.NEGATIVE, expression, predicate=cls._get_predicate(node.operand)))
+            elif not any(isinstance(child, ast.Call) for child in ast.walk(node)):
+                variables = {child.id for child in ast.walk(node) if isinstance(child, ast.Name)}
+                # Variables are bound to symbol ids: 'larry' needs to become symbol_table.get_id("'larry'")
+                node = _ConstantsToSymbolIds().visit(node)
+                test = compile(ast.fix_missing_locations(ast.Expression(node)), '<test>', 'eval')
+                conditions.append(cls(ConditionType.TEST, expression, test=test, variables=variables))
+            else:
+                raise Exception(f"Unsupported condition='{expression}' in left_expression={left_expression}")
+        return conditions
+
+    @classmethod
+    def _get_conjuncts(cls, node: ast.expr) -> list[ast.expr]:
+        # "(op1(X) and op2(X)) and op3(X)" -> [op1(X), op2(X), op3(X)]
+        if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+            result = []
+            for value in node.values:
+                result.extend(cls._get_conjuncts(value))
+            return result
+        return [node]
+
+    @staticmethod
+    def _get_predicate(node: ast.Call) -> Predicate:
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise Exception(f"Invalid predicate={ast.unparse(node)}")
+        values = []
+        for arg in node.args:
+            if isinstance(arg, ast.Name):
+                values.append(arg.id)
+            elif isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                values.append(f"'{arg.value}'")
+            else:
+                raise Exception(f"Invalid predicate={ast.unparse(node)} (one of the values is not a constant nor a variable)")
+        return Predicate(node.func.id, values)
+
+    def evaluate_test(self, variables_values: dict[str, int]) -> bool:
+        # Unbound variables evaluate to their own name, like eval() does for a bound rule
+        return bool(eval(self.test, {"__builtins__": {}}, _TestVariables(variables_values)))
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return f"<{self.__class__.__name__} type='{self.condition_type.value}' expression='{self.expression}'>"
+
+
+class _ConstantsToSymbolIds(ast.NodeTransformer):
+    def visit_Constant(self, node: ast.Constant):
+        if isinstance(node.value, str):
+            return ast.copy_location(ast.Constant(symbol_table.get_id(f"'{node.value}'")), node)
+        return node
+
+
+class _TestVariables(dict):
+    def __missing__(self, key: str):
+        return symbol_table.get_id(key)
+
+
+class CompiledLeftExpression:
+    """
+    A rule LHS compiled once into a python function, so that evaluating a combination of facts doesn't require
+    parsing or calling eval() on a string.
+
+    - positive_predicates: the top level predicates of the LHS, which bind the variables
+      (a combination of facts matching those predicates is found by joining them)
+    - variables: the variables bound by those predicates, in order of appearance
+      -> a "binding" is the tuple of the variables values symbol ids (see SymbolTable), in that order
+    - check(has_fact, binding): evaluates everything else ('not', '==', '!=', parenthesis...) for a binding,
+      where has_fact(name, symbol_ids) returns True if there is a fact matching the symbol ids (None matches any value)
+    - checked_predicate_names: the names of the predicates used by check()
+      (negated_predicate_names: the ones that are only used as a top level "not predicate")
+
+    Example:
+    - left_expression = "parent(A,B) and parent(A,C) and B!=C and not married(A,C)"
+    - positive_predicates = [parent(A,B), parent(A,C)]
+    - variables = ['A', 'B', 'C']
+    - check = lambda has_fact, binding: binding[1] != binding[2] and not has_fact('married', (binding[0], binding[2]))
+    Constants are compiled into their symbol id.
+    """
+
+    def __init__(self,
+                 expression: str,
+                 positive_predicates: list[Predicate],
+                 variables: list[str],
+                 check,
+                 variable_positions: list[tuple[int, int, str]],
+                 checked_predicate_names: set[str],
+                 negated_predicate_names: set[str]):
+        self.expression = expression
+        self.positive_predicates = positive_predicates
+        self.variables = variables
+        self.check = check
+        self.checked_predicate_names = checked_predicate_names
+        self.negated_predicate_names = negated_predicate_names
+        # (start, end, variable) of each variable in the UTF-8 encoded expression, used by bind()
+        self.variable_positions = variable_positions
+
+    @classmethod
+    def compile(cls, left_expression: str):
+        left_expression = left_expression.strip()
+        try:
+            tree = ast.parse(left_expression, mode='eval')
+        except SyntaxError:
+            raise Exception(f"Incorrect syntax for left_expression={left_expression}")
+        conjuncts = Condition._get_conjuncts(tree.body)
+        positive_predicates = [Condition._get_predicate(node) for node in conjuncts if isinstance(node, ast.Call)]
+        variables = list(dict.fromkeys(value
+                                       for predicate in positive_predicates
+                                       for value in predicate.values if Predicate.is_variable(value)))
+        function_names = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+        variable_positions = sorted((node.col_offset, node.end_col_offset, node.id)
+                                    for node in ast.walk(tree)
+                                    if isinstance(node, ast.Name) and id(node) not in function_names)
+
+        other_conjuncts = [node for node in conjuncts if not isinstance(node, ast.Call)]
+        negated_calls = {id(node.operand) for node in other_conjuncts
+                         if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)
+                         and isinstance(node.operand, ast.Call)}
+        checked_calls = [node for conjunct in other_conjuncts for node in ast.walk(conjunct) if isinstance(node, ast.Call)]
+        checked_predicate_names = {Condition._get_predicate(node).name for node in checked_calls}
+        negated_predicate_names = checked_predicate_names - {Condition._get_predicate(node).name
+                                                             for node in checked_calls if id(node) not in negated_calls}
+        if not other_conjuncts:
+            check_body = ast.Constant(True)
+        elif len(other_conjuncts) == 1:
+            check_body = other_conjuncts[0]
+        else:
+            check_body = ast.BoolOp(ast.And(), other_conjuncts)
+        check_body = _CompileCheck(variables).visit(check_body)
+        arguments = ast.arguments(posonlyargs=[], args=[ast.arg('has_fact'), ast.arg('binding')],
+                                  kwonlyargs=[], kw_defaults=[], defaults=[])
+        code = compile(ast.fix_missing_locations(ast.Expression(ast.Lambda(arguments, check_body))),
+                       f"<{left_expression}>", 'eval')
+        check = eval(code, {"__builtins__": {}})
+        return cls(left_expression, positive_predicates, variables, check, variable_positions,
+                   checked_predicate_names, negated_predicate_names)
+
+    def get_binding(self, variables_values: dict[str, int]) -> tuple[int, ...]:
+        return tuple(variables_values[variable] for variable in self.variables)
+
+    def bind(self, binding: tuple[int, ...]) -> str:
+        """
+        Returns the LHS where the variables have been replaced by their value
+
+        Example:
+        - expression = "parent(A,B) and parent(A,C) and B!=C"
+        - binding = (id('george'), id('larry'), id('sophia'))
+        - result = "parent('george','larry') and parent('george','sophia') and 'larry'!='sophia'"
+        """
+        variables_values = dict(zip(self.variables, binding))
+        source = self.expression.encode()
+        parts = []
+        previous_end = 0
+        for start, end, variable in self.variable_positions:
+            parts.append(source[previous_end:start].decode())
+            parts.append(symbol_table.get_value(variables_values[variable]) if variable in variables_values else variable)
+            previous_end = end
+        parts.append(source[previous_end:].decode())
+        return "".join(parts)
+
+
+class _CompileCheck(ast.NodeTransformer):
+    """
+    - op2(X,'foo') -> has_fact('op2', (binding[0], id('foo')))
+    - X != 'foo' -> binding[0] != id('foo')
+    Variables that are not bound by a positive predicate match any value in a predicate, and evaluate
+    to their own name elsewhere (like eval() does for a bound rule)
+    """
+
+    def __init__(self, variables: list[str]):
+        self.variable_indexes = {variable: index for index, variable in enumerate(variables)}
+
+    def _get_binding_value(self, variable: str) -> ast.expr:
+        return ast.Subscript(ast.Name('binding', ast.Load()), ast.Constant(self.variable_indexes[variable]), ast.Load())
+
+    def visit_Call(self, node: ast.Call):
+        predicate = Condition._get_predicate(node)  # raises an exception if this is not a valid predicate
+        values = []
+        for value, symbol_id in zip(predicate.values, predicate.symbol_ids):
+            if Predicate.is_constant(value):
+                values.append(ast.Constant(symbol_id))
+            elif value in self.variable_indexes:
+                values.append(self._get_binding_value(value))
+            else:
+                values.append(ast.Constant(None))
+        return ast.Call(ast.Name('has_fact', ast.Load()), [ast.Constant(predicate.name), ast.Tuple(values, ast.Load())], [])
+
+    def visit_Name(self, node: ast.Name):
+        if node.id in self.variable_indexes:
+            return self._get_binding_value(node.id)
+        return ast.Constant(symbol_table.get_id(node.id))
+
+    def visit_Constant(self, node: ast.Constant):
+        return _ConstantsToSymbolIds().visit(node)
@@ -6,7 +6,7 @@ import re
 class LeftExpression:
     """Represents the LHS of a rule """
     # [()] represents the extra parenthesis that could exist like "(op1(X) and op2(X))"
-    PREDICATE_REGEXP = r"\w+\(['A-Za-z0-9_, ]+\)|and|not|or|[()]"
+    PREDICATE_REGEXP = r"\w+\(['A-Za-z0-9_, ]+\)|\band\b|\bnot\b|\bor\b|[()]"
     UNSUPPORTED_OPERATORS = {'or'}
     SUPPORTED_OPERATORS = {'and', 'not', '(', ')'}
 
@@ -53,17 +53,18 @@ class RightExpression:
 
     def __init__(self,
                  right_expression: str,
-                 right_actions: set[Action],
+                 right_actions: list[Action],
                  ):
         self.expression: str = right_expression
-        self.actions: set[Action] = right_actions
+        # The actions are executed in the order they are defined
+        self.actions: list[Action] = right_actions
 
     @classmethod
     def parse(cls, right_expression: str):
         # This regexp splits on "," but excludes the "," that are inside parenthesis
         # "add:op1(X,Y) , add:op2(X,Y)" -> ["add:op1(X,Y)", "add:op2(X,Y)"]
         right_expr_elements = re.split(r'\s*,\s*(?![^(]*\))', right_expression)
-        right_actions = {Action.parse(element) for element in right_expr_elements}
+        right_actions = list(dict.fromkeys(Action.parse(element) for element in right_expr_elements))
         result = cls(right_expression, right_actions)
         return result
 
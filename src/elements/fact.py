@@ -2,6 +2,7 @@ from elements.predicate import Predicate
 
 
 class Fact(Predicate):
+    __slots__ = ()
 
     def __init__(self, name: str, values: list[str]):
         super().__init__(name, values)
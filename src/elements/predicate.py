@@ -1,13 +1,29 @@
-import re
+import sys
+
+from elements.symbol import symbol_table
 
 
 class Predicate:
-    CONSTANT_EXPRESSION = r"^'.*'$"  # begins AND ends with a "'"
-    VARIABLE_EXPRESSION = r"^[^']*$"  # does not contain a "'"
+    # Predicates (and facts) are small immutable objects: the values are stored as a tuple of symbol ids
+    # (see SymbolTable) and the hash is computed once
+    __slots__ = ('name', 'symbol_ids', '_hash')
 
     def __init__(self, name: str, values: list[str]):
-        self.name: str = name
-        self.values: list[str] = values
+        self.name: str = sys.intern(name)
+        self.symbol_ids: tuple[int, ...] = tuple(map(symbol_table.get_id, values))
+        self._hash: int = hash((self.name, self.symbol_ids))
+
+    @classmethod
+    def from_symbol_ids(cls, name: str, symbol_ids: tuple[int, ...]):
+        result = cls.__new__(cls)
+        result.name = name
+        result.symbol_ids = symbol_ids
+        result._hash = hash((name, symbol_ids))
+        return result
+
+    @property
+    def values(self) -> tuple[str, ...]:
+        return symbol_table.get_values(self.symbol_ids)
 
     @classmethod
     def parse(cls, predicate: str):
@@ -29,24 +45,29 @@ class Predicate:
 
     @staticmethod
     def is_constant(value: str) -> bool:
-        return re.match(Predicate.CONSTANT_EXPRESSION, value) is not None
+        # begins AND ends with a "'"
+        return len(value) >= 2 and value[0] == "'" and value[-1] == "'"
 
     @staticmethod
     def is_variable(value: str) -> bool:
-        return re.match(Predicate.VARIABLE_EXPRESSION, value) is not None
+        # does not contain a "'"
+        return "'" not in value
 
     def to_string(self):
         return f"{self.name}({','.join(self.values)})"
 
     def __eq__(self, other):
         if isinstance(other, Predicate):
-            result = self.name == other.name and self.values == other.values
+            result = self.name == other.name and self.symbol_ids == other.symbol_ids
             return result
         return False
 
     def __hash__(self):
-        result = hash((self.name, tuple(self.values)))
-        return result
+        return self._hash
+
+    def __reduce__(self):
+        # pickled with its values: the symbol ids (and the hash) are only valid in the process that created them
+        return self.__class__, (self.name, list(self.values))
 
     def __str__(self):
         return f"<{self.__class__.__name__} predicate='{self.to_string()}'>"
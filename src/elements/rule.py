@@ -1,7 +1,11 @@
-from elements.action import ActionType
+from typing import Optional
+
+from elements.action import Action, ActionType
+from elements.condition import CompiledLeftExpression
 from elements.expression import LeftExpression, RightExpression
 from elements.fact import Fact
 from elements.predicate import Predicate
+from elements.symbol import symbol_table
 
 
 class RuleTemplate:
@@ -12,10 +16,25 @@ class RuleTemplate:
 
         self.left_expression = left_expression
         self.right_expression = right_expression
+        # The LHS compiled into a python function: see Evaluator.evaluate()
+        self.compiled_left_expression = CompiledLeftExpression.compile(left_expression.expression)
+        # For each LHS predicate and RHS action: the index of each value in a binding (None for a constant
+        # or for a variable that is not bound by the LHS positive predicates)
+        variable_indexes = {variable: index for index, variable in enumerate(self.compiled_left_expression.variables)}
+        self._left_predicates_indexes = [(predicate, [variable_indexes.get(value) for value in predicate.values])
+                                         for predicate in left_expression.predicates]
+        self._actions_indexes = [(action, [variable_indexes.get(value) for value in action.predicate.values])
+                                 for action in right_expression.actions]
         # A "satisfied rule" is a BoundRule whose LHS evaluates to "true"
         self.satisfied_rules: set[BoundRule] = set()
         # Needs to be set to "True" when a fact used on the RHS is added/removed from the knowledge base
         self.evaluate: bool = False
+        # The facts added since the last evaluation (semi-naive evaluation: only the bindings that use at least
+        # one of them can be new), or None if all the bindings need to be computed again
+        self.delta_facts: Optional[dict[Fact, None]] = None
+        self._positive_predicate_names = {predicate.name for predicate in self.compiled_left_expression.positive_predicates}
+        # With the SALIENCE agenda strategy, the activations of the rules with the highest salience are fired first
+        self.salience: int = 0
 
     @classmethod
     def parse_rule_template(cls, rule: str):
@@ -74,15 +93,63 @@ class RuleTemplate:
         unused_variables = right_variables - left_variables
         return unused_variables
 
-    def set_evaluate(self, facts: list[Fact]):
+    def reset(self):
+        """
+        Clears the matching state (satisfied rules, evaluation flags) so that the same compiled rule template can be
+        used with another knowledge base
+        """
+        self.satisfied_rules = set()
+        self.evaluate = False
+        self.delta_facts = None
+
+    def set_evaluate(self, facts: list[Fact], is_added: bool = True):
         """
         sets the value of self.evaluate by checking if any of the input fact names are referenced on the LHS
+        (and keeps track of the added facts for the semi-naive evaluation):
+        - an added fact can only create new bindings where it matches a positive predicate
+        - a removed fact can only create new bindings when it is used by a negated predicate
+          (like "not op2(X)") -> in that case, all the bindings are computed again
+        - adding a fact only used by a negated predicate can't create new bindings
+        (until the first evaluation, any fact referenced on the LHS sets self.evaluate)
         """
+        compiled_left_expression = self.compiled_left_expression
         for fact in facts:
-            is_fact_name_used = any(fact.name == predicate.name for predicate in self.left_expression.predicates)
-            if is_fact_name_used and not self.evaluate:
+            if self.delta_facts is None and not self.evaluate:
+                self.evaluate = fact.name in self._positive_predicate_names or \
+                                fact.name in compiled_left_expression.checked_predicate_names
+            if is_added and fact.name in self._positive_predicate_names:
                 self.evaluate = True
-                break
+                if self.delta_facts is not None:
+                    self.delta_facts[fact] = None
+            if fact.name in compiled_left_expression.checked_predicate_names:
+                if not is_added or fact.name not in compiled_left_expression.negated_predicate_names:
+                    self.evaluate = True
+                    self.delta_facts = None
+
+    def get_left_predicates(self, binding: tuple[int, ...]) -> list[Predicate]:
+        """
+        Returns the LHS predicates where the variables have been replaced by the binding values
+        (including the negated predicates, so that "not op2(X)" becomes "not op2('foo')")
+        """
+        return [Predicate.from_symbol_ids(predicate.name, self._bind_symbol_ids(predicate.symbol_ids, indexes, binding))
+                for predicate, indexes in self._left_predicates_indexes]
+
+    def get_actions(self, binding: tuple[int, ...]) -> list[Action]:
+        """
+        Returns the RHS actions where the variables have been replaced by the binding values
+        -> the predicates of the 'add' and 'remove' actions are facts
+        """
+        actions = []
+        for action, indexes in self._actions_indexes:
+            symbol_ids = self._bind_symbol_ids(action.predicate.symbol_ids, indexes, binding)
+            predicate_cls = Predicate if action.action_type == ActionType.FUNCTION else Fact
+            actions.append(Action(predicate_cls.from_symbol_ids(action.predicate.name, symbol_ids), action.action_type))
+        return actions
+
+    @staticmethod
+    def _bind_symbol_ids(symbol_ids: tuple[int, ...], indexes: list[Optional[int]],
+                         binding: tuple[int, ...]) -> tuple[int, ...]:
+        return tuple(symbol_id if index is None else binding[index] for symbol_id, index in zip(symbol_ids, indexes))
 
     def to_string(self):
         return self.rule
@@ -102,29 +169,57 @@ class RuleTemplate:
         return f"<{self.__class__.__name__} rule='{self.rule}'>"
 
 
-class BoundRule(RuleTemplate):
+class BoundRule:
     """
-    A bound Rule, where the variables have been replaced with the bound values using the known facts
+    A rule template bound to a combination of facts:
+    - facts: the facts matching the positive predicates of the template LHS (in the same order)
+    - binding: the values of the template variables (see CompiledLeftExpression)
     -> a BoundRule may contain variables on the LHS and could still be evaluated
     (for example "not op1(X)" evaluates to true if there is no op1 fact)
+
+    Two bound rules are equal when they have the same name and the same facts.
+    The rule string is only built when needed (for display).
     """
 
-    def __init__(self, rule: str, name: str, left_expression: LeftExpression, right_expression: RightExpression):
-        super().__init__(rule, name, left_expression, right_expression)
+    def __init__(self, rule_template: RuleTemplate, facts: tuple[Fact, ...], binding: tuple[int, ...],
+                 rule: Optional[str] = None):
+        self.rule_template = rule_template
+        self.name: str = rule_template.name
+        self.facts = facts
+        self.binding = binding
+        self._rule = rule
+        self._hash = hash((self.name, facts))
 
     @classmethod
     def parse_bound_rule(cls, rule: str):
+        # Example: "rule: op1('foo') and not op2(Y) => add:op3('foo')"
+        # -> the bound rule is parsed as a rule template whose variables are bound to their own name
         rule_template: RuleTemplate = RuleTemplate.parse_rule_template(rule)
-        result = cls(rule, rule_template.name, rule_template.left_expression, rule_template.right_expression)
+        compiled_left_expression = rule_template.compiled_left_expression
+        result = cls(rule_template,
+                     tuple(compiled_left_expression.positive_predicates),
+                     tuple(map(symbol_table.get_id, compiled_left_expression.variables)),
+                     rule)
         return result
 
+    @property
+    def rule(self) -> str:
+        if self._rule is None:
+            left_expression = self.rule_template.compiled_left_expression.bind(self.binding)
+            right_expression = ", ".join(action.to_string() for action in self.rule_template.get_actions(self.binding))
+            self._rule = f"{self.name}:{left_expression} => {right_expression}"
+        return self._rule
+
+    def to_string(self):
+        return self.rule
+
     def __eq__(self, other):
         if isinstance(other, BoundRule):
-            return self.rule == other.rule
+            return self.name == other.name and self.facts == other.facts
         return False
 
     def __hash__(self):
-        return hash(self.rule)
+        return self._hash
 
     def __repr__(self):
         return self.__str__()
@@ -140,33 +235,28 @@ class SatisfiedRule(BoundRule):
     - whose RHS only contains facts (ie: there are no variables)
     """
 
-    def __init__(self, rule: str, name: str, left_expression: LeftExpression, right_expression: RightExpression):
-        super().__init__(rule, name, left_expression, right_expression)
+    def __init__(self, rule_template: RuleTemplate, facts: tuple[Fact, ...], binding: tuple[int, ...],
+                 rule: Optional[str] = None):
+        super().__init__(rule_template, facts, binding, rule)
+        # the RHS actions are instantiated directly from the binding...
+        self.actions: list[Action] = rule_template.get_actions(binding)
+        # ... and so are the LHS predicates: when one of them is added/removed, the rule is "unsatisfied"
+        self.left_predicates: frozenset[Predicate] = frozenset(rule_template.get_left_predicates(binding))
+        # check that all the RHS actions are fully resolved
+        for action in self.actions:
+            if action.action_type == ActionType.ADD or action.action_type == ActionType.REMOVE:
+                if not all(symbol_table.is_constant(symbol_id) for symbol_id in action.predicate.symbol_ids):
+                    raise Exception(f"Invalid fact='{action.predicate.to_string()}' (variables are not allowed) "
+                                    f"in rule='{self.rule}'")
 
     @classmethod
     def parse_satisfied_rule(cls, rule: str):
         bound_rule: BoundRule = BoundRule.parse_bound_rule(rule)
-        result = cls(rule, bound_rule.name, bound_rule.left_expression, bound_rule.right_expression)
-        # check that all the RHS actions are fully resolved
-        for action in result.right_expression.actions:
-            if action.action_type == ActionType.ADD or action.action_type == ActionType.REMOVE:
-                # This will raise an exception if it's not an actual fact
-                Fact.parse(action.predicate.to_string())
+        result = cls(bound_rule.rule_template, bound_rule.facts, bound_rule.binding, rule)
         return result
 
-    def __eq__(self, other):
-        if isinstance(other, SatisfiedRule):
-            return self.rule == other.rule
-        return False
-
-    def __hash__(self):
-        return hash(self.rule)
-
-    def __repr__(self):
-        return self.__str__()
-
     def __str__(self):
-        return f"<{self.__class__.__name__}rule='{self.rule}'>"
+        return f"<{self.__class__.__name__} rule='{self.rule}'>"
 
 
 if __name__ == '__main__':
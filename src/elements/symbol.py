@@ -0,0 +1,45 @@
+from typing import Optional
+
+
+class SymbolTable:
+    """
+    Maps each distinct predicate value (like "'george'" or "X") to an integer id:
+    predicates and facts only store a tuple of ids, and each value string is stored once.
+
+    Ids are never reused, so comparing two ids is the same as comparing the two values.
+    """
+
+    def __init__(self):
+        self._ids: dict[str, int] = {}
+        self._values: list[str] = []
+        # is_constant(value) for each id, computed once per value
+        self._constants: list[bool] = []
+
+    def get_id(self, value: str) -> int:
+        symbol_id = self._ids.get(value)
+        if symbol_id is None:
+            symbol_id = len(self._values)
+            self._ids[value] = symbol_id
+            self._values.append(value)
+            self._constants.append(value.startswith("'") and value.endswith("'") and len(value) >= 2)
+        return symbol_id
+
+    def find_id(self, value: str) -> Optional[int]:
+        # Same as get_id() but returns None instead of creating a new id
+        return self._ids.get(value)
+
+    def get_value(self, symbol_id: int) -> str:
+        return self._values[symbol_id]
+
+    def get_values(self, symbol_ids: tuple[int, ...]) -> tuple[str, ...]:
+        return tuple(map(self._values.__getitem__, symbol_ids))
+
+    def is_constant(self, symbol_id: int) -> bool:
+        return self._constants[symbol_id]
+
+    def __len__(self):
+        return len(self._values)
+
+
+# The global symbol table, shared by all the predicates and facts
+symbol_table = SymbolTable()
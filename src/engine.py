@@ -1,70 +1,256 @@
-from typing import cast
+from typing import cast, Iterator, Optional
+import asyncio
+import inspect
+import time
 
-from elements.action import ActionType
+from elements.action import Action, ActionType
+from agenda import Agenda, AgendaStrategy
 from evaluator import Evaluator
+from parallel_evaluator import ParallelEvaluator, get_available_cpus
+from rete import ReteNetwork
+from relevance import get_relevant_rule_templates
+from limits import EngineLimits, LimitsChecker
+from truth_maintenance import TruthMaintenance
+from stats import EngineStats
 from context import Context
-from functions_handler import evaluate_function
+from functions_handler import evaluate_function, get_function_executor, FunctionDispatcher, FunctionExecutor
 
 from elements.fact import Fact
 import logging
 
-from elements.rule import RuleTemplate
+from elements.rule import RuleTemplate, SatisfiedRule
 
 
 class RuleEngine:
     #
     # Forward Chaining Inference Engine
     #
-    def __init__(self, context: Context):
+    def __init__(self, context: Context, use_rete: bool = False,
+                 strategy: AgendaStrategy = AgendaStrategy.SALIENCE, processes: int = 1, goal_directed: bool = False,
+                 limits: Optional[EngineLimits] = None, truth_maintenance: bool = False, collect_stats: bool = False):
         self.context = context
+        # With more than 1 process, the rule templates of a round are evaluated in parallel (see ParallelEvaluator)
+        self.processes = processes
+        # In goal directed mode, the engine stops as soon as the goal is in the knowledge base, and only the rule
+        # templates that can contribute to the goal are evaluated (see get_relevant_rule_templates)
+        self.goal_directed = goal_directed
+        self.rule_templates: list[RuleTemplate] = context.rule_templates
+        if goal_directed:
+            if context.goal is None:
+                raise Exception("The goal directed mode requires a goal")
+            self.rule_templates = get_relevant_rule_templates(context.rule_templates, context.goal)
+        self._relevant_rule_templates = set(self.rule_templates)
+        # The activations waiting to be fired, in the order defined by the conflict resolution strategy
+        self.agenda = Agenda(context, strategy)
+        # When set, the rule templates are matched incrementally by a Rete network (which pushes its activations
+        # to the agenda) instead of being re-evaluated from scratch by the Evaluator
+        self.rete_network: Optional[ReteNetwork] = \
+            ReteNetwork(context, self.agenda, self.rule_templates) if use_rete else None
+        # The calls of the functions registered with a THREAD or PROCESS executor, which run in a pool
+        self.function_dispatcher = FunctionDispatcher()
+        # Without limits, nothing is checked: a ruleset that never ends runs forever
+        self.limits_checker: Optional[LimitsChecker] = LimitsChecker(context, limits) if limits else None
+        # With truth maintenance, the derived facts are removed as soon as the facts they were derived from are removed
+        self.truth_maintenance: Optional[TruthMaintenance] = TruthMaintenance(context) if truth_maintenance else None
+        # The counters and timings of each rule template (only collected when asked: see stats())
+        self._stats: Optional[EngineStats] = EngineStats(context.rule_templates) if collect_stats else None
+        # the time spent in the functions of the current firing
+        self._callbacks_time = 0.0
+        # The evaluator of the rule templates (without the Rete network): a ParallelEvaluator keeps its worker
+        # processes until the agenda is empty
+        # (more worker processes than available cpus would only compete with each other and with the engine)
+        nb_processes = min(processes, get_available_cpus())
+        self._evaluator = ParallelEvaluator(context, nb_processes, stats=self._stats,
+                                            limits_checker=self.limits_checker) \
+            if nb_processes > 1 else Evaluator(context, self._stats, self.limits_checker)
 
     def run(self) -> bool:
         logging.debug(">>")
-        has_new_facts = True
-        found_goal = False
-        while has_new_facts:
-            logging.debug(f"Scanning through {len(self.context.rule_templates)} rules.")
-            # has_new_facts, found_goal = self.process_rules()
-            has_new_facts = self._process_rule_templates()
-        if self.context.goal in self.context.facts:
-            found_goal = True
-        logging.debug(f"<< found_goal={found_goal}")
+        nb_firings = sum(1 for _ in self.run_until_quiescent())
+        self.wait_for_callbacks()
+        found_goal = self.context.goal in self.context.facts
+        logging.debug(f"<< found_goal={found_goal} nb_firings={nb_firings}")
         return found_goal
 
-    def _process_rule_templates(self) -> bool:
-        logging.debug(f">> processing nb rules='{len(self.context.rule_templates)}'")
-        has_new_facts = False
-        for rule_template in self.context.rule_templates:
-            has_new_facts = self._process_rule_template(rule_template)
-            if has_new_facts:
-                # The current rule_template has generated new facts, so we start looping on the rules
-                # in order to go back to the main loop... which will start looping on all the rules again
-                # (but from the beginning)
-                break
-        logging.debug(f"<< has_new_facts='{has_new_facts}'")
-        return has_new_facts
-
-    def _process_rule_template(self, rule_template: RuleTemplate) -> bool:
-        logging.debug(f">> rule_template='{rule_template.name}'")
-        has_new_facts = False
-        new_satisfied_rules = Evaluator(self.context).evaluate(rule_template)
-        for new_satisfied_rule in new_satisfied_rules:
-            for action in new_satisfied_rule.right_expression.actions:
-                if action.action_type == ActionType.ADD:
-                    fact = Fact.parse(action.predicate.to_string())
-                    if fact not in self.context.facts:
-                        logging.debug(f"adding fact='{fact}'")
-                        self.context.add_facts([fact])
-                        has_new_facts = True
-                elif action.action_type == ActionType.REMOVE:
-                    fact: Fact = cast(Fact, action.predicate)
-                    if fact in self.context.facts:
-                        logging.debug(f"removing fact='{fact}'")
-                        self.context.remove_facts([fact])
-                        has_new_facts = True
-                elif action.action_type == ActionType.FUNCTION:
-                    # "*" takes an iterable and unpacks its elements so that they are passed as separate arguments to the function.
-                    evaluate_function(action.predicate.name, rule_template.name, *action.predicate.values)
-        rule_template.satisfied_rules.update(new_satisfied_rules)
-        logging.debug(f"<< has_new_facts='{has_new_facts}'")
-        return has_new_facts
+    #
+    # Session API: the engine keeps its matching state (agenda, Rete network, satisfied rules...) across calls,
+    # so that facts can be asserted/retracted at any time and only the changes are matched again
+    #
+
+    def assert_facts(self, facts: list[Fact]):
+        if self.truth_maintenance:
+            self.truth_maintenance.set_base_facts(facts)
+        self.context.add_facts(facts)
+
+    def retract_facts(self, facts: list[Fact]):
+        self.context.remove_facts(facts)
+
+    def step(self) -> Optional['Firing']:
+        """
+        Fires the first activation of the agenda, or returns None if there is nothing to fire
+        """
+        if self.limits_checker is not None:
+            self.limits_checker.start()
+        self._update_agenda()
+        satisfied_rule = self._pop_activation()
+        if satisfied_rule is None:
+            self._close_evaluator()
+            return None
+        if self.limits_checker is None and self._stats is None:
+            return self._fire(satisfied_rule)
+        if self.limits_checker is not None:
+            if self.rete_network:
+                self.limits_checker.add_activations(self.agenda.nb_added_activations)
+            self.limits_checker.check_budgets()
+        if self._stats is None:
+            firing = self._fire(satisfied_rule)
+        else:
+            self._callbacks_time = 0.0
+            start = time.perf_counter()
+            firing = self._fire(satisfied_rule)
+            self._stats.add_firing(firing, time.perf_counter() - start - self._callbacks_time, self._callbacks_time)
+        if self.limits_checker is not None:
+            self.limits_checker.record_firing(firing)
+        return firing
+
+    def _pop_activation(self) -> Optional[SatisfiedRule]:
+        while self.agenda:
+            satisfied_rule = self.agenda.pop()
+            # with truth maintenance, an activation whose facts were removed would add facts without justification
+            if self.truth_maintenance is None or self.truth_maintenance.is_supported(satisfied_rule):
+                return satisfied_rule
+            logging.debug(f"skipping satisfied rule='{satisfied_rule}' (it is not supported anymore)")
+        return None
+
+    def run_until_quiescent(self) -> Iterator['Firing']:
+        """
+        Fires the activations until the agenda is empty (the firings are generated as they happen: facts can be
+        asserted/retracted in between)
+        -> in goal directed mode, it also stops as soon as the goal is in the knowledge base
+        """
+        while not self._is_goal_reached() and (firing := self.step()) is not None:
+            yield firing
+        if self._is_goal_reached():
+            logging.debug(f"goal='{self.context.goal}' reached")
+            self._close_evaluator()
+
+    def _is_goal_reached(self) -> bool:
+        return self.goal_directed and self.context.goal in self.context.facts
+
+    def stats(self) -> EngineStats:
+        """
+        Returns the counters and timings of each rule template since the engine was created, for example:
+        print(engine.stats().to_text(sort_by="candidates"))
+        """
+        if self._stats is None:
+            raise Exception("The stats are only collected with RuleEngine(context, collect_stats=True)")
+        return self._stats
+
+    def wait_for_callbacks(self):
+        """
+        Waits for all the functions dispatched to a pool, and raises the first exception raised by one of them (if any)
+        """
+        self.function_dispatcher.wait()
+
+    def _close_evaluator(self):
+        # the worker processes of a parallel evaluation are only kept while the engine is running
+        if isinstance(self._evaluator, ParallelEvaluator):
+            self._evaluator.close()
+
+    def _update_agenda(self):
+        # With the Rete network, the activations are already found as the facts change: they only need to be pushed
+        if self.rete_network:
+            self.rete_network.push_activations()
+            return
+        # only the rule templates using a fact that was added/removed since their last evaluation
+        rule_templates = self.context.pop_dirty_rule_templates()
+        if self.goal_directed:
+            for rule_template in rule_templates:
+                if rule_template not in self._relevant_rule_templates:
+                    # it's never evaluated: its delta facts are not tracked anymore (they would grow with every fact)
+                    rule_template.delta_facts = None
+            rule_templates = [rule_template for rule_template in rule_templates
+                              if rule_template in self._relevant_rule_templates]
+        try:
+            satisfied_rules = self._evaluator.evaluate_all(rule_templates)
+        except Exception:
+            # an evaluation interrupted by a budget: the rule templates of the round are evaluated again by the next step
+            self.context.invalidate_rule_templates(rule_templates)
+            self._close_evaluator()
+            raise
+        for satisfied_rule in satisfied_rules:
+            self.agenda.add(satisfied_rule)
+
+    def _fire(self, satisfied_rule: SatisfiedRule) -> 'Firing':
+        logging.debug(f">> satisfied_rule='{satisfied_rule}'")
+        rule_template = satisfied_rule.rule_template
+        firing = Firing(satisfied_rule)
+        for action in satisfied_rule.actions:
+            if action.action_type == ActionType.ADD:
+                fact: Fact = cast(Fact, action.predicate)
+                if fact not in self.context.facts:
+                    logging.debug(f"adding fact='{fact}'")
+                    self.context.add_facts([fact])
+                    firing.added_facts.append(fact)
+            elif action.action_type == ActionType.REMOVE:
+                fact: Fact = cast(Fact, action.predicate)
+                if fact in self.context.facts:
+                    logging.debug(f"removing fact='{fact}'")
+                    self.context.remove_facts([fact])
+                    firing.removed_facts.append(fact)
+            elif action.action_type == ActionType.FUNCTION:
+                if self._stats is None:
+                    self._call_function(action, rule_template)
+                else:
+                    start = time.perf_counter()
+                    self._call_function(action, rule_template)
+                    self._callbacks_time += time.perf_counter() - start
+        # a satisfied rule that removed one of its own facts (like the "move" rule of config/maze.ini) can't match
+        # again, and it must not point at a fact that isn't in the knowledge base anymore
+        if all(fact in self.context.facts for fact in satisfied_rule.facts):
+            self.context.add_satisfied_rule(satisfied_rule)
+        if self.truth_maintenance:
+            self.truth_maintenance.add_justifications(satisfied_rule, firing.added_facts)
+        # the calls dispatched to a pool by this firing are submitted right away: they run while the engine matches
+        self.function_dispatcher.flush()
+        logging.debug("<<")
+        return firing
+
+    def _call_function(self, action: Action, rule_template: RuleTemplate):
+        if get_function_executor(action.predicate.name) != FunctionExecutor.INLINE:
+            self.function_dispatcher.dispatch(action.predicate.name, rule_template.name, *action.predicate.values)
+            return
+        # "*" takes an iterable and unpacks its elements so that they are passed as separate arguments to the function.
+        result = evaluate_function(action.predicate.name, rule_template.name, *action.predicate.values)
+        if inspect.iscoroutine(result):
+            # An "async def" function: it is awaited right away (AsyncRuleEngine runs them concurrently instead)
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                asyncio.run(result)
+                return
+            result.close()
+            raise Exception(f"Function '{action.predicate.name}' is a coroutine function and an event loop is already "
+                            f"running: use AsyncRuleEngine instead of RuleEngine")
+
+
+class Firing:
+    """
+    A satisfied rule fired by the engine, along with the facts that its actions actually added and removed
+    (an "add" action for a fact that already exists doesn't add anything)
+    """
+
+    def __init__(self, satisfied_rule: SatisfiedRule):
+        self.satisfied_rule = satisfied_rule
+        self.added_facts: list[Fact] = []
+        self.removed_facts: list[Fact] = []
+
+    @property
+    def actions(self) -> list[Action]:
+        return self.satisfied_rule.actions
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return f"<{self.__class__.__name__} rule='{self.satisfied_rule.rule}'>"
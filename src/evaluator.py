@@ -1,22 +1,31 @@
-from elements.expression import LeftExpression
+from typing import Optional
+import time
+
 from elements.fact import Fact
 from context import Context
 from elements.predicate import Predicate
+from elements.symbol import symbol_table
 from elements.rule import RuleTemplate, BoundRule, SatisfiedRule
-from itertools import product
-import re
+from stats import EngineStats
+from limits import LimitsChecker
 import logging
 
 
-class Evaluator(dict):
-    def __init__(self, context: Context):
-        super().__init__()
+class Evaluator:
+    def __init__(self, context: Context, stats: Optional[EngineStats] = None,
+                 limits_checker: Optional[LimitsChecker] = None):
         self.context = context
+        # When set, the evaluations are counted and timed for each rule template (see RuleEngine.stats())
+        self.stats = stats
+        # When set, the combinations generated by the joins are counted, and the time budget is checked while joining
+        self.limits_checker = limits_checker
 
-    def evaluate(self, rule_template: RuleTemplate) -> set[SatisfiedRule]:
+    def evaluate(self, rule_template: RuleTemplate) -> list[SatisfiedRule]:
         """
         Evaluates a rule and returns the list of new satisfied rules.
         (which is the list of the satisfied rules that were discovered AFTER the rule_template was evaluated.)
+        The order of the list only depends on the order in which the facts were added (and not on hash values),
+        so that a run is reproducible.
 
         Example:
         Rule = "op1(X) and op2(X) => op3(X)"
@@ -25,180 +34,258 @@ class Evaluator(dict):
 
         """
         logging.debug(f">> rule_template={rule_template.name}")
-        satisfied_rules: set[SatisfiedRule] = set()
+        satisfied_rules: list[SatisfiedRule] = []
         if not rule_template.evaluate:
             logging.debug(f"<< skipping evaluation for rule template='{rule_template.name}'")
             return satisfied_rules
 
-        bound_rules = Evaluator._get_bound_rules(rule_template, self.context.facts)
-        for bound_rule in bound_rules:
-            if any(bound_rule.rule == satisfied_rule.rule for satisfied_rule in rule_template.satisfied_rules):
-                logging.debug(f"Skipping evaluation for bound rule '{bound_rule}' (already satisfied)")
-                continue
-            is_satisfied = self._evaluate_bound_rule(bound_rule)
-            if is_satisfied:
-                satisfied_rule = SatisfiedRule.parse_satisfied_rule(bound_rule.rule)
-                satisfied_rules.add(satisfied_rule)
+        start = time.perf_counter() if self.stats is not None else 0.0
+        for facts, binding in self.get_new_bindings(rule_template):
+            satisfied_rules.append(SatisfiedRule(rule_template, facts, binding))
         rule_template.evaluate = False
+        rule_template.delta_facts = {}
+        if self.stats is not None:
+            self.stats.add_evaluation(rule_template, len(satisfied_rules), time.perf_counter() - start)
         logging.debug(f"<< returning nb satisfied rules='{len(satisfied_rules)}' for rule='{rule_template.name}'")
         return satisfied_rules
 
-    def _evaluate_bound_rule(self, bound_rule: BoundRule) -> bool:
+    def evaluate_all(self, rule_templates: list[RuleTemplate]) -> list[SatisfiedRule]:
         """
-        Evaluates (via python eval()) the LHS of a bound rule and returns the result of the evaluation
-
-        Note that an expression containing variables may still evaluate to 'True'.
-        For example: "not op1(X)" evaluates to 'True' is there is no op1 fact
+        Evaluates the rule templates one after the other and returns their new satisfied rules,
+        in the order of the rule templates (see ParallelEvaluator for the parallel version)
         """
-        logging.debug(f">> bound_rule={bound_rule}")
-        # Invoking eval() with an expression that contains variables requires using a dict as the second eval() parameter
-        # where the dict keys are the variable names and the dict values are the variable values
-        # (in this case the dict we use is the current object itself)
-        for left_predicate in bound_rule.left_expression.predicates:
-            self.update({value: value for value in left_predicate.values if Predicate.is_variable(value)})
-        # Note: calling eval() will invoke self.__missing__()
-        result = eval(bound_rule.left_expression.expression, self)
-        logging.debug(f"<< evaluation result={result}")
-        return result
+        return [satisfied_rule for rule_template in rule_templates for satisfied_rule in self.evaluate(rule_template)]
 
-    @staticmethod
-    def _get_bound_rules(rule_template: RuleTemplate, facts: set[Fact]) -> list[BoundRule]:
+    def get_new_bindings(self, rule_template: RuleTemplate) -> list[tuple[tuple[Fact, ...], tuple[int, ...]]]:
         """
-        Returns the list of all the bound rules for the given rule template and the given facts
+        Returns the (facts, binding) of the combinations of facts that satisfy the LHS of the rule template,
+        and that are not already satisfied rules
+        -> this only reads the context: the rule template is not updated
         """
-        logging.debug(f">> rule_template={rule_template}")
-        bound_rules: list[BoundRule] = []
+        return self.remove_satisfied_bindings(rule_template, self.get_satisfying_bindings(rule_template))
 
-        left_bound_expressions = Evaluator._get_left_bound_expressions(rule_template.left_expression, facts)
+    def get_satisfying_bindings(self, rule_template: RuleTemplate) -> list[tuple[tuple[Fact, ...], tuple[int, ...]]]:
+        """
+        Returns the (facts, binding) of the combinations of facts that satisfy the LHS of the rule template
+        (including the ones that are already satisfied rules)
+        """
+        result = []
+        compiled_left_expression = rule_template.compiled_left_expression
+        bindings = Evaluator._get_bindings(rule_template, self.context, self.limits_checker)
+        if self.stats is not None:
+            self.stats.get(rule_template).candidates += len(bindings)
+        for facts, binding in bindings:
+            # The positive predicates are matched by construction, the rest of the LHS is checked by the compiled LHS
+            if compiled_left_expression.check(self.context.has_matching_fact, binding):
+                result.append((facts, binding))
+        return result
 
-        # { op1(A):{0:A}, op2(B,A):{0:B, 1:A}, op3(B):{0:B} }
-        predicates_position_variable = Evaluator._get_predicates_position_variable(rule_template.left_expression)
-        for left_bound_expr in left_bound_expressions:
-            variables_values_dict = Evaluator._get_variables_values_dict(left_bound_expr,
-                                                                         rule_template.left_expression,
-                                                                         predicates_position_variable,
-                                                                         )
-            # OK so when "op1(A) and op2(B,A) and op3(B)" gets bounded:
-            # - A should get replaced with the SAME value in op1 and op2
-            # - B should get replaced with the SAME value in op1 and op3
-            # So if the bound expression contains multiple values for A, we know that it's not a valid expression
-            is_valid = all(len(variables_values_dict[variable]) <= 1 for variable in variables_values_dict)
-            if is_valid:
-                bound_right_expr = Evaluator._get_bound_right_expression(rule_template.right_expression.expression,
-                                                                         variables_values_dict)
-                bound_rule_str = f"{rule_template.name}:{left_bound_expr.expression} => {bound_right_expr}"
-                bound_rule = BoundRule.parse_rule_template(bound_rule_str)
-                bound_rules.append(bound_rule)
-        logging.debug(f"<< returning nb bound rules={len(bound_rules)}")
-        return bound_rules
+    @staticmethod
+    def remove_satisfied_bindings(rule_template: RuleTemplate, bindings: list[tuple[tuple[Fact, ...], tuple[int, ...]]]) \
+            -> list[tuple[tuple[Fact, ...], tuple[int, ...]]]:
+        result = []
+        for facts, binding in bindings:
+            bound_rule = BoundRule(rule_template, facts, binding)
+            if bound_rule in rule_template.satisfied_rules:
+                logging.debug(f"Skipping bound rule '{bound_rule}' (already satisfied)")
+                continue
+            result.append((facts, binding))
+        return result
 
     @staticmethod
-    def _get_variables_values_dict(left_bound_expr: LeftExpression,
-                                   left_unbound_expr: LeftExpression,
-                                   predicate_position_variable: dict[Predicate: dict[int:list]],
-                                   ) -> dict[str:set]:
+    def _get_bindings(rule_template: RuleTemplate, context: Context, limits_checker: Optional[LimitsChecker] = None) \
+            -> list[tuple[tuple[Fact, ...], tuple[int, ...]]]:
         """
-        Returns a dict where:
-        - the keys are the variable names that were used to resolve the bound left expression
-        - the values are the resolved values
+        Returns all the combinations of facts that match the positive predicates of the rule template LHS,
+        along with their binding (the tuple of the variables values symbol ids, see CompiledLeftExpression)
+        -> when the rule template has delta facts, only the combinations using at least one of them are returned
 
-        example:
-        - bound_left_expr = "op1(X) and op2(X,Y)
-        - unbound_left_expr = "op1('x1') and op2('x2', 'y1")
-        - result = { X : {'x1','x2}, Y : {'y1'}}
+        Example:
+        - rule template = "op1(X) and op2(X,Y) and not op3(Y) => add:op4(X)"
+        - facts = op1('a') & op1('b') & op2('a','c')
+        - result = [ ((op1('a'), op2('a','c')), (id('a'), id('c'))) ]
         """
-        variables_values_dict = {variable: set() for variable in left_unbound_expr.get_variable_names()}
-        for bound_predicate_index, bound_predicate in enumerate(left_bound_expr.predicates):
-            for bound_value_index, bound_value in enumerate(bound_predicate.values):
-                if Predicate.is_variable(bound_value):
-                    # The LHS of a bound rule may contain variables
-                    # For example when the parent rule template contains "op1(X)" and when there is no op1(X) fact
-                    continue
-                # get the original name of the variable from the not-bounded predicate:
-                template_predicate = left_unbound_expr.predicates[bound_predicate_index]
-                # check of the bound_value_index was originally a variable in the rule_template
-                # This may not be the case if the rule template contains an predicate like op1('foo')
-                # since in that case, 'foo' is already bound (so to speak)
-                if bound_value_index in predicate_position_variable[template_predicate]:
-                    variable = predicate_position_variable[template_predicate][bound_value_index]
-                    variables_values_dict[variable].add(bound_value)
-        return variables_values_dict
+        compiled_left_expression = rule_template.compiled_left_expression
+        positive_predicates = compiled_left_expression.positive_predicates
+        # the same predicate can be used several times in the LHS but it's only joined once
+        predicates = list(dict.fromkeys(positive_predicates))
+        if rule_template.delta_facts is not None:
+            combos = Evaluator._join_delta_facts(predicates, rule_template.delta_facts, context, limits_checker)
+        else:
+            predicates_facts = Evaluator._get_predicates_matching_facts(predicates, context)
+            if len(predicates_facts) < len(predicates):
+                return []  # one of the predicates doesn't match any fact
+            combos = Evaluator._join_predicates_facts(predicates_facts, limits_checker)
+        result = []
+        for variables_values, combo_facts in combos:
+            predicate_facts = dict(zip(predicates, combo_facts))
+            facts = tuple(predicate_facts[predicate] for predicate in positive_predicates)
+            result.append((facts, compiled_left_expression.get_binding(variables_values)))
+        return result
 
     @staticmethod
-    def _get_left_bound_expressions(left_expression: LeftExpression, facts: set[Fact]) -> list[LeftExpression]:
+    def _join_predicates_facts(predicates_facts: dict[Predicate:list[Fact]],
+                               limits_checker: Optional[LimitsChecker] = None) \
+            -> list[tuple[dict[str, int], tuple[Fact, ...]]]:
         """
-        From a rule template, generate all the bound rules that match the given facts.
+        Returns the combinations of facts (one fact per predicate, in the order of the dict keys) where each variable
+        has the same value in all the predicates, along with the { variable: value symbol id } dict of each combination.
 
-        If one of the input predicates from the rule doesn't match any fact, it's left "as is".
-        -> so for example if the rule template contains "op1(X") and if there is no op1 fact, then
-        all the generated bound rules will contain "op1(X)".
-        """
-        bound_expressions: list[LeftExpression] = []
+        The predicates are joined one at a time, using a hash table keyed by the values of the variables they share
+        with the predicates that are already joined: the number of generated combinations grows with the number
+        of consistent combinations, and not with the product of the number of facts.
+        The generated combinations (partial or not) are counted by the limits checker, if any.
 
-        left_predicates_facts = Evaluator._get_predicates_matching_facts(left_expression.predicates, facts)
-        fact_combos = list(product(*(left_predicates_facts.values())))
-        for fact_combo in fact_combos:
-            bound_left_expr = str(left_expression.expression)
-            left_predicate_and_fact_list = list(zip(left_predicates_facts.keys(), fact_combo))
-            for left_predicate, fact in left_predicate_and_fact_list:
-                # Replaces a left predicate with a known fact
-                bound_left_expr = bound_left_expr.replace(left_predicate.to_string(), fact.to_string())
-                pass
-            bound_expressions.append(LeftExpression.parse(bound_left_expr))
-        return bound_expressions
+        Example:
+        - input = { op1(A,B): {op1('a1','b1'), op1('a2','b2')}, op2(B): {op2('b1')} }
+        - output = [ ({A: id('a1'), B: id('b1')}, (op1('a1','b1'), op2('b1'))) ]
+        """
+        predicates = list(predicates_facts.keys())
+        join_order = Evaluator._get_join_order(predicates, predicates_facts)
+        # partial combinations: (the values of the variables bound so far, the facts in join order)
+        partial_combos: list[tuple[dict[str, int], tuple[Fact, ...]]] = [({}, ())]
+        bound_variables: set[str] = set()
+        for predicate_index in join_order:
+            predicate = predicates[predicate_index]
+            shared_variables = [variable for variable in dict.fromkeys(predicate.values)
+                                if variable in bound_variables]
+            hash_table: dict[tuple, list[tuple[Fact, dict[str, int]]]] = {}
+            for fact in predicates_facts[predicate]:
+                fact_variables_values = Evaluator._get_fact_variables_values(predicate, fact)
+                if fact_variables_values is not None:
+                    key = tuple(fact_variables_values[variable] for variable in shared_variables)
+                    hash_table.setdefault(key, []).append((fact, fact_variables_values))
+            if limits_checker is None:
+                partial_combos = [
+                    ({**variables_values, **fact_variables_values}, combo_facts + (fact,))
+                    for variables_values, combo_facts in partial_combos
+                    for fact, fact_variables_values in
+                    hash_table.get(tuple(variables_values[variable] for variable in shared_variables), ())
+                ]
+            else:
+                joined_combos = []
+                for variables_values, combo_facts in partial_combos:
+                    matching_facts = hash_table.get(tuple(variables_values[variable] for variable in shared_variables), ())
+                    limits_checker.add_combinations(len(matching_facts))
+                    joined_combos.extend(({**variables_values, **fact_variables_values}, combo_facts + (fact,))
+                                         for fact, fact_variables_values in matching_facts)
+                partial_combos = joined_combos
+            bound_variables.update(predicate.get_variable_names())
+        # put the facts back in the order of the predicates
+        positions = [join_order.index(predicate_index) for predicate_index in range(len(predicates))]
+        return [(variables_values, tuple(combo_facts[position] for position in positions))
+                for variables_values, combo_facts in partial_combos]
 
     @staticmethod
-    def _get_bound_right_expression(right_expression: str, variable_mapping: dict[str, set[str]]) -> str:
+    def _join_delta_facts(predicates: list[Predicate], delta_facts: dict[Fact, None], context: Context,
+                          limits_checker: Optional[LimitsChecker] = None) \
+            -> list[tuple[dict[str, int], tuple[Fact, ...]]]:
         """
-        Returns a string where the input expression variables have been replaced by their value
-        expression = "op2(X)"
-        mapping = { X : 123 }
-        result = "op2(123)"
+        Semi-naive version of _join_predicates_facts(): returns the combinations of facts that use at least one
+        delta fact (in the order of the predicates, along with the { variable: value symbol id } dict)
+
+        Each combination is found once: from the first predicate matched by a delta fact, the other predicates
+        are joined by looking up the facts matching the values that are already bound in the context index
+        (the predicates before it only match the facts that are not delta facts).
+        -> the cost is proportional to the number of combinations using a delta fact, and not to the number of facts
+
+        Example:
+        - predicates = [parent(A,B), parent(B,C)]
+        - facts = parent('a','b') & parent('b','c'), delta facts = parent('c','d')
+        - output = [ ({A: id('b'), B: id('c'), C: id('d')}, (parent('b','c'), parent('c','d'))) ]
         """
+        result = []
+        for delta_index, delta_predicate in enumerate(predicates):
+            for delta_fact in delta_facts:
+                if delta_fact not in context.facts or not Evaluator._matches(delta_predicate, delta_fact):
+                    continue
+                fact_variables_values = Evaluator._get_fact_variables_values(delta_predicate, delta_fact)
+                if fact_variables_values is None:
+                    continue
+                partial_combos = [(fact_variables_values, {delta_index: delta_fact})]
+                if limits_checker is not None:
+                    limits_checker.add_combinations(1)
+                remaining = [index for index in range(len(predicates)) if index != delta_index]
+                while remaining and partial_combos:
+                    # the predicates sharing a variable with the already joined predicates first
+                    bound_variables = partial_combos[0][0].keys()
+                    predicate_index = next((index for index in remaining
+                                            if predicates[index].get_variable_names() & bound_variables), remaining[0])
+                    remaining.remove(predicate_index)
+                    partial_combos = Evaluator._extend_combos(partial_combos, predicates[predicate_index],
+                                                              predicate_index, delta_index, delta_facts, context,
+                                                              limits_checker)
+                result.extend((variables_values, tuple(combo_facts[index] for index in range(len(predicates))))
+                              for variables_values, combo_facts in partial_combos)
+        return result
 
-        def process_parentheses(match) -> str:
-            parenthesis_content = match.group(1)
-            replaced_content = replace_parenthesis_content(parenthesis_content)
-            return f"({replaced_content})"
+    @staticmethod
+    def _extend_combos(partial_combos: list[tuple[dict[str, int], dict[int, Fact]]], predicate: Predicate,
+                       predicate_index: int, delta_index: int, delta_facts: dict[Fact, None], context: Context,
+                       limits_checker: Optional[LimitsChecker] = None) -> list[tuple[dict[str, int], dict[int, Fact]]]:
+        result = []
+        for variables_values, combo_facts in partial_combos:
+            nb_combos = len(result)
+            # the predicate with the values that are already bound, like parent('b',C)
+            bound_predicate = Predicate.from_symbol_ids(predicate.name, tuple(
+                variables_values.get(value, symbol_id) for value, symbol_id in zip(predicate.values, predicate.symbol_ids)
+            ))
+            for fact in context.get_matching_facts(bound_predicate):
+                if predicate_index < delta_index and fact in delta_facts:
+                    continue  # that combination is found from the delta fact
+                fact_variables_values = Evaluator._get_fact_variables_values(bound_predicate, fact)
+                if fact_variables_values is not None:
+                    result.append(({**variables_values, **fact_variables_values}, {**combo_facts, predicate_index: fact}))
+            if limits_checker is not None:
+                limits_checker.add_combinations(len(result) - nb_combos)
+        return result
 
-        def replace_parenthesis_content(content: str) -> str:
-            parts = re.split(r",\s*", content)  # split around ","
-            replaced_parts = []
-            for part in parts:
-                if re.match(r"^'.*'$", part):
-                    # single quoted strings are left as is
-                    replaced_parts.append(part)
-                else:
-                    # this code below retrieves the first element from a set
-                    if (part in variable_mapping) and (len(variable_mapping[part]) == 1):
-                        value = next(iter(variable_mapping[part]))
-                        part = part.replace(part, value)
-                    replaced_parts.append(part)
-            return ", ".join(replaced_parts)
+    @staticmethod
+    def _matches(predicate: Predicate, fact: Fact) -> bool:
+        # same name, same number of values and same constants
+        return (predicate.name == fact.name and len(predicate.symbol_ids) == len(fact.symbol_ids)
+                and all(predicate_id == fact_id or not symbol_table.is_constant(predicate_id)
+                        for predicate_id, fact_id in zip(predicate.symbol_ids, fact.symbol_ids)))
 
-        parentheses_pattern = r"\(([^()]+)\)"
-        bound_expression = re.sub(parentheses_pattern, process_parentheses, right_expression)
-        return bound_expression
+    @staticmethod
+    def _get_join_order(predicates: list[Predicate], predicates_facts: dict[Predicate:list[Fact]]) -> list[int]:
+        """
+        Returns the indexes of the predicates in the order they should be joined:
+        the predicate with the fewest facts first, then the predicates that share a variable with the already
+        joined predicates (to avoid cartesian products), the ones with the fewest facts first
+        """
+        remaining = list(range(len(predicates)))
+        join_order: list[int] = []
+        bound_variables: set[str] = set()
+        while remaining:
+            next_index = min(remaining, key=lambda index: (
+                not (predicates[index].get_variable_names() & bound_variables) if join_order else False,
+                len(predicates_facts[predicates[index]])
+            ))
+            remaining.remove(next_index)
+            join_order.append(next_index)
+            bound_variables.update(predicates[next_index].get_variable_names())
+        return join_order
 
     @staticmethod
-    def _get_predicates_position_variable(left_unbound_expr: LeftExpression) -> dict[Predicate: dict[int:str]]:
+    def _get_fact_variables_values(predicate: Predicate, fact: Fact):
         """
-        Returns a dict where a key is a left predicates and a value is a dict of { variable_name_index: variable_name } pair
-        Example:
-        - input = op1(A) and op2(B,A) and op3(B, 'foo')
-        - output = { op1(A):{0:A}, op2(B,A):{0:B, 1:A}, op3(B):{0:B} }
+        Returns the { variable: value symbol id } dict obtained by matching a predicate with a fact, or None if a
+        variable used several times in the predicate would get different values (or if the number of values differ)
+
+        Example: predicate = op1(X,Y,X), fact = op1('a','b','a') -> { X: id('a'), Y: id('b') }
         """
-        result: dict[Predicate: dict[int:str]] = {}
-        for predicate in left_unbound_expr.predicates:
-            if predicate not in result:
-                result[predicate] = {}
-            for index, value in enumerate(predicate.values):
-                if Predicate.is_variable(value):
-                    result[predicate].update({index: value})
-        return result
+        if len(predicate.symbol_ids) != len(fact.symbol_ids):
+            return None
+        variables_values: dict[str, int] = {}
+        for variable, symbol_id in zip(predicate.values, fact.symbol_ids):
+            if Predicate.is_variable(variable):
+                if variables_values.setdefault(variable, symbol_id) != symbol_id:
+                    return None
+        return variables_values
 
     @staticmethod
-    def _get_predicates_matching_facts(predicates: list[Predicate], facts: set[Fact]) -> dict[Predicate:set[Fact]]:
+    def _get_predicates_matching_facts(predicates: list[Predicate], context: Context) -> dict[Predicate:list[Fact]]:
         """
         Returns the list of facts that match each input predicate
         The return value is a dict where:
@@ -206,16 +293,16 @@ class Evaluator(dict):
         - the values are the matching facts for each predicate
         If an predicate does NOT have any matching facts, that predicate is NOT added to the dict.
         """
-        result: dict[Predicate:set[Fact]] = {}
+        result: dict[Predicate:list[Fact]] = {}
         for next_predicate in predicates:
             if next_predicate not in result:
-                matching_facts = Evaluator._get_predicate_matching_facts(next_predicate, facts)
+                matching_facts = Evaluator._get_predicate_matching_facts(next_predicate, context)
                 if matching_facts:  # no key with empty values
                     result[next_predicate] = matching_facts
         return result
 
     @staticmethod
-    def _get_predicate_matching_facts(predicate: Predicate, facts: set[Fact]) -> set[Fact]:
+    def _get_predicate_matching_facts(predicate: Predicate, context: Context) -> list[Fact]:
         """
         Returns the facts that match an predicate
         (the predicate values may be constants or variables like for example "op1(X, 'foo')" )
@@ -223,39 +310,8 @@ class Evaluator(dict):
         Input predicate = op1(X, 'b')
                Facts = op1('a', 'b') & op1('c', 'b') & op1('c', 'd') & op2('a', 'b')
               Result = op1('a', 'b') & op1('c', 'b')
-       """
-        matches: set[Fact] = set()
-        # for next_fact in self.context.facts:
-        for next_fact in facts:
-            if next_fact.name != predicate.name:
-                continue
-            match = True
-            for next_fact_index, next_fact_value in enumerate(next_fact.values):
-                next_predicate_value = predicate.values[next_fact_index]
-                if Predicate.is_constant(next_predicate_value) and not next_predicate_value == next_fact_value:
-                    # A variable match everything, a constant match another constant that has the same value
-                    # -> the only scenario where there is NO match is when comparing a constant with a different constant
-                    match = False
-                    break
-            if match:
-                matches.add(next_fact)
-        return matches
 
-    def __missing__(self, key: str):
-        """
-        invoked via self["missing_function"]("arg")
-        OR via eval("missing_function(arg)")
-        """
-
-        def method(*args: tuple, **kwargs) -> bool:
-            facts = self.context.facts_by_name.get(key, [])
-            result = False
-            if facts:
-                # Note that we convert the second argument to a "list" because args is a "tuple"
-                values = [f"'{arg}'" for arg in args]
-                fact = Fact(key, values)
-                result = fact in facts
-            #logging.debug(f">> << key={key}, args={args} -> result={result}")
-            return result
-
-        return method
\ No newline at end of file
+        A variable match everything, a constant match another constant that has the same value
+        -> the facts are looked up in the context index instead of scanning all the facts
+       """
+        return list(context.get_matching_facts(predicate))
@@ -0,0 +1,94 @@
+import csv
+import json
+import os
+from typing import Iterable, Iterator, Optional
+
+from elements.fact import Fact
+
+# Number of facts added to the context at once: the indexes are updated fact by fact, but the rule templates and the
+# fact listeners (like the Rete network) are notified once per batch
+DEFAULT_BATCH_SIZE = 10000
+
+
+def read_facts(file_path: str) -> Iterator[Fact]:
+    """
+    Streams the facts of a file, depending on its extension:
+    - .ini: the [facts] section of a configuration file, one fact per line like "parent('george','larry')"
+    - .jsonl: one JSON object per line like {"name": "parent", "values": ["george", "larry"]}
+    - .csv: one fact per row like "parent,george,larry" (the first column is the predicate name)
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".ini":
+        return read_ini_facts(file_path)
+    if extension == ".jsonl":
+        return read_jsonl_facts(file_path)
+    if extension == ".csv":
+        return read_csv_facts(file_path)
+    raise Exception(f"Unsupported fact file='{file_path}' (supported extensions: .ini, .jsonl, .csv)")
+
+
+def read_ini_facts(file_path: str) -> Iterator[Fact]:
+    with open(file_path, 'r') as file:
+        is_facts_section = False
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue  # Skip empty lines or comments
+            if line.startswith("[") and line.endswith("]"):
+                is_facts_section = line[1:-1] == "facts"
+            elif is_facts_section:
+                yield Fact.parse(line)
+
+
+def read_jsonl_facts(file_path: str) -> Iterator[Fact]:
+    with open(file_path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                name, values = item["name"], item["values"]
+            except (ValueError, KeyError, TypeError):
+                raise Exception(f"Invalid fact at line={line_number} in file='{file_path}': {line}")
+            yield create_fact(name, values)
+
+
+def read_csv_facts(file_path: str, name: Optional[str] = None) -> Iterator[Fact]:
+    """
+    When a predicate name is given, all the columns are values: "george,larry" -> parent('george','larry')
+    """
+    with open(file_path, 'r', newline='') as file:
+        for row in csv.reader(file):
+            if not row:
+                continue
+            if name is None:
+                yield create_fact(row[0].strip(), row[1:])
+            else:
+                yield create_fact(name, row)
+
+
+def create_fact(name: str, values: Iterable) -> Fact:
+    """
+    Creates a fact from raw values: create_fact("parent", ["george", "larry"]) -> parent('george','larry')
+    """
+    quoted_values = []
+    for value in values:
+        value = str(value).strip()
+        if "'" in value:
+            raise Exception(f"Invalid value='{value}' for fact='{name}' (quotes are not allowed)")
+        quoted_values.append(f"'{value}'")
+    if not name.isidentifier():
+        raise Exception(f"Invalid fact name='{name}'")
+    return Fact(name, quoted_values)
+
+
+def batch(facts: Iterable[Fact], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list[Fact]]:
+    facts_batch = []
+    for fact in facts:
+        facts_batch.append(fact)
+        if len(facts_batch) == batch_size:
+            yield facts_batch
+            facts_batch = []
+    if facts_batch:
+        yield facts_batch
@@ -1,19 +1,40 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Optional
 import pkgutil
 import importlib
 
+
+class FunctionExecutor(Enum):
+    # the function is called by the engine when the action is processed
+    INLINE = "inline"
+    # the function is called by a thread pool (for functions waiting on I/O)
+    THREAD = "thread"
+    # the function is called by a process pool (for CPU-heavy functions: they must be defined at the top level
+    # of a module, and their arguments are strings)
+    PROCESS = "process"
+
+
 function_registry = {}
+function_executors: dict[str, FunctionExecutor] = {}
 
 
-def register_function():
+def register_function(executor: FunctionExecutor = FunctionExecutor.INLINE):
     """
     This registers functions that have the @register_function() decorator.
+    Functions that only have side effects can be dispatched to a pool: @register_function(executor=FunctionExecutor.THREAD)
     """
     def decorator(func):
         function_registry[func.__name__] = func
+        function_executors[func.__name__] = executor
         return func
     return decorator
 
 
+def get_function_executor(function_name) -> FunctionExecutor:
+    return function_executors.get(function_name, FunctionExecutor.INLINE)
+
+
 def evaluate_function(function_name, rule_name, *args):
     func = function_registry.get(function_name)
     if not func:
@@ -28,4 +49,73 @@ def auto_register_functions(package_name):
     """
     package = importlib.import_module(package_name)
     for _, module_name, _ in pkgutil.iter_modules(package.__path__):
-        importlib.import_module(f"{package_name}.{module_name}")
\ No newline at end of file
+        importlib.import_module(f"{package_name}.{module_name}")
+
+
+class FunctionDispatcher:
+    """
+    Dispatches the calls of the functions registered with a THREAD or PROCESS executor to a pool:
+    - the calls are buffered and submitted together by flush() (the engine flushes after each firing, so the calls
+      run while the engine matches), or as soon as batch_size calls are buffered
+    - the calls of a batch are run in order by the same worker, but the batches run concurrently:
+      there is no ordering guarantee between 2 calls of different batches
+    - when a call raises an exception, the next calls of its batch are still run, and wait() raises the first
+      exception (once all the submitted calls are done)
+    The pools are shared by all the dispatchers (and are shut down when the interpreter exits).
+    """
+
+    _executors: dict[FunctionExecutor, Executor] = {}
+
+    def __init__(self, batch_size: int = 32):
+        self.batch_size = batch_size
+        self._pending_calls: dict[FunctionExecutor, list[tuple]] = {}
+        self._futures: list[Future] = []
+
+    def dispatch(self, function_name, rule_name, *args):
+        executor = get_function_executor(function_name)
+        pending_calls = self._pending_calls.setdefault(executor, [])
+        pending_calls.append((function_registry[function_name], rule_name, args))
+        if len(pending_calls) >= self.batch_size:
+            self._submit(executor)
+
+    def flush(self):
+        # Submits the buffered calls
+        for executor in list(self._pending_calls):
+            self._submit(executor)
+
+    def wait(self):
+        """
+        Submits the buffered calls and waits for all the submitted calls
+        """
+        self.flush()
+        futures, self._futures = self._futures, []
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def has_pending_calls(self) -> bool:
+        return bool(self._pending_calls) or any(not future.done() for future in self._futures)
+
+    def _submit(self, executor: FunctionExecutor):
+        calls = self._pending_calls.pop(executor, None)
+        if calls:
+            self._futures.append(self._get_executor(executor).submit(_call_functions, calls))
+
+    @classmethod
+    def _get_executor(cls, executor: FunctionExecutor) -> Executor:
+        if executor not in cls._executors:
+            cls._executors[executor] = ThreadPoolExecutor() if executor == FunctionExecutor.THREAD else ProcessPoolExecutor()
+        return cls._executors[executor]
+
+
+def _call_functions(calls: list[tuple]):
+    # Runs a batch of calls in a worker and raises the first exception once all the calls are done
+    first_error: Optional[BaseException] = None
+    for func, rule_name, args in calls:
+        try:
+            func(rule_name, *args)
+        except Exception as error:
+            first_error = first_error or error
+    if first_error is not None:
+        raise first_error
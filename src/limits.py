@@ -0,0 +1,98 @@
+from typing import Optional
+import logging
+import time
+
+from context import Context
+
+
+class EngineLimits:
+    """
+    The budgets of a run, to stop a ruleset that never ends (see config/endless_loop1.ini) instead of spinning forever
+    (None means no limit):
+    - max_firings: the number of fired activations
+    - max_seconds: the wall-clock time since the first step of the engine
+    - max_combinations: the number of combinations of facts (bound rules, complete or partial) generated by the
+      joins of the Evaluator (with the Rete matcher: the activations pushed to the agenda by the network)
+    - max_state_visits: how many times the knowledge base can reach the same state (same facts) after a firing that
+      added or removed facts -> a loop is detected when a state is reached once more
+    """
+
+    def __init__(self, max_firings: Optional[int] = None, max_seconds: Optional[float] = None,
+                 max_combinations: Optional[int] = None, max_state_visits: Optional[int] = None):
+        self.max_firings = max_firings
+        self.max_seconds = max_seconds
+        self.max_combinations = max_combinations
+        self.max_state_visits = max_state_visits
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return f"<{self.__class__.__name__} max_firings={self.max_firings} max_seconds={self.max_seconds} " \
+               f"max_combinations={self.max_combinations} max_state_visits={self.max_state_visits}>"
+
+
+class LimitsChecker:
+    """
+    Checks the limits of an engine, which raises an exception as soon as one of them is exceeded:
+    - the budgets are checked before each firing, and while the Evaluator joins the facts (add_combinations()), so
+      that a single evaluation generating a huge number of combinations is interrupted as well
+    - the states are identified by Context.fingerprint (a hash of the facts updated for each added/removed fact),
+      so a firing only costs a dict lookup
+    The diagnostic of a loop names the rules fired since the first visit of the state:
+    "Loop detected after 4 firings: the knowledge base went back to the same state 3 times (rules: rule1, rule2)"
+    """
+
+    def __init__(self, context: Context, limits: EngineLimits):
+        self.context = context
+        self.limits = limits
+        self.nb_firings = 0
+        self.nb_combinations = 0
+        # the activations pushed to the agenda that were already counted as combinations (Rete matcher)
+        self._nb_activations = 0
+        self._deadline: Optional[float] = None
+        # fingerprint -> (number of visits, index in _fired_rule_names of the first visit)
+        self._state_visits: dict[int, tuple[int, int]] = {}
+        # the names of the rules of the firings that added or removed facts
+        self._fired_rule_names: list[str] = []
+
+    def start(self):
+        # the wall-clock budget starts with the first step of the engine
+        if self._deadline is None and self.limits.max_seconds is not None:
+            self._deadline = time.monotonic() + self.limits.max_seconds
+
+    def check_budgets(self):
+        if self.limits.max_firings is not None and self.nb_firings >= self.limits.max_firings:
+            self._raise(f"Firings budget exceeded: max_firings={self.limits.max_firings}")
+        self.add_combinations(0)
+
+    def add_combinations(self, nb_combinations: int):
+        self.nb_combinations += nb_combinations
+        if self.limits.max_combinations is not None and self.nb_combinations > self.limits.max_combinations:
+            self._raise(f"Combinations budget exceeded: {self.nb_combinations} combinations for "
+                        f"max_combinations={self.limits.max_combinations}")
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            self._raise(f"Time budget exceeded: max_seconds={self.limits.max_seconds}")
+
+    def add_activations(self, nb_added_activations: int):
+        # with the Rete matcher, the combinations are the activations pushed to the agenda by the network
+        self.add_combinations(nb_added_activations - self._nb_activations)
+        self._nb_activations = nb_added_activations
+
+    def record_firing(self, firing):
+        self.nb_firings += 1
+        if self.limits.max_state_visits is None or not (firing.added_facts or firing.removed_facts):
+            # a firing that doesn't change the facts (like a function call) can't make the engine loop
+            return
+        self._fired_rule_names.append(firing.satisfied_rule.rule_template.name)
+        fingerprint = self.context.fingerprint
+        nb_visits, first_visit = self._state_visits.get(fingerprint, (0, len(self._fired_rule_names)))
+        self._state_visits[fingerprint] = (nb_visits + 1, first_visit)
+        if nb_visits + 1 > self.limits.max_state_visits:
+            rule_names = dict.fromkeys(self._fired_rule_names[first_visit:])
+            self._raise(f"Loop detected after {self.nb_firings} firings: the knowledge base went back to the same "
+                        f"state {nb_visits + 1} times (rules: {', '.join(rule_names)})")
+
+    def _raise(self, message: str):
+        logging.error(message)
+        raise Exception(message)
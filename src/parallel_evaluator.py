@@ -0,0 +1,255 @@
+from multiprocessing.connection import Connection, wait
+from typing import Optional
+import logging
+import math
+import multiprocessing
+import os
+import time
+
+from context import Context
+from elements.fact import Fact
+from elements.rule import RuleTemplate, SatisfiedRule
+from elements.symbol import symbol_table
+from evaluator import Evaluator
+from limits import LimitsChecker
+from stats import EngineStats
+
+# A fact sent to/by a worker: (name, symbol ids), the symbol ids being the same in all the processes
+PackedFact = tuple[str, tuple[int, ...]]
+
+
+def get_available_cpus() -> int:
+    # the cpus this process can run on (which can be fewer than the cpus of the machine)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ParallelEvaluator(Evaluator):
+    """
+    Evaluates the rule templates of a round in worker processes (one rule template per task):
+    - evaluating a rule template only reads the context (the actions of the satisfied rules are processed later,
+      from the agenda), so all the rule templates of a round can be evaluated at the same time
+    - the workers are forked by the first round: they get a copy of the context (facts, indexes...) without it being
+      pickled, and they are kept until close() is called (the engine closes them when the agenda is empty)
+    - before each round, the workers get the facts that were added/removed since the previous round (and the new
+      symbols, so that the symbol ids are the same in all the processes): only those changes are pickled
+    - a task only sends the delta facts of its rule template, and the new bindings are sent back
+      (the parent process removes the bindings that are already satisfied rules)
+    - the satisfied rules are merged in the order of the rule templates: the result is the same as Evaluator
+    When the round has fewer than min_rule_templates rule templates to evaluate, or when its estimated matching time
+    is below min_round_seconds (or when fork is not available), the rule templates are evaluated sequentially: sending
+    them to the workers costs more than evaluating them. The matching time of a rule template is estimated from its
+    previous evaluation (its time per delta fact), and a full evaluation (no delta facts) is assumed to be expensive.
+    With a limits checker, each worker checks the time budget while joining (the deadline is inherited by the fork),
+    and the combinations generated by the workers are added to the budget of the parent process.
+    """
+
+    def __init__(self, context: Context, processes: Optional[int] = None, min_rule_templates: int = 4,
+                 stats: Optional[EngineStats] = None, limits_checker: Optional[LimitsChecker] = None,
+                 min_round_seconds: float = 0.001):
+        super().__init__(context, stats, limits_checker)
+        self.processes = processes or get_available_cpus()
+        self.min_rule_templates = min_rule_templates
+        self.min_round_seconds = min_round_seconds
+        # rule template -> the matching time per delta fact of its last evaluation
+        self._matching_times: dict[RuleTemplate, float] = {}
+        # the number of times the workers were forked
+        self.nb_forks = 0
+        self._workers: list[multiprocessing.Process] = []
+        self._connections: list[Connection] = []
+        # the rule templates at the time of the fork (the tasks only send their index)
+        self._rule_template_indexes: dict[RuleTemplate, int] = {}
+        # the facts added/removed since the last round: [(is_added, facts)]
+        self._changes: list[tuple[bool, list[PackedFact]]] = []
+        # the number of symbols the workers know
+        self._nb_symbols = 0
+
+    def evaluate_all(self, rule_templates: list[RuleTemplate]) -> list[SatisfiedRule]:
+        rule_templates = [rule_template for rule_template in rule_templates if rule_template.evaluate]
+        if (len(rule_templates) < max(self.min_rule_templates, 2) or self.processes < 2
+                or "fork" not in multiprocessing.get_all_start_methods()
+                or self._get_estimated_time(rule_templates) < self.min_round_seconds):
+            satisfied_rules = []
+            for rule_template in rule_templates:
+                nb_delta_facts = self._get_nb_delta_facts(rule_template)
+                start = time.perf_counter()
+                satisfied_rules.extend(self.evaluate(rule_template))
+                self._matching_times[rule_template] = (time.perf_counter() - start) / nb_delta_facts
+            return satisfied_rules
+
+        logging.debug(f">> nb rule_templates={len(rule_templates)}")
+        if not self._workers or any(rule_template not in self._rule_template_indexes
+                                    for rule_template in rule_templates):
+            self.close()
+            self._start_workers()
+        self._send_changes()
+        rule_templates_bindings = self._run_tasks(rule_templates)
+
+        satisfied_rules: list[SatisfiedRule] = []
+        for rule_template, (packed_bindings, nb_candidates, matching_time, nb_combinations) in \
+                zip(rule_templates, rule_templates_bindings):
+            if self.limits_checker is not None:
+                self.limits_checker.add_combinations(nb_combinations)
+            self._matching_times[rule_template] = matching_time / self._get_nb_delta_facts(rule_template)
+            bindings = self.remove_satisfied_bindings(rule_template, [
+                (tuple(_unpack_facts(packed_facts)), binding) for packed_facts, binding in packed_bindings
+            ])
+            for facts, binding in bindings:
+                satisfied_rules.append(SatisfiedRule(rule_template, facts, binding))
+            rule_template.evaluate = False
+            rule_template.delta_facts = {}
+            if self.stats is not None:
+                self.stats.get(rule_template).candidates += nb_candidates
+                self.stats.add_evaluation(rule_template, len(bindings), matching_time)
+        logging.debug(f"<< returning nb satisfied rules='{len(satisfied_rules)}'")
+        return satisfied_rules
+
+    def _get_estimated_time(self, rule_templates: list[RuleTemplate]) -> float:
+        estimated_time = 0.0
+        for rule_template in rule_templates:
+            matching_time = self._matching_times.get(rule_template)
+            if rule_template.delta_facts is None or matching_time is None:
+                return math.inf
+            estimated_time += matching_time * self._get_nb_delta_facts(rule_template)
+        return estimated_time
+
+    @staticmethod
+    def _get_nb_delta_facts(rule_template: RuleTemplate) -> int:
+        # a full evaluation counts as 1 delta fact
+        return max(len(rule_template.delta_facts or ()), 1)
+
+    def close(self):
+        """
+        Stops the workers (the next round forks them again, with the facts of the context at that time)
+        """
+        if not self._workers:
+            return
+        logging.debug(f"stopping nb workers={len(self._workers)}")
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass  # the worker is already stopped
+            connection.close()
+        for worker in self._workers:
+            worker.join()
+        self._workers, self._connections, self._changes = [], [], []
+        if self in self.context.fact_listeners:
+            self.context.fact_listeners.remove(self)
+
+    def facts_added(self, facts: list[Fact]):
+        self._changes.append((True, _pack_facts(facts)))
+
+    def facts_removed(self, facts: list[Fact]):
+        self._changes.append((False, _pack_facts(facts)))
+
+    def _start_workers(self):
+        self.nb_forks += 1
+        self._rule_template_indexes = {rule_template: index
+                                       for index, rule_template in enumerate(self.context.rule_templates)}
+        self._nb_symbols = len(symbol_table)
+        fork_context = multiprocessing.get_context("fork")
+        for _ in range(self.processes):
+            connection, worker_connection = fork_context.Pipe()
+            # with fork, the evaluator (and its context) is inherited by the worker: it is not pickled
+            worker = fork_context.Process(target=_run_worker, args=(self, worker_connection), daemon=True)
+            worker.start()
+            worker_connection.close()
+            self._workers.append(worker)
+            self._connections.append(connection)
+        self.context.fact_listeners.append(self)
+
+    def _send_changes(self):
+        symbols = list(symbol_table.get_values(tuple(range(self._nb_symbols, len(symbol_table)))))
+        first_symbol_id, self._nb_symbols = self._nb_symbols, len(symbol_table)
+        changes, self._changes = self._changes, []
+        for connection in self._connections:
+            connection.send(("changes", (first_symbol_id, symbols, changes)))
+
+    def _run_tasks(self, rule_templates: list[RuleTemplate]) -> list[tuple]:
+        # each worker gets the next task as soon as it's done with the previous one
+        results: list = [None] * len(rule_templates)
+        next_task = 0
+        running: dict[Connection, int] = {}
+        error: Optional[BaseException] = None
+        idle_connections = list(self._connections)
+        while running or (next_task < len(rule_templates) and error is None):
+            while idle_connections and next_task < len(rule_templates) and error is None:
+                connection = idle_connections.pop()
+                rule_template = rule_templates[next_task]
+                delta_facts = None if rule_template.delta_facts is None else _pack_facts(rule_template.delta_facts)
+                connection.send(("evaluate", (self._rule_template_indexes[rule_template], delta_facts)))
+                running[connection] = next_task
+                next_task += 1
+            for connection in wait(list(running)):
+                try:
+                    is_ok, result = connection.recv()
+                except EOFError:
+                    self.close()
+                    raise Exception("A worker of the parallel evaluation stopped unexpectedly")
+                task = running.pop(connection)
+                idle_connections.append(connection)
+                if is_ok:
+                    results[task] = result
+                elif error is None:
+                    error = result
+        if error is not None:
+            raise error
+        return results
+
+
+def _run_worker(evaluator: ParallelEvaluator, connection: Connection):
+    # Runs in a worker process, with a copy of the evaluator made by the fork
+    context = evaluator.context
+    # the agenda, the truth maintenance... of the parent process must not react to the changes of this copy
+    context.fact_listeners = []
+    rule_templates = context.rule_templates
+    while (message := connection.recv()) is not None:
+        command, arguments = message
+        if command == "changes":
+            first_symbol_id, symbols, changes = arguments
+            if len(symbol_table) != first_symbol_id:
+                raise Exception(f"The symbol table of worker={os.getpid()} is out of sync")
+            for symbol in symbols:
+                symbol_table.get_id(symbol)
+            for is_added, packed_facts in changes:
+                if is_added:
+                    context.add_facts(_unpack_facts(packed_facts))
+                else:
+                    context.remove_facts(_unpack_facts(packed_facts))
+            continue
+        rule_template_index, delta_facts = arguments
+        try:
+            connection.send((True, _evaluate(evaluator, rule_templates[rule_template_index], delta_facts)))
+        except Exception as error:
+            connection.send((False, error))
+
+
+def _evaluate(evaluator: ParallelEvaluator, rule_template: RuleTemplate, delta_facts: Optional[list[PackedFact]]) \
+        -> tuple[list[tuple[list[PackedFact], tuple[int, ...]]], int, float, int]:
+    # The stats and the limits checker of the worker are lost, so the number of candidates, the matching time and the
+    # number of combinations are sent back with the bindings
+    rule_template.delta_facts = None if delta_facts is None else dict.fromkeys(_unpack_facts(delta_facts))
+    stats = evaluator.stats
+    limits_checker = evaluator.limits_checker
+    nb_candidates = stats.get(rule_template).candidates if stats is not None else 0
+    nb_combinations = limits_checker.nb_combinations if limits_checker is not None else 0
+    start = time.perf_counter()
+    bindings = evaluator.get_satisfying_bindings(rule_template)
+    matching_time = time.perf_counter() - start
+    if stats is not None:
+        nb_candidates = stats.get(rule_template).candidates - nb_candidates
+    if limits_checker is not None:
+        nb_combinations = limits_checker.nb_combinations - nb_combinations
+    packed_bindings = [(_pack_facts(facts), binding) for facts, binding in bindings]
+    return packed_bindings, nb_candidates, matching_time, nb_combinations
+
+
+def _pack_facts(facts) -> list[PackedFact]:
+    # a pickled fact is converted back with its values (see Predicate.__reduce__), which is slower than its symbol ids
+    return [(fact.name, fact.symbol_ids) for fact in facts]
+
+
+def _unpack_facts(packed_facts: list[PackedFact]) -> list[Fact]:
+    return [Fact.from_symbol_ids(name, symbol_ids) for name, symbol_ids in packed_facts]
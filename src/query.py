@@ -0,0 +1,113 @@
+from typing import Iterator, Optional
+import logging
+
+from elements.condition import Condition, ConditionType
+from elements.fact import Fact
+from elements.predicate import Predicate
+from elements.symbol import symbol_table
+
+
+class Query:
+    """
+    A pattern query over the knowledge base: a conjunction of predicates (with variables), negated predicates and
+    tests, using the same syntax as a rule LHS.
+
+    Example:
+    - query = "parent('george',X) and parent(X,Y) and not man(Y)"
+    - facts = parent('george','john') & parent('john','sophia') & parent('john','larry') & man('larry')
+    - result = [{'X': "'john'", 'Y': "'sophia'"}]
+
+    The facts are found with the get_matching_facts() index of a Context (or of a Snapshot, without restoring it).
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.conditions = Condition.parse_conditions(query)
+        self.variables: list[str] = []
+        for condition in self.conditions:
+            if condition.condition_type == ConditionType.POSITIVE:
+                self.variables.extend(value for value in condition.predicate.values
+                                      if Predicate.is_variable(value) and value not in self.variables)
+        for condition in self.conditions:
+            if condition.condition_type != ConditionType.POSITIVE and not condition.variables <= set(self.variables):
+                raise Exception(f"Invalid query={query} (the variables of '{condition.expression}' must be used by "
+                                f"a predicate)")
+
+    def run(self, context) -> Iterator[dict[str, str]]:
+        """
+        Generates the values of the variables for each combination of facts matching the query (an empty dict when
+        the query has no variable and is true): the results are computed one at a time, as they are consumed
+        -> the knowledge base must not be modified while iterating
+        """
+        logging.debug(f">> query='{self.query}'")
+        for variables_values in self._match(context, self.conditions, {}):
+            yield {variable: symbol_table.get_value(variables_values[variable]) for variable in self.variables}
+
+    def get_facts(self, context) -> Iterator[Fact]:
+        """
+        Generates the facts matching a query made of a single predicate, like grand_parent('george',X)
+        """
+        if len(self.conditions) != 1 or self.conditions[0].condition_type != ConditionType.POSITIVE:
+            raise Exception(f"Invalid query={self.query} (a single predicate is expected)")
+        predicate = self.conditions[0].predicate
+        for fact in context.get_matching_facts(predicate):
+            if self._bind(predicate, fact, {}) is not None:
+                yield fact
+
+    def _match(self, context, conditions: list[Condition], variables_values: dict[str, int]) \
+            -> Iterator[dict[str, int]]:
+        # the negations and tests are checked as soon as their variables are bound
+        bound_variables = variables_values.keys()
+        remaining = []
+        for condition in conditions:
+            if condition.condition_type == ConditionType.POSITIVE or not condition.variables <= bound_variables:
+                remaining.append(condition)
+            elif not self._check(context, condition, variables_values):
+                return
+        if not remaining:
+            yield variables_values
+            return
+        # the next predicate is the one with the most bound values: it's the most selective one for the fact indexes
+        positive = max((condition for condition in remaining if condition.condition_type == ConditionType.POSITIVE),
+                       key=lambda condition: sum(
+            symbol_table.is_constant(symbol_id) or value in bound_variables
+            for value, symbol_id in zip(condition.predicate.values, condition.predicate.symbol_ids)))
+        remaining.remove(positive)
+        predicate = self._get_bound_predicate(positive.predicate, variables_values)
+        for fact in context.get_matching_facts(predicate):
+            fact_variables_values = self._bind(predicate, fact, variables_values)
+            if fact_variables_values is not None:
+                yield from self._match(context, remaining, fact_variables_values)
+
+    def _check(self, context, condition: Condition, variables_values: dict[str, int]) -> bool:
+        if condition.condition_type == ConditionType.TEST:
+            return condition.evaluate_test(variables_values)
+        predicate = self._get_bound_predicate(condition.predicate, variables_values)
+        return not any(self._bind(predicate, fact, variables_values) is not None
+                       for fact in context.get_matching_facts(predicate))
+
+    @staticmethod
+    def _get_bound_predicate(predicate: Predicate, variables_values: dict[str, int]) -> Predicate:
+        return Predicate.from_symbol_ids(predicate.name, tuple(
+            variables_values.get(value, symbol_id) for value, symbol_id in zip(predicate.values, predicate.symbol_ids)
+        ))
+
+    @staticmethod
+    def _bind(predicate: Predicate, fact: Fact, variables_values: dict[str, int]) -> Optional[dict[str, int]]:
+        # the values of a fact matched by the index still need to be checked when a variable is used several times
+        if len(fact.symbol_ids) != len(predicate.symbol_ids):
+            return None
+        result = dict(variables_values)
+        for value, symbol_id, fact_symbol_id in zip(predicate.values, predicate.symbol_ids, fact.symbol_ids):
+            if symbol_table.is_constant(symbol_id):
+                if symbol_id != fact_symbol_id:
+                    return None
+            elif result.setdefault(value, fact_symbol_id) != fact_symbol_id:
+                return None
+        return result
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return f"<{self.__class__.__name__} query='{self.query}'>"
@@ -0,0 +1,42 @@
+import logging
+
+from elements.action import ActionType
+from elements.fact import Fact
+from elements.rule import RuleTemplate
+
+
+def get_relevant_rule_templates(rule_templates: list[RuleTemplate], goal: Fact) -> list[RuleTemplate]:
+    """
+    Returns the rule templates that can contribute to the goal (in the order they're defined), computed statically
+    from their actions:
+    - a rule template is relevant when one of its "add:" or "remove:" actions changes a predicate that is the goal
+      or that is used (with or without 'not') by the LHS of a relevant rule template
+      -> adding or removing such a fact can make the goal reachable or unreachable
+    - "function:" actions don't change the knowledge base: a rule template whose actions are only functions (or
+      facts that no relevant rule template uses) is not relevant, so its functions are not called
+    The predicates are compared by name and number of values (the values are not compared).
+
+    Example:
+    - rule templates = [ "parent(A,B) and parent(B,C) => add:grand_parent(A,C)", "man(A) => add:person(A)" ]
+    - goal = grand_parent('george','john')
+    - result = [ "parent(A,B) and parent(B,C) => add:grand_parent(A,C)" ]
+    """
+    logging.debug(f">> goal='{goal}'")
+    relevant_predicates: set[tuple[str, int]] = {(goal.name, len(goal.symbol_ids))}
+    relevant_rule_templates: dict[RuleTemplate, None] = {}
+    is_changed = True
+    while is_changed:
+        is_changed = False
+        for rule_template in rule_templates:
+            if rule_template in relevant_rule_templates:
+                continue
+            if any(action.action_type != ActionType.FUNCTION and
+                   (action.predicate.name, len(action.predicate.symbol_ids)) in relevant_predicates
+                   for action in rule_template.right_expression.actions):
+                relevant_rule_templates[rule_template] = None
+                relevant_predicates.update((predicate.name, len(predicate.symbol_ids))
+                                           for predicate in rule_template.left_expression.predicates)
+                is_changed = True
+    result = [rule_template for rule_template in rule_templates if rule_template in relevant_rule_templates]
+    logging.debug(f"<< nb relevant rule templates={len(result)}/{len(rule_templates)}")
+    return result
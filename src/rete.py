@@ -0,0 +1,348 @@
+from typing import Optional
+
+from agenda import Agenda
+from elements.condition import Condition, ConditionType
+from elements.fact import Fact
+from elements.predicate import Predicate
+from elements.symbol import symbol_table
+from elements.rule import RuleTemplate, SatisfiedRule
+from context import Context
+import logging
+
+# A token is a partial match: the facts matching the positive conditions of a rule LHS, in order
+Token = tuple[Fact, ...]
+
+
+class AlphaMemory:
+    """
+    Stores the facts matching a single predicate pattern like "parent(X,'larry')"
+    (same name, same constants, same values for a variable used several times)
+    """
+
+    def __init__(self, predicate: Predicate):
+        self.name = predicate.name
+        self.nb_values = len(predicate.symbol_ids)
+        # (value index, symbol id) of the constants
+        self.constants: list[tuple[int, int]] = []
+        self.equalities: list[tuple[int, int]] = []
+        first_indexes: dict[int, int] = {}
+        for index, symbol_id in enumerate(predicate.symbol_ids):
+            if symbol_table.is_constant(symbol_id):
+                self.constants.append((index, symbol_id))
+            elif symbol_id in first_indexes:
+                self.equalities.append((first_indexes[symbol_id], index))
+            else:
+                first_indexes[symbol_id] = index
+        self.facts: dict[Fact, None] = {}  # a dict is used as an ordered set
+        self.successors: list = []
+
+    @staticmethod
+    def get_key(predicate: Predicate) -> tuple:
+        # parent(X,Y) and parent(A,B) share the same alpha memory, parent(X,X) doesn't
+        first_indexes: dict[int, int] = {}
+        key = [predicate.name]
+        for index, symbol_id in enumerate(predicate.symbol_ids):
+            if symbol_table.is_constant(symbol_id):
+                key.append(symbol_id)
+            else:
+                key.append(-1 - first_indexes.setdefault(symbol_id, index))
+        return tuple(key)
+
+    def matches(self, fact: Fact) -> bool:
+        symbol_ids = fact.symbol_ids
+        if len(symbol_ids) != self.nb_values:
+            return False
+        return (all(symbol_ids[index] == symbol_id for index, symbol_id in self.constants)
+                and all(symbol_ids[first] == symbol_ids[second] for first, second in self.equalities))
+
+    def activate(self, fact: Fact, is_added: bool):
+        if is_added:
+            self.facts[fact] = None
+        else:
+            del self.facts[fact]
+        for successor in self.successors:
+            successor.right_activate(fact, is_added)
+
+
+class BetaNode:
+    def __init__(self):
+        self.children: list[BetaNode] = []
+
+    def left_activate(self, token: Token, is_added: bool):
+        raise NotImplementedError()
+
+    def propagate(self, token: Token, is_added: bool):
+        for child in self.children:
+            child.left_activate(token, is_added)
+
+
+class JoinNode(BetaNode):
+    """
+    Joins the tokens from the parent node with the facts of an alpha memory, using hash tables keyed
+    by the values of the variables they share
+    """
+
+    def __init__(self, alpha_memory: AlphaMemory, left_sources: list[tuple[int, int]], right_indexes: list[int]):
+        super().__init__()
+        self.alpha_memory = alpha_memory
+        # where the shared variables values are found in a token: (token index, value index)
+        self.left_sources = left_sources
+        # where the shared variables values are found in a fact
+        self.right_indexes = right_indexes
+        self.left_memory: dict[tuple, dict[Token, None]] = {}
+        self.right_memory: dict[tuple, dict[Fact, None]] = {}
+        for fact in alpha_memory.facts:
+            self.right_memory.setdefault(self.get_right_key(fact), {})[fact] = None
+        alpha_memory.successors.append(self)
+
+    def get_left_key(self, token: Token) -> tuple:
+        return tuple(token[token_index].symbol_ids[value_index] for token_index, value_index in self.left_sources)
+
+    def get_right_key(self, fact: Fact) -> tuple:
+        return tuple(fact.symbol_ids[index] for index in self.right_indexes)
+
+    def left_activate(self, token: Token, is_added: bool):
+        key = self.get_left_key(token)
+        _update_memory(self.left_memory, key, token, is_added)
+        for fact in list(self.right_memory.get(key, ())):
+            self.propagate(token + (fact,), is_added)
+
+    def right_activate(self, fact: Fact, is_added: bool):
+        key = self.get_right_key(fact)
+        _update_memory(self.right_memory, key, fact, is_added)
+        for token in list(self.left_memory.get(key, ())):
+            self.propagate(token + (fact,), is_added)
+
+
+class NegativeNode(JoinNode):
+    """
+    Only lets the tokens from the parent node through when there is NO matching fact in the alpha memory
+    """
+
+    def left_activate(self, token: Token, is_added: bool):
+        key = self.get_left_key(token)
+        _update_memory(self.left_memory, key, token, is_added)
+        if not self.right_memory.get(key):
+            self.propagate(token, is_added)
+
+    def right_activate(self, fact: Fact, is_added: bool):
+        key = self.get_right_key(fact)
+        was_blocked = bool(self.right_memory.get(key))
+        _update_memory(self.right_memory, key, fact, is_added)
+        is_blocked = bool(self.right_memory.get(key))
+        if was_blocked != is_blocked:
+            # the first matching fact was added (tokens are retracted) or the last one was removed (tokens are back)
+            for token in list(self.left_memory.get(key, ())):
+                self.propagate(token, not is_blocked)
+
+
+class TestNode(BetaNode):
+    """
+    Only lets the tokens through when a test like "B!=C" evaluates to True
+    """
+
+    def __init__(self, condition: Condition, variable_sources: dict[str, tuple[int, int]]):
+        super().__init__()
+        self.condition = condition
+        self.variable_sources = {variable: source for variable, source in variable_sources.items()
+                                 if variable in condition.variables}
+
+    def left_activate(self, token: Token, is_added: bool):
+        variables_values = {variable: token[token_index].symbol_ids[value_index]
+                            for variable, (token_index, value_index) in self.variable_sources.items()}
+        if self.condition.evaluate_test(variables_values):
+            self.propagate(token, is_added)
+
+
+class TerminalNode(BetaNode):
+    """
+    Holds the tokens that fully match a rule template LHS (aka the activations of that rule template)
+    """
+
+    def __init__(self, rule_template: RuleTemplate, conditions: list[Condition],
+                 variable_sources: dict[str, tuple[int, int]],
+                 pending_activations: Optional[dict[tuple['TerminalNode', Token], None]] = None):
+        super().__init__()
+        self.rule_template = rule_template
+        self.conditions = conditions
+        self.variable_sources = variable_sources
+        # When set, the new activations are added to it until they're pushed to the agenda (and are then considered
+        # as fired), see ReteNetwork.push_activations
+        self.pending_activations = pending_activations
+        # token -> has the activation already been fired
+        self.activations: dict[Token, bool] = {}
+
+    def left_activate(self, token: Token, is_added: bool):
+        if is_added:
+            self.activations[token] = self.pending_activations is not None
+            if self.pending_activations is not None:
+                self.pending_activations[(self, token)] = None
+        else:
+            self.activations.pop(token, None)
+            if self.pending_activations is not None:
+                # a later fact of the same batch can retract the activation (like excluded('a') after item('a') for
+                # "item(X) and not excluded(X)"): it must not be pushed
+                self.pending_activations.pop((self, token), None)
+
+    def get_variables_values(self, token: Token) -> dict[str, int]:
+        return {variable: token[token_index].symbol_ids[value_index]
+                for variable, (token_index, value_index) in self.variable_sources.items()}
+
+
+class ReteNetwork:
+    """
+    Incremental matcher: each rule template LHS is compiled into a network of alpha nodes (one per predicate
+    pattern) and beta nodes (joins, negations and tests) whose memories persist across evaluations.
+    When a fact is added to or removed from the context, only that fact goes through the network.
+    When an agenda is given, the new activations are pushed to it by push_activations() instead of being returned by
+    get_satisfied_rules(): like with the Evaluator, only the activations that still match when the engine steps are
+    pushed, whatever the order of the facts in a batch.
+
+    Only LHS that are a conjunction of predicates, negated predicates and tests are supported
+    (for example "not (op1(X) and op2(X))" is not)
+    """
+
+    def __init__(self, context: Context, agenda: Optional[Agenda] = None,
+                 rule_templates: Optional[list[RuleTemplate]] = None):
+        # only the given rule templates are compiled (all the rule templates of the context by default)
+        rule_templates = context.rule_templates if rule_templates is None else rule_templates
+        logging.debug(f">> nb rule_templates='{len(rule_templates)}'")
+        self.context = context
+        self.alpha_memories: dict[tuple, AlphaMemory] = {}
+        self.alpha_memories_by_name: dict[str, list[AlphaMemory]] = {}
+        self.terminal_nodes: dict[RuleTemplate, TerminalNode] = {}
+        self.agenda = agenda
+        # (terminal node, token) -> the activations that are not on the agenda yet (in the order they were found)
+        self.pending_activations: dict[tuple[TerminalNode, Token], None] = {}
+        roots = [self._build_rule_template(rule_template) for rule_template in rule_templates]
+        for root in roots:
+            root.propagate((), True)
+        for facts in context.facts_by_name.values():
+            self.facts_added(facts)
+        if agenda is not None:
+            # the facts already in the context are all loaded: their activations are pushed right away, in the order
+            # of the rule templates
+            for terminal_node in self.terminal_nodes.values():
+                terminal_node.pending_activations = self.pending_activations
+                for token in terminal_node.activations:
+                    terminal_node.activations[token] = True
+                    agenda.add(self.get_satisfied_rule(terminal_node, token))
+        context.fact_listeners.append(self)
+        logging.debug(f"<< nb alpha_memories='{len(self.alpha_memories)}'")
+
+    def _build_rule_template(self, rule_template: RuleTemplate) -> BetaNode:
+        """
+        Builds the beta nodes of a rule template and returns the root node (which must be activated with
+        the empty token)
+
+        Negations and tests are placed right after the positive condition that binds their last variable.
+        """
+        conditions = Condition.parse_conditions(rule_template.left_expression.expression)
+        positive_conditions = [condition for condition in conditions
+                               if condition.condition_type == ConditionType.POSITIVE]
+        positive_variables = set()
+        for condition in positive_conditions:
+            positive_variables.update(condition.variables)
+
+        root = BetaNode()
+        node = root
+        variable_sources: dict[str, tuple[int, int]] = {}
+        pending_conditions = [condition for condition in conditions
+                              if condition.condition_type != ConditionType.POSITIVE]
+        for token_index in range(len(positive_conditions) + 1):
+            # add the negations and tests whose variables are all bound
+            for condition in list(pending_conditions):
+                if (condition.variables & positive_variables) <= variable_sources.keys():
+                    pending_conditions.remove(condition)
+                    node = self._add_child(node, self._build_condition_node(condition, variable_sources))
+            if token_index == len(positive_conditions):
+                break
+            condition = positive_conditions[token_index]
+            join_node = self._build_join_node(JoinNode, condition.predicate, variable_sources)
+            node = self._add_child(node, join_node)
+            for value_index, value in enumerate(condition.predicate.values):
+                if Predicate.is_variable(value) and value not in variable_sources:
+                    variable_sources[value] = (token_index, value_index)
+        terminal_node = TerminalNode(rule_template, conditions, dict(variable_sources))
+        self._add_child(node, terminal_node)
+        self.terminal_nodes[rule_template] = terminal_node
+        return root
+
+    def _build_condition_node(self, condition: Condition, variable_sources: dict[str, tuple[int, int]]) -> BetaNode:
+        if condition.condition_type == ConditionType.NEGATIVE:
+            return self._build_join_node(NegativeNode, condition.predicate, variable_sources)
+        return TestNode(condition, dict(variable_sources))
+
+    def _build_join_node(self, cls, predicate: Predicate, variable_sources: dict[str, tuple[int, int]]) -> JoinNode:
+        key = AlphaMemory.get_key(predicate)
+        alpha_memory = self.alpha_memories.get(key)
+        if alpha_memory is None:
+            alpha_memory = AlphaMemory(predicate)
+            self.alpha_memories[key] = alpha_memory
+            self.alpha_memories_by_name.setdefault(predicate.name, []).append(alpha_memory)
+        left_sources, right_indexes = [], []
+        joined_variables = set()
+        for value_index, value in enumerate(predicate.values):
+            # a variable used several times in the predicate is checked by the alpha memory, so it's joined once
+            if value in variable_sources and value not in joined_variables:
+                joined_variables.add(value)
+                left_sources.append(variable_sources[value])
+                right_indexes.append(value_index)
+        return cls(alpha_memory, left_sources, right_indexes)
+
+    @staticmethod
+    def _add_child(parent: BetaNode, child: BetaNode) -> BetaNode:
+        parent.children.append(child)
+        return child
+
+    def facts_added(self, facts: list[Fact]):
+        for fact in facts:
+            for alpha_memory in self.alpha_memories_by_name.get(fact.name, ()):
+                if alpha_memory.matches(fact):
+                    alpha_memory.activate(fact, True)
+
+    def facts_removed(self, facts: list[Fact]):
+        for fact in facts:
+            for alpha_memory in self.alpha_memories_by_name.get(fact.name, ()):
+                if fact in alpha_memory.facts:
+                    alpha_memory.activate(fact, False)
+
+    def push_activations(self):
+        """
+        Pushes the activations found since the previous call to the agenda (the ones retracted in the meantime are
+        not pushed)
+        """
+        for terminal_node, token in self.pending_activations:
+            self.agenda.add(self.get_satisfied_rule(terminal_node, token))
+        self.pending_activations.clear()
+
+    def get_satisfied_rules(self, rule_template: RuleTemplate) -> list[SatisfiedRule]:
+        """
+        Returns the satisfied rules of the activations that haven't been fired yet, and marks them as fired
+        """
+        logging.debug(f">> rule_template={rule_template.name}")
+        terminal_node = self.terminal_nodes[rule_template]
+        tokens = [token for token, is_fired in terminal_node.activations.items() if not is_fired]
+        satisfied_rules = []
+        for token in tokens:
+            terminal_node.activations[token] = True
+            satisfied_rules.append(self.get_satisfied_rule(terminal_node, token))
+        logging.debug(f"<< returning nb satisfied rules='{len(satisfied_rules)}' for rule='{rule_template.name}'")
+        return satisfied_rules
+
+    @staticmethod
+    def get_satisfied_rule(terminal_node: TerminalNode, token: Token) -> SatisfiedRule:
+        rule_template = terminal_node.rule_template
+        variables_values = terminal_node.get_variables_values(token)
+        binding = rule_template.compiled_left_expression.get_binding(variables_values)
+        return SatisfiedRule(rule_template, token, binding)
+
+
+def _update_memory(memory: dict[tuple, dict], key: tuple, item, is_added: bool):
+    if is_added:
+        memory.setdefault(key, {})[item] = None
+    else:
+        items = memory[key]
+        del items[item]
+        if not items:
+            del memory[key]
@@ -0,0 +1,128 @@
+from typing import Optional
+import copyreg
+import hashlib
+import logging
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+import types
+
+from elements.action import ActionType
+from elements.condition import CompiledLeftExpression
+from elements.rule import RuleTemplate
+from elements.symbol import symbol_table
+from functions_handler import function_registry
+
+# Bumped when the format of the cache files changes
+CACHE_FORMAT_VERSION = 1
+# The modules that compile the rules: the cache files are invalidated when one of them changes
+_COMPILER_MODULES = ["action", "condition", "expression", "predicate", "rule", "symbol"]
+
+
+def get_engine_version() -> str:
+    """
+    The version of the compiled rule templates: the cache format version, the python version (the compiled LHS are
+    stored as python bytecode) and the source code of the modules that compile the rules
+    """
+    digest = hashlib.sha256(f"{CACHE_FORMAT_VERSION} {sys.version}".encode())
+    elements_dir = os.path.dirname(os.path.abspath(sys.modules[RuleTemplate.__module__].__file__))
+    for module in _COMPILER_MODULES:
+        with open(os.path.join(elements_dir, f"{module}.py"), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+def get_cache_path(rules: list[str], cache_dir: str) -> str:
+    # The key only depends on the rules: changing the facts or the goal of a configuration file keeps the cache
+    digest = hashlib.sha256(get_engine_version().encode())
+    for rule in rules:
+        digest.update(rule.encode())
+        digest.update(b"\n")
+    return os.path.join(cache_dir, f"{digest.hexdigest()}.ruleset")
+
+
+def load_rule_templates(rules: list[str], cache_dir: str) -> list[RuleTemplate]:
+    """
+    Returns the compiled rule templates of the rules, from the cache file of the rules if it exists
+    (otherwise the rules are parsed and the cache file is created for the next time)
+    """
+    logging.debug(f">> nb rules={len(rules)} cache_dir='{cache_dir}'")
+    cache_path = get_cache_path(rules, cache_dir)
+    rule_templates = None
+    if os.path.exists(cache_path):
+        try:
+            rule_templates = read_rule_templates(cache_path)
+        except Exception as error:
+            logging.warning(f"ignoring cache file='{cache_path}': {error!r}")
+    if rule_templates is None:
+        rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in rules]
+        write_rule_templates(rule_templates, cache_path)
+    logging.debug(f"<< cache_path='{cache_path}'")
+    return rule_templates
+
+
+def write_rule_templates(rule_templates: list[RuleTemplate], cache_path: str):
+    """
+    Writes freshly compiled rule templates (that have not been used yet) to a cache file:
+    - the values of the symbol table, in the order of their ids: the compiled LHS contain symbol ids
+    - the rule templates, where the compiled LHS functions are stored as bytecode
+    The file is written to a temporary file first, so that a reader never sees a partial file.
+    """
+    # the cache files are unpickled: only the user can write to a cache directory created here
+    os.makedirs(os.path.dirname(cache_path) or ".", mode=0o700, exist_ok=True)
+    file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            pickler = pickle.Pickler(file, pickle.HIGHEST_PROTOCOL)
+            pickler.dispatch_table = copyreg.dispatch_table.copy()
+            pickler.dispatch_table[CompiledLeftExpression] = _reduce_compiled_left_expression
+            pickler.dump(symbol_table.get_values(tuple(range(len(symbol_table)))))
+            pickler.dump(rule_templates)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def read_rule_templates(cache_path: str) -> Optional[list[RuleTemplate]]:
+    """
+    Reads the rule templates of a cache file, or returns None when they can't be used in this process:
+    the symbols of the cache file must have the same ids in the symbol table (which is the case when the
+    cache file is read before any other rule or fact is created, like when loading a configuration file)
+    """
+    with open(cache_path, 'rb') as file:
+        unpickler = pickle.Unpickler(file)
+        symbols = unpickler.load()
+        # the symbol table isn't changed before knowing that all the symbols can have their ids: the symbols that
+        # don't exist yet must come after the existing ones
+        nb_symbols = len(symbol_table)
+        if any(symbol_table.find_id(value) != symbol_id if symbol_id < nb_symbols
+               else symbol_table.find_id(value) is not None for symbol_id, value in enumerate(symbols)):
+            logging.debug(f"the symbol ids of cache file='{cache_path}' are already used")
+            return None
+        for value in symbols[nb_symbols:]:
+            symbol_table.get_id(value)
+        rule_templates: list[RuleTemplate] = unpickler.load()
+    for rule_template in rule_templates:
+        for action in rule_template.right_expression.actions:
+            if action.action_type == ActionType.FUNCTION and action.predicate.name not in function_registry:
+                raise Exception(f"Function '{action.predicate.name}' is not registered.")
+    return rule_templates
+
+
+def _reduce_compiled_left_expression(compiled_left_expression: CompiledLeftExpression):
+    return _load_compiled_left_expression, (
+        compiled_left_expression.expression, compiled_left_expression.positive_predicates,
+        compiled_left_expression.variables, marshal.dumps(compiled_left_expression.check.__code__),
+        compiled_left_expression.variable_positions, compiled_left_expression.checked_predicate_names,
+        compiled_left_expression.negated_predicate_names
+    )
+
+
+def _load_compiled_left_expression(expression, positive_predicates, variables, check_code, variable_positions,
+                                   checked_predicate_names, negated_predicate_names) -> CompiledLeftExpression:
+    check = types.FunctionType(marshal.loads(check_code), {"__builtins__": {}})
+    return CompiledLeftExpression(expression, positive_predicates, variables, check, variable_positions,
+                                  checked_predicate_names, negated_predicate_names)
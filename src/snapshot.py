@@ -0,0 +1,293 @@
+from array import array
+from typing import BinaryIO, Iterator, Optional
+import bisect
+import json
+import logging
+import mmap
+import struct
+import sys
+
+from elements.fact import Fact
+from elements.predicate import Predicate
+from elements.rule import SatisfiedRule
+from elements.symbol import symbol_table
+
+# File layout (see write_snapshot):
+# - header: MAGIC + the offset of the table of contents (unsigned 64 bits integer)
+# - the arrays (symbols, facts, indexes, satisfied rules), each one aligned on 8 bytes
+# - the table of contents: a JSON object with the offset and the length of each array
+MAGIC = b"YARESNAP"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<8sQ")
+# Number of facts written at once
+_CHUNK_SIZE = 65536
+
+
+def write_snapshot(context, file_path: str):
+    """
+    Writes the knowledge base of a context to a binary file:
+    - the symbol table: the UTF-8 encoded values, and the offset of each value
+    - the facts, grouped by (name, number of values) in the order they were added: one array of symbol ids per group
+      (+ the indexes of the facts sorted by values, used by Snapshot.get_matching_facts())
+    - the satisfied rules of each rule template: their binding and their facts (as (group, fact index) pairs)
+    - the goal and the rules (a snapshot with satisfied rules can only be restored with the same rules)
+    """
+    logging.debug(f">> file_path='{file_path}'")
+    with open(file_path, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, 0))
+        toc = {"version": SNAPSHOT_VERSION, "byteorder": sys.byteorder, "goal": None,
+               "rules": [rule_template.rule for rule_template in context.rule_templates]}
+
+        values = [value.encode() for value in symbol_table.get_values(tuple(range(len(symbol_table))))]
+        offsets = array('Q', [0])
+        for value in values:
+            offsets.append(offsets[-1] + len(value))
+        toc["symbols"] = {"count": len(values), "offsets": _write_array(file, offsets), "data": _write_bytes(file, b"".join(values))}
+        del values
+
+        groups: dict[tuple[str, int], list[Fact]] = {}
+        for name, facts in context.facts_by_name.items():
+            for fact in facts:
+                groups.setdefault((name, len(fact.symbol_ids)), []).append(fact)
+        toc["groups"] = []
+        fact_positions: dict[Fact, tuple[int, int]] = {}
+        for group_index, ((name, arity), facts) in enumerate(groups.items()):
+            offset = _write_facts(file, facts)
+            sorted_indexes = array('I', sorted(range(len(facts)), key=lambda index: facts[index].symbol_ids))
+            toc["groups"].append({"name": name, "arity": arity, "count": len(facts), "facts": offset,
+                                  "sorted_indexes": _write_array(file, sorted_indexes)})
+            fact_positions.update((fact, (group_index, index)) for index, fact in enumerate(facts))
+        if context.goal is not None:
+            toc["goal"] = [context.goal.name, list(context.goal.symbol_ids)]
+
+        toc["rule_templates"] = []
+        for rule_template in context.rule_templates:
+            # the satisfied rules are sorted so that the file doesn't depend on the hash values
+            satisfied_rules = sorted(rule_template.satisfied_rules,
+                                     key=lambda satisfied_rule: [fact_positions[fact] for fact in satisfied_rule.facts])
+            items = array('I')
+            for satisfied_rule in satisfied_rules:
+                items.extend(satisfied_rule.binding)
+                for fact in satisfied_rule.facts:
+                    items.extend(fact_positions[fact])
+            is_evaluated = not rule_template.evaluate and rule_template.delta_facts == {}
+            toc["rule_templates"].append({"count": len(satisfied_rules), "satisfied_rules": _write_array(file, items),
+                                          "is_evaluated": is_evaluated})
+
+        toc_offset = file.tell()
+        file.write(json.dumps(toc).encode())
+        file.seek(0)
+        file.write(_HEADER.pack(MAGIC, toc_offset))
+    logging.debug(f"<< nb facts={len(fact_positions)}")
+
+
+def read_snapshot(context, file_path: str):
+    """
+    Restores a knowledge base written by write_snapshot() into a context (its facts are replaced):
+    - the facts are decoded from the memory mapped file (without parsing), and the indexes are rebuilt
+    - the satisfied rules and the evaluation state of the rule templates are restored, so that running the engine
+      again only fires what wasn't fired yet (the context must have the same rules as the snapshot)
+    The snapshot must be taken when the agenda is empty (for example after RuleEngine.run()): the activations that
+    were not fired yet are not part of the snapshot.
+    The snapshot must be restored before creating the engine: the state of its matcher and of its agenda would be
+    stale. The previous satisfied rules of the context are cleared.
+    """
+    logging.debug(f">> file_path='{file_path}'")
+    if context.fact_listeners:
+        raise Exception(f"Can't restore snapshot='{file_path}' into a context with fact listeners='"
+                        f"{context.fact_listeners}': restore it before creating the engine")
+    with Snapshot(file_path) as snapshot:
+        has_satisfied_rules = any(item["count"] for item in snapshot.toc["rule_templates"])
+        has_same_rules = [rule_template.rule for rule_template in context.rule_templates] == snapshot.toc["rules"]
+        if has_satisfied_rules and not has_same_rules:
+            raise Exception(f"The rules of snapshot='{file_path}' are not the rules of the context")
+        # all the symbols are converted at once
+        snapshot.load_symbols()
+        group_facts: list[list[Fact]] = []
+        context.set_facts([])
+        for group_index in range(len(snapshot.toc["groups"])):
+            group_facts.append(list(snapshot.get_group_facts(group_index)))
+            context.load_facts(group_facts[-1])
+        if snapshot.toc["goal"] is not None:
+            name, symbol_ids = snapshot.toc["goal"]
+            context.goal = Fact.from_symbol_ids(name, snapshot.get_symbol_ids(symbol_ids))
+        if not has_same_rules:
+            logging.debug(f"<< nb facts={len(context.facts)} (the rules are evaluated again)")
+            return
+        for rule_template, item in zip(context.rule_templates, snapshot.toc["rule_templates"]):
+            binding_size = len(rule_template.compiled_left_expression.variables)
+            nb_facts = len(rule_template.compiled_left_expression.positive_predicates)
+            items = snapshot.get_array(item["satisfied_rules"], 'I')
+            record_size = binding_size + 2 * nb_facts
+            for start in range(0, item["count"] * record_size, record_size):
+                binding = snapshot.get_symbol_ids(items[start:start + binding_size])
+                positions = items[start + binding_size:start + record_size].tolist()
+                satisfied_facts = tuple(group_facts[positions[index]][positions[index + 1]]
+                                        for index in range(0, 2 * nb_facts, 2))
+                context.add_satisfied_rule(SatisfiedRule(rule_template, satisfied_facts, binding))
+            if item["is_evaluated"]:
+                # the snapshot was taken after the rule template was evaluated: only the new facts need to be matched
+                rule_template.evaluate = False
+                rule_template.delta_facts = {}
+    logging.debug(f"<< nb facts={len(context.facts)}")
+
+
+class Snapshot:
+    """
+    A snapshot file, memory mapped: the facts can be queried without restoring the knowledge base
+    (the operating system only reads the parts of the file that are used)
+
+    with Snapshot("kb.snapshot") as snapshot:
+        for fact in snapshot.get_matching_facts(Predicate.parse("parent('george',X)")):
+            ...
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        with open(file_path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # the memory views on the file, released by close()
+        self._views: list[memoryview] = []
+        magic, toc_offset = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise Exception(f"Invalid snapshot file='{file_path}'")
+        self.toc = json.loads(self._mmap[toc_offset:])
+        if self.toc["version"] != SNAPSHOT_VERSION or self.toc["byteorder"] != sys.byteorder:
+            raise Exception(f"Unsupported snapshot file='{file_path}' (version={self.toc['version']})")
+        symbols = self.toc["symbols"]
+        self._symbol_offsets = self.get_array(symbols["offsets"], 'Q')
+        self._symbol_data = symbols["data"][0]
+        # symbol id in the file -> symbol id in the symbol table (None until the symbol is used)
+        self._symbol_ids: list[Optional[int]] = [None] * symbols["count"]
+        # value -> symbol id in the file (only built by get_matching_facts())
+        self._file_symbol_ids: Optional[dict[str, int]] = None
+        self._groups_by_name: dict[tuple[str, int], int] = {
+            (group["name"], group["arity"]): index for index, group in enumerate(self.toc["groups"])
+        }
+
+    def __len__(self):
+        return sum(group["count"] for group in self.toc["groups"])
+
+    def get_array(self, location: list[int], typecode: str) -> memoryview:
+        offset, length = location
+        view = memoryview(self._mmap)[offset:offset + length].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def get_symbol_ids(self, file_symbol_ids) -> tuple[int, ...]:
+        # The symbol ids of the file are converted into the symbol ids of the symbol table
+        symbol_ids = self._symbol_ids
+        result = []
+        for file_symbol_id in file_symbol_ids:
+            symbol_id = symbol_ids[file_symbol_id]
+            if symbol_id is None:
+                symbol_id = symbol_ids[file_symbol_id] = symbol_table.get_id(self._get_value(file_symbol_id))
+            result.append(symbol_id)
+        return tuple(result)
+
+    def get_group_facts(self, group_index: int, indexes: Optional[Iterator[int]] = None) -> Iterator[Fact]:
+        group = self.toc["groups"][group_index]
+        name, arity = sys.intern(group["name"]), group["arity"]
+        symbol_ids = self.get_array(group["facts"], 'I')
+        if indexes is None and None not in self._symbol_ids:
+            # all the symbols are already converted: the whole group is converted at once
+            all_symbol_ids = list(map(self._symbol_ids.__getitem__, symbol_ids))
+            fact_symbol_ids = zip(*[iter(all_symbol_ids)] * arity) if arity else (() for _ in range(group["count"]))
+            yield from (Fact.from_symbol_ids(name, values) for values in fact_symbol_ids)
+            return
+        for index in (range(group["count"]) if indexes is None else indexes):
+            yield Fact.from_symbol_ids(name, self.get_symbol_ids(symbol_ids[index * arity:(index + 1) * arity]))
+
+    def load_symbols(self):
+        """
+        Converts all the symbols of the file at once (instead of when they're used)
+        """
+        data = self._mmap[self._symbol_data:self._symbol_data + self.toc["symbols"]["data"][1]]
+        offsets = self._symbol_offsets.tolist()
+        values = [data[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+        self._symbol_ids = list(map(symbol_table.get_id, values))
+
+    def facts(self) -> Iterator[Fact]:
+        for group_index in range(len(self.toc["groups"])):
+            yield from self.get_group_facts(group_index)
+
+    def get_matching_facts(self, predicate: Predicate) -> Iterator[Fact]:
+        """
+        Returns the facts matching the constants of a predicate, lazily
+        -> when the first values of the predicate are constants, the matching facts are found by a binary search
+        """
+        group_index = self._groups_by_name.get((predicate.name, len(predicate.symbol_ids)))
+        if group_index is None:
+            return
+        if self._file_symbol_ids is None:
+            self._file_symbol_ids = {self._get_value(file_symbol_id): file_symbol_id
+                                     for file_symbol_id in range(len(self._symbol_ids))}
+        constants: list[Optional[int]] = []
+        for value, symbol_id in zip(predicate.values, predicate.symbol_ids):
+            if symbol_table.is_constant(symbol_id):
+                file_symbol_id = self._file_symbol_ids.get(value)
+                if file_symbol_id is None:
+                    return  # no fact uses that value
+                constants.append(file_symbol_id)
+            else:
+                constants.append(None)
+        group = self.toc["groups"][group_index]
+        arity = group["arity"]
+        symbol_ids = self.get_array(group["facts"], 'I')
+        sorted_indexes = self.get_array(group["sorted_indexes"], 'I')
+        prefix = []
+        for constant in constants:
+            if constant is None:
+                break
+            prefix.append(constant)
+        # the facts whose first values are the constants of the predicate are contiguous in the sorted indexes
+        key = lambda index: list(symbol_ids[index * arity:index * arity + len(prefix)])
+        start = bisect.bisect_left(sorted_indexes, prefix, key=key)
+        end = bisect.bisect_right(sorted_indexes, prefix, key=key)
+        indexes = (index for index in map(sorted_indexes.__getitem__, range(start, end))
+                   if all(constant is None or constant == symbol_ids[index * arity + position]
+                          for position, constant in enumerate(constants)))
+        yield from self.get_group_facts(group_index, indexes)
+
+    def _get_value(self, file_symbol_id: int) -> str:
+        start = self._symbol_data + self._symbol_offsets[file_symbol_id]
+        end = self._symbol_data + self._symbol_offsets[file_symbol_id + 1]
+        return self._mmap[start:end].decode()
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _write_facts(file: BinaryIO, facts: list[Fact]) -> list[int]:
+    _align(file)
+    offset = file.tell()
+    for start in range(0, len(facts), _CHUNK_SIZE):
+        symbol_ids = array('I')
+        for fact in facts[start:start + _CHUNK_SIZE]:
+            symbol_ids.extend(fact.symbol_ids)
+        symbol_ids.tofile(file)
+    return [offset, file.tell() - offset]
+
+
+def _write_array(file: BinaryIO, items: array) -> list[int]:
+    return _write_bytes(file, items.tobytes())
+
+
+def _write_bytes(file: BinaryIO, data: bytes) -> list[int]:
+    _align(file)
+    offset = file.tell()
+    file.write(data)
+    return [offset, len(data)]
+
+
+def _align(file: BinaryIO):
+    file.write(b"\0" * (-file.tell() % 8))
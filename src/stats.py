@@ -0,0 +1,110 @@
+from typing import Optional
+import json
+
+from elements.rule import RuleTemplate
+
+
+class RuleStats:
+    """
+    The counters of a rule template during a run:
+    - evaluations: how many times the rule template was evaluated by the Evaluator
+    - candidates: the combinations of facts matching its positive predicates, each one checked by the compiled LHS
+    - satisfied_rules: the candidates that satisfied the LHS (and were not already satisfied)
+    - firings, added_facts, removed_facts: its fired activations, and the facts they actually added/removed
+    - matching_time, actions_time, callbacks_time: the cumulative time (in seconds) spent evaluating the rule template,
+      processing its "add:"/"remove:" actions (including the matching done by the Rete network), and calling its
+      functions (only the time to submit them for the functions running in a pool or as asyncio tasks)
+    """
+
+    COUNTERS = ["evaluations", "candidates", "satisfied_rules", "firings", "added_facts", "removed_facts"]
+    TIMES = ["matching_time", "actions_time", "callbacks_time"]
+
+    def __init__(self, name: str):
+        self.name = name
+        self.evaluations = 0
+        self.candidates = 0
+        self.satisfied_rules = 0
+        self.firings = 0
+        self.added_facts = 0
+        self.removed_facts = 0
+        self.matching_time = 0.0
+        self.actions_time = 0.0
+        self.callbacks_time = 0.0
+
+    @property
+    def total_time(self) -> float:
+        return self.matching_time + self.actions_time + self.callbacks_time
+
+    def to_dict(self) -> dict:
+        result = {"name": self.name}
+        result.update((counter, getattr(self, counter)) for counter in self.COUNTERS)
+        result.update((time_name, round(getattr(self, time_name), 6)) for time_name in self.TIMES + ["total_time"])
+        return result
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return f"<{self.__class__.__name__} name='{self.name}' firings={self.firings} total_time={self.total_time:.6f}>"
+
+
+class EngineStats:
+    """
+    The RuleStats of the rule templates of an engine (see RuleEngine(collect_stats=True) and RuleEngine.stats()),
+    to find the rules that are the most expensive:
+    print(engine.stats().to_text(sort_by="candidates", limit=10))
+    """
+
+    def __init__(self, rule_templates: list[RuleTemplate]):
+        # in the order of the rule templates
+        self.rule_stats: dict[RuleTemplate, RuleStats] = {rule_template: RuleStats(rule_template.name)
+                                                          for rule_template in rule_templates}
+
+    def get(self, rule_template: RuleTemplate) -> RuleStats:
+        rule_stats = self.rule_stats.get(rule_template)
+        if rule_stats is None:
+            # a rule template that was added to the context after the engine was created
+            rule_stats = self.rule_stats[rule_template] = RuleStats(rule_template.name)
+        return rule_stats
+
+    def add_evaluation(self, rule_template: RuleTemplate, nb_satisfied_rules: int, matching_time: float):
+        rule_stats = self.get(rule_template)
+        rule_stats.evaluations += 1
+        rule_stats.satisfied_rules += nb_satisfied_rules
+        rule_stats.matching_time += matching_time
+
+    def add_firing(self, firing, actions_time: float, callbacks_time: float):
+        rule_stats = self.get(firing.satisfied_rule.rule_template)
+        rule_stats.firings += 1
+        rule_stats.added_facts += len(firing.added_facts)
+        rule_stats.removed_facts += len(firing.removed_facts)
+        rule_stats.actions_time += actions_time
+        rule_stats.callbacks_time += callbacks_time
+
+    def get_sorted(self, sort_by: str = "total_time", limit: Optional[int] = None) -> list[RuleStats]:
+        """
+        Returns the RuleStats from the highest value of sort_by (a counter, a time or "total_time") to the lowest
+        """
+        if sort_by not in RuleStats.COUNTERS + RuleStats.TIMES + ["total_time"]:
+            raise Exception(f"Invalid sort_by='{sort_by}'")
+        result = sorted(self.rule_stats.values(), key=lambda rule_stats: getattr(rule_stats, sort_by), reverse=True)
+        return result[:limit] if limit is not None else result
+
+    def to_json(self, sort_by: str = "total_time", limit: Optional[int] = None) -> str:
+        return json.dumps([rule_stats.to_dict() for rule_stats in self.get_sorted(sort_by, limit)], indent=2)
+
+    def to_text(self, sort_by: str = "total_time", limit: Optional[int] = None) -> str:
+        """
+        Returns a table with one line per rule template, like:
+        rule        evaluations  candidates  satisfied_rules  firings  ...  total_time
+        rule1                3          12                4        4  ...    0.000311
+        """
+        columns = ["rule"] + RuleStats.COUNTERS + RuleStats.TIMES + ["total_time"]
+        rows = [[rule_stats.name] + [str(getattr(rule_stats, counter)) for counter in RuleStats.COUNTERS] +
+                [f"{getattr(rule_stats, time_name):.6f}" for time_name in RuleStats.TIMES + ["total_time"]]
+                for rule_stats in self.get_sorted(sort_by, limit)]
+        widths = [max(len(row[index]) for row in [columns] + rows) for index in range(len(columns))]
+        lines = ["  ".join(value.ljust(width) if index == 0 else value.rjust(width)
+                           for index, (value, width) in enumerate(zip(row, widths)))
+                 for row in [columns] + rows]
+        return "\n".join(lines)
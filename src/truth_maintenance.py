@@ -0,0 +1,159 @@
+import logging
+
+from context import Context
+from elements.action import ActionType
+from elements.fact import Fact
+from elements.predicate import Predicate
+from elements.rule import SatisfiedRule
+
+
+class TruthMaintenance:
+    """
+    Justification based truth maintenance: the facts derived by the rules are removed when they are not supported
+    anymore, for example grand_parent('george','larry') is removed when parent('george','john') is removed.
+
+    - each derived fact is justified by the satisfied rules that added it: a justification stays valid as long as
+      none of its LHS predicates (like parent('george','john') or "not man('george')") is added or removed
+    - the facts that are not derived by a rule (like the facts of the configuration file) are never removed
+    - when justifications become invalid, the facts are retracted in two passes (aka DRed):
+      1. over-delete: the facts justified by the invalid justifications, and the ones derived from them, are suspects
+      2. re-derive: a suspect fact that still has a justification that doesn't use a suspect fact is kept
+      -> the remaining suspects are removed from the knowledge base, and the cost only depends on the
+         justifications using the changed facts (a cycle like path('a','b') <-> path('b','a') is removed as well)
+    - a fact added by a rule that removes one of its own LHS facts (like the "move" rule of config/maze.ini) is a
+      new state rather than a consequence: it is not justified, so it is never removed
+
+    The removed derived facts can be derived again by another rule: their rules are evaluated again, like for any
+    other removed fact.
+    """
+
+    def __init__(self, context: Context):
+        self.context = context
+        # derived fact -> the satisfied rules that justify it
+        self._justifications: dict[Fact, dict[SatisfiedRule, None]] = {}
+        # satisfied rule -> the derived facts it justifies
+        self._justified_facts: dict[SatisfiedRule, list[Fact]] = {}
+        # LHS predicate (like "op1('foo')" for "not op1('foo')") -> the satisfied rules that use it in a justification
+        self._satisfied_rules_by_predicate: dict[Predicate, dict[SatisfiedRule, None]] = {}
+        # set while the unsupported facts are removed: those changes are already handled
+        self._is_retracting = False
+        context.fact_listeners.append(self)
+
+    def is_derived(self, fact: Fact) -> bool:
+        return fact in self._justifications
+
+    def get_justifications(self, fact: Fact) -> list[SatisfiedRule]:
+        return list(self._justifications.get(fact, ()))
+
+    def is_supported(self, satisfied_rule: SatisfiedRule) -> bool:
+        """
+        Returns True if the facts of a satisfied rule are still in the knowledge base, and its negated predicates
+        still don't match any fact (an activation stays on the agenda even if one of its facts is removed)
+        """
+        facts = self.context.facts
+        return all(fact in facts for fact in satisfied_rule.facts) and \
+            not any(predicate in facts for predicate in satisfied_rule.left_predicates
+                    if predicate not in satisfied_rule.facts)
+
+    def add_justifications(self, satisfied_rule: SatisfiedRule, added_facts: list[Fact]):
+        """
+        Records the justifications of a fired satisfied rule:
+        - the facts that it added are derived facts
+        - the facts of its "add:" actions that were already derived get another justification
+        """
+        if not self.is_supported(satisfied_rule):
+            logging.debug(f"satisfied rule='{satisfied_rule}' removed its own facts: its facts are not justified")
+            return
+        justified_facts = list(added_facts)
+        for action in satisfied_rule.actions:
+            if action.action_type == ActionType.ADD and action.predicate in self._justifications and \
+                    action.predicate not in justified_facts:
+                justified_facts.append(action.predicate)
+        if not justified_facts:
+            return
+        self._justified_facts.setdefault(satisfied_rule, []).extend(justified_facts)
+        for fact in justified_facts:
+            self._justifications.setdefault(fact, {})[satisfied_rule] = None
+        for predicate in satisfied_rule.left_predicates:
+            self._satisfied_rules_by_predicate.setdefault(predicate, {})[satisfied_rule] = None
+
+    def set_base_facts(self, facts: list[Fact]):
+        """
+        The facts asserted explicitly are not derived anymore (even if a rule added them first)
+        """
+        self._forget_facts(facts)
+
+    def _forget_facts(self, facts: list[Fact]):
+        for fact in facts:
+            for satisfied_rule in self._justifications.pop(fact, ()):
+                self._justified_facts[satisfied_rule].remove(fact)
+                if not self._justified_facts[satisfied_rule]:
+                    self._remove_justification(satisfied_rule)
+
+    def facts_added(self, facts: list[Fact]):
+        # an added fact invalidates the justifications where it is negated
+        self._on_facts_changed(facts)
+
+    def facts_removed(self, facts: list[Fact]):
+        # a removed fact invalidates the justifications that use it (and it doesn't need to be justified anymore)
+        if not self._is_retracting:
+            self._forget_facts(facts)
+        self._on_facts_changed(facts)
+
+    def _on_facts_changed(self, facts: list[Fact]):
+        if self._is_retracting:
+            return
+        invalid_satisfied_rules: dict[SatisfiedRule, None] = {}
+        for fact in facts:
+            invalid_satisfied_rules.update(dict.fromkeys(self._satisfied_rules_by_predicate.get(fact, ())))
+        if invalid_satisfied_rules:
+            self._retract(list(invalid_satisfied_rules))
+
+    def _retract(self, invalid_satisfied_rules: list[SatisfiedRule]):
+        logging.debug(f">> nb invalid justifications={len(invalid_satisfied_rules)}")
+        # 1. over-delete
+        suspects: dict[Fact, None] = {}
+        for satisfied_rule in invalid_satisfied_rules:
+            suspects.update(dict.fromkeys(self._remove_justification(satisfied_rule)))
+        facts_to_check = list(suspects)
+        while facts_to_check:
+            fact = facts_to_check.pop()
+            for satisfied_rule in self._satisfied_rules_by_predicate.get(fact, ()):
+                for justified_fact in self._justified_facts[satisfied_rule]:
+                    if justified_fact not in suspects:
+                        suspects[justified_fact] = None
+                        facts_to_check.append(justified_fact)
+        # 2. re-derive
+        facts_to_check = list(suspects)
+        while facts_to_check:
+            fact = facts_to_check.pop()
+            if fact in suspects and any(all(lhs_fact not in suspects for lhs_fact in satisfied_rule.facts)
+                                        for satisfied_rule in self._justifications.get(fact, ())):
+                del suspects[fact]
+                for satisfied_rule in self._satisfied_rules_by_predicate.get(fact, ()):
+                    facts_to_check.extend(self._justified_facts[satisfied_rule])
+        # the justifications using the removed facts are not valid anymore
+        for fact in suspects:
+            for satisfied_rule in list(self._satisfied_rules_by_predicate.get(fact, ())):
+                self._remove_justification(satisfied_rule)
+            self._justifications.pop(fact, None)
+        self._is_retracting = True
+        try:
+            self.context.remove_facts([fact for fact in suspects if fact in self.context.facts])
+        finally:
+            self._is_retracting = False
+        logging.debug(f"<< nb retracted facts={len(suspects)}")
+
+    def _remove_justification(self, satisfied_rule: SatisfiedRule) -> list[Fact]:
+        justified_facts = self._justified_facts.pop(satisfied_rule, [])
+        for fact in justified_facts:
+            justifications = self._justifications.get(fact)
+            if justifications is not None:
+                justifications.pop(satisfied_rule, None)
+        for predicate in satisfied_rule.left_predicates:
+            satisfied_rules = self._satisfied_rules_by_predicate.get(predicate)
+            if satisfied_rules is not None:
+                satisfied_rules.pop(satisfied_rule, None)
+                if not satisfied_rules:
+                    del self._satisfied_rules_by_predicate[predicate]
+        return justified_facts
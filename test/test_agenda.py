@@ -0,0 +1,86 @@
+import copy
+
+from agenda import Agenda, AgendaStrategy
+from elements.fact import Fact
+from engine import RuleEngine
+from context import Context
+from elements.rule import RuleTemplate
+from evaluator import Evaluator
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestAgenda(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    def test_strategies(self):
+        expected_orders = {
+            AgendaStrategy.SALIENCE: ["op1('a')", "op2('b')", "op2('c')"],
+            AgendaStrategy.DEPTH: ["op2('c')", "op1('a')", "op2('b')"],
+            AgendaStrategy.BREADTH: ["op2('b')", "op1('a')", "op2('c')"],
+            # op2('c') is the most recent fact, the other facts are older than the agenda
+            AgendaStrategy.RECENCY: ["op2('c')", "op1('a')", "op2('b')"],
+        }
+        for strategy, expected_order in expected_orders.items():
+            context = Context()
+            context.rule_templates = [
+                RuleTemplate.parse_rule_template("rule1:op1(X) => add:op3(X)"),
+                RuleTemplate.parse_rule_template("rule2:op2(X) => add:op3(X)"),
+            ]
+            context.set_facts([Fact.parse("op2('b')"), Fact.parse("op1('a')")])
+            agenda = Agenda(context, strategy)
+            context.add_facts([Fact.parse("op2('c')")])
+            rule1_activations = Evaluator(context).evaluate(context.rule_templates[0])
+            rule2_activations = Evaluator(context).evaluate(context.rule_templates[1])
+            # the activations are added in that order: op2('b'), op1('a'), op2('c')
+            activations = [rule2_activations[0], rule1_activations[0], rule2_activations[1]]
+            for activation in activations + activations:  # an activation is only added once
+                agenda.add(activation)
+            self.assertEqual(len(agenda), 3)
+            self.assertEqual([agenda.pop().facts[0].to_string() for _ in range(3)], expected_order, strategy)
+            self.assertFalse(agenda)
+
+        # a higher salience is fired first
+        context.rule_templates[1].salience = 10
+        agenda = Agenda(context)
+        for activation in activations:
+            agenda.add(activation)
+        self.assertEqual(agenda.pop().name, "rule2")
+        self.assertEqual(agenda.pop().name, "rule2")
+        self.assertEqual(agenda.pop().name, "rule1")
+
+    def test_engine(self):
+        # with the depth-first strategy, rule2 is fired before rule1: b('x') already exists when rule3 is evaluated
+        rule_templates = [
+            RuleTemplate.parse_rule_template("rule1:go(X) => add:a(X)"),
+            RuleTemplate.parse_rule_template("rule2:go(X) => add:b(X)"),
+            RuleTemplate.parse_rule_template("rule3:a(X) and not b(X) => add:a_first(X)"),
+        ]
+        expected_results = {
+            AgendaStrategy.SALIENCE: True, AgendaStrategy.DEPTH: False,
+            AgendaStrategy.BREADTH: True, AgendaStrategy.RECENCY: True,
+        }
+        for use_rete in (False, True):
+            for strategy, expected_result in expected_results.items():
+                context = Context()
+                context.rule_templates = copy.deepcopy(rule_templates)
+                context.set_facts([Fact.parse("go('x')")])
+                context.goal = Fact.parse("a_first('x')")
+                self.assertEqual(RuleEngine(context, use_rete=use_rete, strategy=strategy).run(), expected_result)
+                self.assertIn(Fact.parse("b('x')"), context.facts)
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import asyncio
+import copy
+
+from async_engine import AsyncRuleEngine
+from elements.fact import Fact
+from engine import RuleEngine
+from context import Context
+from elements.rule import RuleTemplate
+from functions_handler import register_function
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+calls = []
+started = []
+in_flight = {"current": 0, "max": 0}
+
+
+@register_function()
+async def async_notify(rule_name, *args):
+    in_flight["current"] += 1
+    in_flight["max"] = max(in_flight["max"], in_flight["current"])
+    await asyncio.sleep(0.01)
+    calls.append(args)
+    in_flight["current"] -= 1
+
+
+@register_function()
+async def async_record(rule_name, *args):
+    started.append(args)
+    await asyncio.sleep(0)
+
+
+@register_function()
+async def async_fail(rule_name, *args):
+    raise ValueError(f"failed for {args}")
+
+
+class TestAsyncEngine(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    def _get_context(self, rule_templates: list[RuleTemplate]) -> Context:
+        context = Context()
+        context.rule_templates = copy.deepcopy(rule_templates)
+        context.set_facts([Fact.parse(f"parent('p{i}','p{i + 1}')") for i in range(10)])
+        context.goal = Fact.parse("grand_parent('p0','p2')")
+        return context
+
+    def test_run(self):
+        rule_templates = [
+            RuleTemplate.parse_rule_template(
+                "rule:parent(A,B) and parent(B,C) => add:grand_parent(A,C), function:async_notify(A,C)")
+        ]
+        calls.clear()
+        context = self._get_context(rule_templates)
+        self.assertTrue(AsyncRuleEngine(context, max_in_flight=3).run())
+        # all the callbacks are awaited before run() returns, with at most 3 of them at the same time
+        self.assertEqual(len(calls), 9)
+        self.assertEqual(in_flight["max"], 3)
+        # the facts are the same as with the synchronous engine (which awaits each callback right away)
+        sync_context = self._get_context(rule_templates)
+        self.assertTrue(RuleEngine(sync_context).run())
+        self.assertEqual(context.facts, sync_context.facts)
+        self.assertEqual(len(calls), 18)
+
+    def test_errors(self):
+        rule_templates = [
+            RuleTemplate.parse_rule_template(
+                "rule:parent(A,B) and parent(B,C) => function:async_fail(A,C), add:grand_parent(A,C)")
+        ]
+        context = self._get_context(rule_templates)
+        engine = AsyncRuleEngine(context, use_rete=True)
+        # the exception is raised at the barrier, once all the facts have been added
+        self.assertRaises(ValueError, engine.run)
+        self.assertEqual(len(context.facts_by_name["grand_parent"]), 9)
+
+    def test_concurrent_callbacks(self):
+        rule_templates = [
+            RuleTemplate.parse_rule_template(
+                "rule:parent(A,B) and parent(B,C) => add:grand_parent(A,C), function:async_record(A,C)")
+        ]
+        started.clear()
+        context = self._get_context(rule_templates)
+        context.goal = None
+        engine = AsyncRuleEngine(context)
+
+        async def run() -> list[int]:
+            # the number of started callbacks after each firing
+            return [len(started) async for _ in engine.run_until_quiescent_async()]
+
+        nb_started = asyncio.run(run())
+        self.assertEqual(len(nb_started), 9)
+        # the callbacks start while the engine is still firing, not only at the final barrier
+        self.assertGreater(nb_started[-1], 0)
+        self.assertEqual(len(started), 9)
+
+    def test_sync_engine_in_event_loop(self):
+        rule_templates = [
+            RuleTemplate.parse_rule_template(
+                "rule:parent(A,B) and parent(B,C) => add:grand_parent(A,C), function:async_record(A,C)")
+        ]
+        context = self._get_context(rule_templates)
+
+        async def run():
+            # the synchronous engine can't await a coroutine function inside a running event loop
+            RuleEngine(context).run()
+
+        with self.assertRaises(Exception) as error:
+            asyncio.run(run())
+        self.assertIn("use AsyncRuleEngine", str(error.exception))
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
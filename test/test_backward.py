@@ -0,0 +1,93 @@
+from backward import BackwardChainer
+from context import Context
+from elements.fact import Fact
+from elements.predicate import Predicate
+from elements.rule import RuleTemplate
+from engine import RuleEngine
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestBackward(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    @staticmethod
+    def _get_context(rules: list[str], facts: list[str]) -> Context:
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in rules]
+        context.set_facts([Fact.parse(fact) for fact in facts])
+        return context
+
+    def test_query(self):
+        context = self._get_context(
+            ["rule1:parent(A,B) and parent(B,C) => add:grand_parent(A,C)",
+             "rule2:grand_parent(A,B) and not man(A) => add:grand_mother(A,B)"],
+            ["parent('sophia','john')", "parent('john','larry')", "parent('george','john')", "man('george')"])
+        chainer = BackwardChainer(context)
+        self.assertEqual([Fact.parse("grand_mother('sophia','larry')")],
+                         list(chainer.query(Predicate.parse("grand_mother(X,Y)"))))
+        self.assertEqual({Fact.parse("grand_parent('sophia','larry')"), Fact.parse("grand_parent('george','larry')")},
+                         set(chainer.query(Predicate.parse("grand_parent(X,'larry')"))))
+        self.assertEqual([], list(chainer.query(Predicate.parse("grand_mother('george',X)"))))
+        self.assertTrue(chainer.is_derivable(Fact.parse("parent('john','larry')")))
+        self.assertFalse(chainer.is_derivable(Fact.parse("grand_parent('john','larry')")))
+        # the answers are not added to the knowledge base
+        self.assertEqual(4, len(context.facts))
+
+    def test_query_recursive_rules(self):
+        # left recursion + a cycle in the facts: the tabling makes the query terminate
+        rules = ["rule1:edge(A,B) => add:path(A,B)",
+                 "rule2:path(A,B) and edge(B,C) => add:path(A,C)"]
+        facts = ["edge('a','b')", "edge('b','c')", "edge('c','a')", "edge('c','d')", "edge('e','a')"]
+        chainer = BackwardChainer(self._get_context(rules, facts))
+        self.assertEqual({"'a'", "'b'", "'c'", "'d'"},
+                         {fact.values[1] for fact in chainer.query(Predicate.parse("path('a',X)"))})
+        self.assertEqual({"'a'", "'b'", "'c'"}, {fact.values[0] for fact in chainer.query(Predicate.parse("path(X,X)"))})
+        self.assertFalse(chainer.is_derivable(Fact.parse("path('d','a')")))
+        # same answers as the forward chaining
+        context = self._get_context(rules, facts)
+        RuleEngine(context).run()
+        self.assertEqual({fact for fact in context.facts if fact.name == "path"},
+                         set(chainer.query(Predicate.parse("path(X,Y)"))))
+
+    def test_query_tests_and_negations(self):
+        chainer = BackwardChainer(self._get_context(
+            ["rule1:parent(A,B) and parent(A,C) and B!=C => add:sibling(B,C)",
+             "rule2:sibling(A,B) and not man(A) => add:sister(A,B)"],
+            ["parent('p','a')", "parent('p','b')", "parent('p','c')", "man('a')"]))
+        self.assertEqual(6, len(list(chainer.query(Predicate.parse("sibling(X,Y)")))))
+        self.assertEqual({Fact.parse("sister('b','a')"), Fact.parse("sister('b','c')"),
+                          Fact.parse("sister('c','a')"), Fact.parse("sister('c','b')")},
+                         set(chainer.query(Predicate.parse("sister(X,Y)"))))
+
+    def test_query_errors(self):
+        chainer = BackwardChainer(self._get_context(
+            ["rule1:current(X) and connection(X,Y) => remove:current(X), add:current(Y)"],
+            ["current('r1')", "connection('r1','r2')"]))
+        with self.assertRaises(Exception):
+            list(chainer.query(Predicate.parse("current(X)")))
+        chainer = BackwardChainer(self._get_context(["rule1:node(A) and not reached(A) => add:reached(A)"],
+                                                    ["node('a')"]))
+        with self.assertRaises(Exception):
+            list(chainer.query(Predicate.parse("reached(X)")))
+
+    def test_clear(self):
+        context = self._get_context(["rule1:edge(A,B) => add:path(A,B)"], ["edge('a','b')"])
+        chainer = BackwardChainer(context)
+        self.assertEqual(1, len(list(chainer.query(Predicate.parse("path(X,Y)")))))
+        context.add_facts([Fact.parse("edge('b','c')")])
+        self.assertEqual(1, len(list(chainer.query(Predicate.parse("path(X,Y)")))))
+        chainer.clear()
+        self.assertEqual(2, len(list(chainer.query(Predicate.parse("path(X,Y)")))))
+
+    def test(self):
+        pass
@@ -0,0 +1,84 @@
+import copy
+import os
+import tempfile
+
+from batch_runner import BatchRunner
+from elements.fact import Fact
+from engine import RuleEngine
+from limits import EngineLimits
+from context import Context
+from elements.rule import RuleTemplate
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    rules = [
+        "rule1:parent(A,B) and parent(B,C) => add:grand_parent(A,C)",
+        "rule2:grand_parent(A,B) and not man(A) => add:grand_mother(A,B)",
+    ]
+
+    def _get_fact_sets(self) -> list[tuple[str, list[Fact]]]:
+        # fact set i is a chain of i+2 persons: p0 -> p1 -> ... (with a man every 2 persons)
+        return [(f"set{i}", [Fact.parse(f"parent('p{j}','p{j + 1}')") for j in range(i + 1)] +
+                 [Fact.parse(f"man('p{j}')") for j in range(0, i + 2, 2)]) for i in range(6)]
+
+    def _get_expected_derived_facts(self, facts: list[Fact]) -> set[Fact]:
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in self.rules]
+        context.set_facts(copy.copy(facts))
+        RuleEngine(context).run()
+        return set(context.facts) - set(facts)
+
+    def test_run(self):
+        goal = Fact.parse("grand_mother('p1','p3')")
+        fact_sets = self._get_fact_sets()
+        for processes in (1, 3):
+            runner = BatchRunner(self.rules, goal, processes=processes, max_pending=2)
+            results = {result.name: result for result in runner.run(iter(fact_sets))}
+            self.assertEqual(sorted(results), [name for name, _ in fact_sets])
+            for name, facts in fact_sets:
+                self.assertIsNone(results[name].error)
+                self.assertEqual(set(results[name].derived_facts), self._get_expected_derived_facts(facts))
+            self.assertEqual([name for name, result in sorted(results.items()) if result.found_goal],
+                             ["set2", "set3", "set4", "set5"])
+
+    def test_fact_files(self):
+        file_descriptor, file_path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(file_descriptor, 'w') as file:
+            file.write("parent,a,b\nparent,b,c\n")
+        self.addCleanup(os.remove, file_path)
+        runner = BatchRunner(self.rules, processes=2)
+        results = {result.name: result for result in runner.run([("file", file_path), ("missing", "missing.txt")])}
+        self.assertIsNone(results["file"].found_goal)
+        self.assertEqual(results["file"].to_dict()["derived_facts"],
+                         ["grand_parent('a','c')", "grand_mother('a','c')"])
+        # a fact set that fails doesn't stop the other ones
+        self.assertIn("Unsupported fact file", results["missing"].error)
+
+    def test_limits(self):
+        rules = ["rule1: op1(X) => remove:op2(X), add:op2(X)", "rule2: op2(X) => remove:op1(X), add:op1(X)"]
+        runner = BatchRunner(rules, processes=2, limits=EngineLimits(max_firings=1000, max_state_visits=3))
+        results = {result.name: result for result in runner.run([("loop", [Fact.parse("op1('a')")]),
+                                                                 ("no_loop", [Fact.parse("op3('a')")])])}
+        # the fact set that loops is stopped, and doesn't stop the other ones
+        self.assertIn("Loop detected", results["loop"].error)
+        self.assertIsNone(results["no_loop"].error)
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
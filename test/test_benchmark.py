@@ -0,0 +1,48 @@
+from benchmark import WORKLOADS, BenchmarkResult, compare_results, format_report, generate_fan_out, \
+    get_growth_exponents, run_workload
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestBenchmark(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    def test_run_workload(self):
+        # the closure of a chain of 10 nodes has 9+8+...+1 paths
+        result = run_workload(WORKLOADS["chain"][0](10))
+        self.assertEqual(("chain:10", 45, 54), (result.key, result.firings, result.facts))
+        self.assertGreater(result.peak_memory, 0)
+        # the same results with the Rete matcher
+        for name, (generator, _) in WORKLOADS.items():
+            result, rete_result = run_workload(generator(12)), run_workload(generator(12), use_rete=True)
+            self.assertEqual((result.firings, result.facts), (rete_result.firings, rete_result.facts), name)
+            self.assertGreater(result.firings, 0, name)
+        # the same results with the parallel evaluation (7 dirty rule templates per firing)
+        result, parallel_result = run_workload(generate_fan_out(12)), run_workload(generate_fan_out(12), processes=4)
+        self.assertEqual(("fanout:12", 12 + 6 * 13 * 10), (result.key, result.firings))
+        self.assertEqual((result.firings, result.facts), (parallel_result.firings, parallel_result.facts))
+
+    def test_compare_results(self):
+        results = [BenchmarkResult("chain", 10, 1.0, 1000, 45, 54), BenchmarkResult("chain", 20, 4.0, 4000, 190, 209)]
+        self.assertAlmostEqual(2.0, get_growth_exponents(results)["chain:20"])
+        baseline = {"chain:10": results[0].to_dict(), "chain:20": {**results[1].to_dict(), "seconds": 2.0}}
+        self.assertEqual(["chain:20: 4.000s instead of 2.000s"], compare_results(results, baseline))
+        self.assertEqual([], compare_results(results, baseline, time_tolerance=1.5))
+        baseline["chain:10"]["firings"] = 44
+        self.assertIn("chain:10: 45 firings instead of 44", compare_results(results, baseline, time_tolerance=1.5))
+        lines = format_report(results, baseline).splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[2].startswith("chain:20"))
+        self.assertIn("2.00", lines[2])
+
+    def test(self):
+        pass
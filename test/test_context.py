@@ -0,0 +1,127 @@
+from elements.fact import Fact
+from elements.predicate import Predicate
+from elements.symbol import symbol_table
+from context import Context
+from elements.rule import RuleTemplate
+from evaluator import Evaluator
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestContext(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    def test_get_matching_facts(self):
+        context = Context()
+        context.set_facts([
+            Fact.parse("op1('a','b')"), Fact.parse("op1('c','b')"), Fact.parse("op1('c','d')"),
+            Fact.parse("op2('a','b')")
+        ])
+        self.assertEqual(set(context.get_matching_facts(Predicate.parse("op1(X,'b')"))), {
+            Fact.parse("op1('a','b')"), Fact.parse("op1('c','b')")
+        })
+        self.assertEqual(set(context.get_matching_facts(Predicate.parse("op1('c','b')"))), {
+            Fact.parse("op1('c','b')")
+        })
+        self.assertEqual(len(context.get_matching_facts(Predicate.parse("op1(X,Y)"))), 3)
+        self.assertEqual(set(context.get_matching_facts(Predicate.parse("op3(X)"))), set())
+
+        context.remove_facts([Fact.parse("op1('a','b')")])
+        self.assertEqual(set(context.get_matching_facts(Predicate.parse("op1(X,'b')"))), {
+            Fact.parse("op1('c','b')")
+        })
+        context.remove_facts([Fact.parse("op1('c','b')")])
+        self.assertEqual(set(context.get_matching_facts(Predicate.parse("op1(X,'b')"))), set())
+
+        # the index of a value position is built by its first lookup (in the order the facts were added), and then
+        # maintained as the facts are added/removed
+        context.add_facts([Fact.parse("op1('e','f')"), Fact.parse("op1('c','f')"), Fact.parse("op1('g')")])
+        self.assertEqual(list(context.get_matching_facts(Predicate.parse("op1('c',Y)"))), [
+            Fact.parse("op1('c','d')"), Fact.parse("op1('c','f')")
+        ])
+        self.assertEqual(list(context.get_matching_facts(Predicate.parse("op1('g')"))), [Fact.parse("op1('g')")])
+        context.remove_facts([Fact.parse("op1('c','d')")])
+        context.add_facts([Fact.parse("op1('c','h')"), Fact.parse("op1('c','d')")])
+        self.assertEqual(list(context.get_matching_facts(Predicate.parse("op1('c',Y)"))), [
+            Fact.parse("op1('c','f')"), Fact.parse("op1('c','h')"), Fact.parse("op1('c','d')")
+        ])
+        context.remove_facts([Fact.parse("op1('c','f')"), Fact.parse("op1('c','h')")])
+        self.assertEqual(list(context.get_matching_facts(Predicate.parse("op1('c','d')"))), [Fact.parse("op1('c','d')")])
+        self.assertTrue(context.has_matching_fact("op1", (None, symbol_table.get_id("'f'"))))
+        self.assertFalse(context.has_matching_fact("op1", (None, symbol_table.get_id("'h'"))))
+
+    def test_remove_satisfied_rules(self):
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template("rule:op1(X) and not op2(X) => add:op3(X)")]
+        rule_template = context.rule_templates[0]
+        context.set_facts([Fact.parse("op1('a')"), Fact.parse("op1('b')")])
+        for satisfied_rule in Evaluator(context).evaluate(rule_template):
+            context.add_satisfied_rule(satisfied_rule)
+        self.assertEqual(len(rule_template.satisfied_rules), 2)
+        # only the satisfied rules using the fact are removed ("not op2('a')" uses op2('a'))
+        context.add_facts([Fact.parse("op2('c')")])
+        self.assertEqual(len(rule_template.satisfied_rules), 2)
+        context.add_facts([Fact.parse("op2('a')")])
+        self.assertEqual({satisfied_rule.facts for satisfied_rule in rule_template.satisfied_rules},
+                         {(Fact.parse("op1('b')"),)})
+        context.remove_facts([Fact.parse("op1('b')")])
+        self.assertEqual(rule_template.satisfied_rules, set())
+        self.assertEqual(context._satisfied_rules_by_predicate, {})
+
+    def test_dirty_rule_templates(self):
+        context = Context()
+        context.rule_templates = [
+            RuleTemplate.parse_rule_template("rule1:op1(X) => add:op3(X)"),
+            RuleTemplate.parse_rule_template("rule2:op2(X) and not op1(X) => add:op3(X)"),
+            RuleTemplate.parse_rule_template("rule3:op1(X,Y) => add:op3(X)"),
+        ]
+        context.set_facts([Fact.parse("op2('a')"), Fact.parse("op1('a','a')"), Fact.parse("op1('a')")])
+        self.assertEqual([rule_template.name for rule_template in context.pop_dirty_rule_templates()],
+                         ["rule1", "rule2", "rule3"])
+        self.assertEqual(context.pop_dirty_rule_templates(), [])
+        for rule_template in context.rule_templates:
+            Evaluator(context).evaluate(rule_template)
+        # only the rule templates using op1 with 2 values are dirty, and they hold the added facts
+        context.add_facts([Fact.parse("op1('b','c')")])
+        self.assertEqual(context.pop_dirty_rule_templates(), [context.rule_templates[2]])
+        self.assertEqual(list(context.rule_templates[2].delta_facts), [Fact.parse("op1('b','c')")])
+        # op1('a') is used by the negated predicate of rule2 (but can't create new bindings for rule1)
+        context.remove_facts([Fact.parse("op1('a')")])
+        self.assertEqual(context.pop_dirty_rule_templates(), [context.rule_templates[1]])
+
+    def test_fingerprint(self):
+        context = Context()
+        self.assertEqual(0, context.fingerprint)
+        facts = [Fact.parse("op1('a','b')"), Fact.parse("op1('b','a')"), Fact.parse("op2('a')")]
+        context.add_facts(facts)
+        fingerprint = context.fingerprint
+        self.assertNotEqual(0, fingerprint)
+        # adding an existing fact doesn't change the fingerprint
+        context.add_facts([facts[0]])
+        self.assertEqual(fingerprint, context.fingerprint)
+        context.remove_facts([facts[1]])
+        self.assertNotEqual(fingerprint, context.fingerprint)
+        context.add_facts([facts[1]])
+        self.assertEqual(fingerprint, context.fingerprint)
+        # the same facts, added in another order, have the same fingerprint
+        other_context = Context()
+        other_context.set_facts(list(reversed(facts)))
+        self.assertEqual(fingerprint, other_context.fingerprint)
+        other_context.set_facts([])
+        self.assertEqual(0, other_context.fingerprint)
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -127,42 +127,89 @@ class TestEngine(unittest.TestCase):
             Fact.parse("parent('peter','jacqueline')"), Fact.parse("parent('catherine','jacqueline')")
         ]
 
+        # Note: "B!=C" and "A!=C" exclude facts like siblings('larry','larry') or married('george','george')
         context = Context()
         context.rule_templates = copy.deepcopy(rule_templates)
         context.set_facts(facts)
         context.goal = Fact.parse("mother('jacqueline','larry')")
         self.assertTrue(RuleEngine(context).run())
-        self.assertTrue(len(context.facts) == 45)
+        self.assertTrue(len(context.facts) == 38)
 
         context = Context()
         context.rule_templates = copy.deepcopy(rule_templates)
         context.set_facts(facts)
         context.goal = Fact.parse("son('larry','jacqueline')")
         self.assertTrue(RuleEngine(context).run())
-        self.assertTrue(len(context.facts) == 45)
+        self.assertTrue(len(context.facts) == 38)
 
         context = Context()
         context.rule_templates = copy.deepcopy(rule_templates)
         context.set_facts(facts)
         context.goal = Fact.parse("siblings('larry','sophia')")
         self.assertTrue(RuleEngine(context).run())
-        self.assertTrue(len(context.facts) == 45)
+        self.assertTrue(len(context.facts) == 38)
 
         context = Context()
         context.rule_templates = copy.deepcopy(rule_templates)
         context.set_facts(facts)
         context.goal = Fact.parse("married('jacqueline','george')")
         self.assertTrue(RuleEngine(context).run())
-        self.assertTrue(len(context.facts) == 45)
+        self.assertTrue(len(context.facts) == 38)
 
         context = Context()
         context.rule_templates = copy.deepcopy(rule_templates)
         context.set_facts(facts)
         context.goal = Fact.parse("grand_parent('catherine','larry')")
         self.assertTrue(RuleEngine(context).run())
-        self.assertTrue(len(context.facts) == 45)
+        self.assertTrue(len(context.facts) == 38)
 
 
+    def test_session(self):
+        rule_templates = [
+            RuleTemplate.parse_rule_template("rule1:parent(A,B) and parent(B,C) => add:grand_parent(A,C)"),
+            RuleTemplate.parse_rule_template("rule2:grand_parent(A,C) and alert(A) => remove:alert(A)"),
+        ]
+        for use_rete in (False, True):
+            context = Context()
+            context.rule_templates = copy.deepcopy(rule_templates)
+            context.set_facts([Fact.parse("parent('a','b')"), Fact.parse("parent('b','c')")])
+            engine = RuleEngine(context, use_rete=use_rete)
+            firing = engine.step()
+            self.assertEqual(firing.added_facts, [Fact.parse("grand_parent('a','c')")])
+            self.assertIsNone(engine.step())
+
+            # only the new facts are matched: the previous firings are not generated again
+            engine.assert_facts([Fact.parse("parent('c','d')"), Fact.parse("alert('b')")])
+            firings = list(engine.run_until_quiescent())
+            self.assertEqual([firing.satisfied_rule.name for firing in firings], ["rule1", "rule2"])
+            self.assertEqual(firings[1].removed_facts, [Fact.parse("alert('b')")])
+            self.assertEqual([action.to_string() for action in firings[1].actions], ["remove:alert('b')"])
+
+            # a retracted fact that is asserted again fires the rules using it again
+            engine.retract_facts([Fact.parse("parent('c','d')")])
+            self.assertEqual(list(engine.run_until_quiescent()), [])
+            engine.assert_facts([Fact.parse("parent('c','d')")])
+            self.assertEqual(len(list(engine.run_until_quiescent())), 1)
+
+    def test_session_batch(self):
+        # an asserted batch is matched as a whole: a fact blocked by a later fact of the same batch doesn't fire
+        rule_templates = [RuleTemplate.parse_rule_template("rule1:item(X) and not excluded(X) => add:kept(X)")]
+        results = []
+        for use_rete in (False, True):
+            context = Context()
+            context.rule_templates = copy.deepcopy(rule_templates)
+            engine = RuleEngine(context, use_rete=use_rete)
+            engine.assert_facts([Fact.parse("item('a')"), Fact.parse("excluded('a')"), Fact.parse("item('b')")])
+            firings = [firing.added_facts for firing in engine.run_until_quiescent()]
+            self.assertEqual(firings, [[Fact.parse("kept('b')")]])
+            # retracting the blocking fact in the same batch as another blocking fact
+            engine.retract_facts([Fact.parse("excluded('a')")])
+            engine.assert_facts([Fact.parse("excluded('b')"), Fact.parse("item('c')"), Fact.parse("excluded('c')")])
+            firings += [firing.added_facts for firing in engine.run_until_quiescent()]
+            self.assertEqual(firings[1:], [[Fact.parse("kept('a')")]])
+            results.append((firings, set(context.facts)))
+        self.assertEqual(results[0], results[1])
+
     def test(self):
         pass
 
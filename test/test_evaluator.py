@@ -1,7 +1,9 @@
 from evaluator import Evaluator
 from elements.fact import Fact
+from elements.predicate import Predicate
 from context import Context
 from elements.rule import RuleTemplate, SatisfiedRule
+from elements.symbol import symbol_table
 import logging
 
 import unittest  # https://docs.python.org/3/library/unittest.html
@@ -121,6 +123,65 @@ class TestEvaluator(unittest.TestCase):
         # -> the RHS stays as "add:op2(X)" which raises an - expected - exception
         self.assertRaises(Exception, Evaluator(context).evaluate, context.rule_templates[0])
 
+    def test_satisfied_rule(self):
+        context = Context()
+        context.rule_templates = [
+            RuleTemplate.parse_rule_template("rule:op1(X) and op2(X,Y) => add:op3(Y), remove:op1(X)")
+        ]
+        context.set_facts([Fact.parse("op1('val11')"), Fact.parse("op2('val11','val21')")])
+        satisfied_rule, = Evaluator(context).evaluate(context.rule_templates[0])
+        self.assertEqual(satisfied_rule.facts, (Fact.parse("op1('val11')"), Fact.parse("op2('val11','val21')")))
+        self.assertEqual(symbol_table.get_values(satisfied_rule.binding), ("'val11'", "'val21'"))
+        # the RHS is instantiated from the binding, in the order of the actions
+        self.assertEqual([action.to_string() for action in satisfied_rule.actions],
+                         ["add:op3('val21')", "remove:op1('val11')"])
+        # the rule string is only built for display
+        self.assertEqual(satisfied_rule.rule,
+                         "rule:op1('val11') and op2('val11','val21') => add:op3('val21'), remove:op1('val11')")
+
+    def test_semi_naive(self):
+        context = Context()
+        context.rule_templates = [
+            RuleTemplate.parse_rule_template("rule:parent(A,B) and parent(B,C) and not blocked(A) => add:grand_parent(A,C)")
+        ]
+        rule_template = context.rule_templates[0]
+        context.set_facts([Fact.parse("parent('a','b')"), Fact.parse("parent('b','c')"), Fact.parse("blocked('b')")])
+        satisfied_rules = Evaluator(context).evaluate(rule_template)
+        self.assertEqual(len(satisfied_rules), 1)
+        self.assertEqual(rule_template.delta_facts, {})
+        context.add_satisfied_rule(satisfied_rules[0])  # like the engine does when it is fired
+
+        # only the bindings using the new fact are computed (parent('a','b') and parent('b','c') is not returned again)
+        context.add_facts([Fact.parse("parent('c','d')"), Fact.parse("parent('d','e')")])
+        self.assertEqual(list(rule_template.delta_facts), [Fact.parse("parent('c','d')"), Fact.parse("parent('d','e')")])
+        self.assertEqual({satisfied_rule.facts for satisfied_rule in Evaluator(context).evaluate(rule_template)}, {
+            (Fact.parse("parent('c','d')"), Fact.parse("parent('d','e')")),
+        })
+
+        # adding a fact only used by a negated predicate doesn't require an evaluation...
+        context.add_facts([Fact.parse("blocked('c')")])
+        self.assertFalse(rule_template.evaluate)
+        # ... but removing it does, and all the bindings are computed again
+        context.remove_facts([Fact.parse("blocked('b')")])
+        self.assertIsNone(rule_template.delta_facts)
+        self.assertEqual({satisfied_rule.facts for satisfied_rule in Evaluator(context).evaluate(rule_template)}, {
+            (Fact.parse("parent('b','c')"), Fact.parse("parent('c','d')")),
+        })
+
+    def test_join_predicates_facts(self):
+        parent_ab, parent_bc = Predicate.parse("parent(A,B)"), Predicate.parse("parent(B,C)")
+        facts = {Fact.parse("parent('a','b')"), Fact.parse("parent('b','c')"), Fact.parse("parent('c','d')")}
+        fact_combos = [combo for _, combo in Evaluator._join_predicates_facts({parent_ab: facts, parent_bc: facts})]
+        self.assertEqual(set(fact_combos), {
+            (Fact.parse("parent('a','b')"), Fact.parse("parent('b','c')")),
+            (Fact.parse("parent('b','c')"), Fact.parse("parent('c','d')")),
+        })
+
+        # a variable used several times in the same predicate must have the same value
+        same = Predicate.parse("same(X,X)")
+        fact_combos = Evaluator._join_predicates_facts({same: {Fact.parse("same('a','a')"), Fact.parse("same('a','b')")}})
+        self.assertEqual(fact_combos, [({'X': symbol_table.get_id("'a'")}, (Fact.parse("same('a','a')"),))])
+
     def test(self):
         pass
 
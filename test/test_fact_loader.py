@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+from elements.fact import Fact
+from elements.rule import RuleTemplate
+from context import Context
+from fact_loader import read_facts, read_csv_facts, create_fact
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestFactLoader(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    def _write_file(self, extension: str, content: str) -> str:
+        file_descriptor, file_path = tempfile.mkstemp(suffix=extension)
+        with os.fdopen(file_descriptor, 'w') as file:
+            file.write(content)
+        self.addCleanup(os.remove, file_path)
+        return file_path
+
+    def test_read_facts(self):
+        expected_facts = [Fact.parse("parent('george','larry')"), Fact.parse("man('george')")]
+        ini_file = self._write_file(".ini", "[rules]\nrule: man(A) => add:person(A)\n\n[facts]\n"
+                                            "parent('george','larry')\n# comment\nman('george')\n\n[goal]\nman('larry')\n")
+        self.assertEqual(list(read_facts(ini_file)), expected_facts)
+        jsonl_file = self._write_file(".jsonl", '{"name": "parent", "values": ["george", "larry"]}\n\n'
+                                                '{"name": "man", "values": ["george"]}\n')
+        self.assertEqual(list(read_facts(jsonl_file)), expected_facts)
+        csv_file = self._write_file(".csv", "parent,george,larry\nman,george\n")
+        self.assertEqual(list(read_facts(csv_file)), expected_facts)
+        csv_file = self._write_file(".csv", "george,larry\n")
+        self.assertEqual(list(read_csv_facts(csv_file, name="parent")), expected_facts[:1])
+
+        self.assertRaises(Exception, read_facts, "facts.txt")
+        self.assertRaises(Exception, list, read_facts(self._write_file(".jsonl", '{"name": "man"}\n')))
+        self.assertRaises(Exception, create_fact, "man", ["o'neil"])
+        self.assertRaises(Exception, create_fact, "not a name", ["george"])
+
+    def test_load_facts(self):
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template("rule:parent(A,B) => add:child(B,A)")]
+        nb_added_facts = context.load_facts((create_fact("parent", [f"p{i}", f"p{i + 1}"]) for i in range(25)),
+                                            batch_size=10)
+        self.assertEqual(nb_added_facts, 25)
+        self.assertEqual(len(context.facts), 25)
+        self.assertEqual(context.pop_dirty_rule_templates(), context.rule_templates)
+        # the facts that already exist are not counted
+        csv_file = self._write_file(".csv", "parent,p0,p1\nparent,p100,p101\n")
+        self.assertEqual(context.load_facts_from_file(csv_file), 1)
+        self.assertEqual(len(context.get_matching_facts(Fact.parse("parent('p100','p101')"))), 1)
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
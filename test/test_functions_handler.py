@@ -0,0 +1,137 @@
+import copy
+import os
+import tempfile
+import threading
+
+from elements.fact import Fact
+from engine import RuleEngine
+from context import Context
+from elements.rule import RuleTemplate
+from functions_handler import register_function, FunctionExecutor, FunctionDispatcher
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+calls = []
+calls_lock = threading.Lock()
+called = threading.Event()
+
+
+@register_function(executor=FunctionExecutor.THREAD)
+def thread_notify(rule_name, *args):
+    with calls_lock:
+        calls.append((threading.get_ident(), args))
+
+
+@register_function(executor=FunctionExecutor.THREAD)
+def thread_signal(rule_name, *args):
+    called.set()
+
+
+@register_function(executor=FunctionExecutor.THREAD)
+def thread_fail(rule_name, *args):
+    raise ValueError(f"failed for {args}")
+
+
+@register_function(executor=FunctionExecutor.PROCESS)
+def process_write(rule_name, file_path, *args):
+    # the side effect happens in another process: it's only visible through the file system
+    with open(file_path.strip("'"), 'a') as file:
+        file.write(f"{os.getpid()} {','.join(args)}\n".replace("'", ""))
+
+
+class TestFunctionsHandler(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    def _get_context(self, rule_templates: list[RuleTemplate]) -> Context:
+        context = Context()
+        context.rule_templates = copy.deepcopy(rule_templates)
+        context.set_facts([Fact.parse(f"parent('p{i}','p{i + 1}')") for i in range(10)])
+        context.goal = Fact.parse("grand_parent('p0','p2')")
+        return context
+
+    def test_thread_executor(self):
+        rule_templates = [
+            RuleTemplate.parse_rule_template(
+                "rule:parent(A,B) and parent(B,C) => add:grand_parent(A,C), function:thread_notify(A,C)")
+        ]
+        calls.clear()
+        engine = RuleEngine(self._get_context(rule_templates))
+        engine.function_dispatcher.batch_size = 4
+        self.assertTrue(engine.run())
+        # all the calls are done before run() returns, and they didn't run in the engine thread
+        self.assertEqual(sorted(args for _, args in calls), sorted((f"'p{i}'", f"'p{i + 2}'") for i in range(9)))
+        self.assertNotIn(threading.get_ident(), [thread_id for thread_id, _ in calls])
+        self.assertFalse(engine.function_dispatcher.has_pending_calls())
+
+    def test_process_executor(self):
+        file_descriptor, file_path = tempfile.mkstemp(suffix=".txt")
+        os.close(file_descriptor)
+        self.addCleanup(os.remove, file_path)
+        rule_templates = [
+            RuleTemplate.parse_rule_template(
+                f"rule:parent(A,B) and parent(B,C) => add:grand_parent(A,C), function:process_write('{file_path}',A,C)")
+        ]
+        engine = RuleEngine(self._get_context(rule_templates))
+        self.assertTrue(engine.run())
+        with open(file_path) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(sorted(line.split(" ")[1] for line in lines), sorted(f"p{i},p{i + 2}" for i in range(9)))
+        self.assertNotIn(str(os.getpid()), [line.split(" ")[0] for line in lines])
+
+    def test_errors(self):
+        rule_templates = [
+            RuleTemplate.parse_rule_template(
+                "rule:parent(A,B) and parent(B,C) => function:thread_fail(A,C), function:thread_notify(A,C)")
+        ]
+        calls.clear()
+        engine = RuleEngine(self._get_context(rule_templates))
+        self.assertRaises(ValueError, engine.run)
+        # the other calls of the batches are still done
+        self.assertEqual(len(calls), 9)
+        # the errors are only raised once
+        engine.wait_for_callbacks()
+
+    def test_submitted_after_firing(self):
+        rule_templates = [
+            RuleTemplate.parse_rule_template("rule1:parent('p0',B) => function:thread_signal(B), add:start(B)"),
+            RuleTemplate.parse_rule_template("rule2:start(B) and parent(B,C) => add:next(C)"),
+        ]
+        called.clear()
+        context = self._get_context(rule_templates)
+        context.goal = None
+        engine = RuleEngine(context)
+        firings = engine.run_until_quiescent()
+        self.assertEqual(next(firings).satisfied_rule.rule_template.name, "rule1")
+        # the call is submitted to the pool by the firing, and not when the engine reaches quiescence
+        self.assertTrue(called.wait(timeout=5))
+        self.assertEqual([firing.satisfied_rule.rule_template.name for firing in firings], ["rule2"])
+        engine.wait_for_callbacks()
+
+    def test_batches(self):
+        dispatcher = FunctionDispatcher(batch_size=3)
+        calls.clear()
+        for i in range(7):
+            dispatcher.dispatch("thread_notify", "rule", f"p{i}")
+        # the calls of a batch are done in order by the same worker
+        dispatcher.wait()
+        self.assertEqual(sorted(args for _, args in calls), [(f"p{i}",) for i in range(7)])
+        thread_ids = {thread_id for thread_id, args in calls if args[0] in ("p0", "p1", "p2")}
+        self.assertEqual(len(thread_ids), 1)
+        self.assertEqual([args for thread_id, args in calls if args[0] in ("p0", "p1", "p2")],
+                         [("p0",), ("p1",), ("p2",)])
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+from context import Context
+from elements.fact import Fact
+from elements.rule import RuleTemplate
+from engine import RuleEngine
+from limits import EngineLimits
+import logging
+import time
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestLimits(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    @staticmethod
+    def _get_context(rules: list[str], facts: list[str]) -> Context:
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in rules]
+        context.set_facts([Fact.parse(fact) for fact in facts])
+        return context
+
+    # same rules as config/endless_loop1.ini (without the functions)
+    def _get_endless_loop1_context(self) -> Context:
+        return self._get_context(["rule1: op1(X) => remove:op2(X), add:op2(X)",
+                                  "rule2: op2(X) => remove:op1(X), add:op1(X)"], ["op1('val1')"])
+
+    # same rules as config/endless_loop2.ini (without the functions)
+    def _get_endless_loop2_context(self) -> Context:
+        return self._get_context(
+            ["move: current_position(X) and connection(X,Y) => remove:current_position(X), add:current_position(Y)"],
+            ["connection('R1','R2')", "connection('R2','R1')", "connection('R2','R3')", "current_position('R1')"])
+
+    def test_loop_detection(self):
+        for use_rete in [False, True]:
+            with self.assertRaises(Exception) as context_manager:
+                RuleEngine(self._get_endless_loop1_context(), use_rete, limits=EngineLimits(max_state_visits=2)).run()
+            self.assertIn("Loop detected", str(context_manager.exception))
+            self.assertIn("rules: rule2, rule1", str(context_manager.exception))
+            with self.assertRaises(Exception) as context_manager:
+                RuleEngine(self._get_endless_loop2_context(), use_rete, limits=EngineLimits(max_state_visits=2)).run()
+            self.assertIn("rules: move", str(context_manager.exception))
+
+    def test_no_loop(self):
+        # a state that is reached once is not a loop, and the firings that don't change the facts are ignored
+        context = self._get_context(["rule1: op1(X) => add:op2(X)",
+                                     "rule2: op2(X) => remove:op2(X)",
+                                     "rule3: op1(X) => add:op1(X)"], ["op1('a')", "op1('b')"])
+        RuleEngine(context, limits=EngineLimits(max_state_visits=1)).run()
+        self.assertEqual({Fact.parse("op1('a')"), Fact.parse("op1('b')")}, context.facts)
+
+    def test_budgets(self):
+        with self.assertRaises(Exception) as context_manager:
+            RuleEngine(self._get_endless_loop1_context(), limits=EngineLimits(max_firings=100)).run()
+        self.assertIn("max_firings=100", str(context_manager.exception))
+        with self.assertRaises(Exception) as context_manager:
+            RuleEngine(self._get_endless_loop2_context(), limits=EngineLimits(max_seconds=0.2)).run()
+        self.assertIn("max_seconds=0.2", str(context_manager.exception))
+        context = self._get_context(["rule1: number(X) and number(Y) => add:pair(X,Y)"],
+                                    [f"number('n{i}')" for i in range(10)])
+        for use_rete in [False, True]:
+            with self.assertRaises(Exception) as context_manager:
+                RuleEngine(context, use_rete, limits=EngineLimits(max_combinations=50)).run()
+            self.assertIn("max_combinations=50", str(context_manager.exception))
+            self.assertEqual(10, len(context.facts))
+        # within the budgets (10 partial combinations + 100 complete ones)
+        context = self._get_context(["rule1: number(X) and number(Y) => add:pair(X,Y)"],
+                                    [f"number('n{i}')" for i in range(10)])
+        RuleEngine(context, limits=EngineLimits(max_firings=100, max_seconds=60, max_combinations=110)).run()
+        self.assertEqual(110, len(context.facts))
+
+    def test_runaway_evaluation(self):
+        # a single evaluation of the rule would generate 8 million combinations: it is interrupted before any firing
+        context = self._get_context(["rule1: number(X) and number(Y) and number(Z) => add:triple(X,Y,Z)"],
+                                    [f"number('n{i}')" for i in range(200)])
+        with self.assertRaises(Exception) as context_manager:
+            RuleEngine(context, limits=EngineLimits(max_combinations=10000)).run()
+        self.assertIn("max_combinations=10000", str(context_manager.exception))
+        start = time.monotonic()
+        with self.assertRaises(Exception) as context_manager:
+            RuleEngine(context, limits=EngineLimits(max_seconds=0.1)).run()
+        self.assertIn("max_seconds=0.1", str(context_manager.exception))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(200, len(context.facts))
+        # the same with the new facts of a session (semi-naive evaluation of the delta facts)
+        engine = RuleEngine(context, limits=EngineLimits(max_combinations=10000))
+        engine.assert_facts([Fact.parse("number('n200')")])
+        self.assertRaises(Exception, engine.run)
+
+    def test(self):
+        pass
@@ -0,0 +1,116 @@
+import copy
+
+from elements.fact import Fact
+from engine import RuleEngine
+from context import Context
+from elements.rule import RuleTemplate
+from evaluator import Evaluator
+from parallel_evaluator import ParallelEvaluator
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestParallelEvaluator(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    rule_templates = [
+        RuleTemplate.parse_rule_template("rule1:man(A) and parent(A,B) => add:father(A,B)"),
+        RuleTemplate.parse_rule_template("rule2:woman(A) and parent(A,B) => add:mother(A,B)"),
+        RuleTemplate.parse_rule_template("rule3:man(A) and parent(B,A) => add:son(A,B)"),
+        RuleTemplate.parse_rule_template("rule4:woman(A) and parent(B,A) => add:daughter(A,B)"),
+        RuleTemplate.parse_rule_template("rule5:parent(A,B) and parent(A,C) and B!=C => add:siblings(B,C)"),
+        RuleTemplate.parse_rule_template("rule6:parent(A,B) and parent(B,C) => add:grand_parent(A,C)"),
+        RuleTemplate.parse_rule_template("rule7:grand_parent(A,B) and not man(A) => add:grand_mother(A,B)"),
+    ]
+    facts = [
+        Fact.parse("man('george')"), Fact.parse("man('larry')"), Fact.parse("man('peter')"),
+        Fact.parse("woman('sophia')"), Fact.parse("woman('jacqueline')"), Fact.parse("woman('catherine')"),
+        Fact.parse("parent('george','larry')"), Fact.parse("parent('george','sophia')"),
+        Fact.parse("parent('jacqueline','larry')"), Fact.parse("parent('jacqueline','sophia')"),
+        Fact.parse("parent('peter','jacqueline')"), Fact.parse("parent('catherine','jacqueline')")
+    ]
+
+    def _get_context(self) -> Context:
+        context = Context()
+        context.rule_templates = copy.deepcopy(self.rule_templates)
+        context.set_facts(self.facts)
+        context.goal = Fact.parse("grand_mother('catherine','larry')")
+        return context
+
+    def test_evaluate_all(self):
+        expected_context = self._get_context()
+        expected = Evaluator(expected_context).evaluate_all(expected_context.pop_dirty_rule_templates())
+        context = self._get_context()
+        evaluator = ParallelEvaluator(context, processes=3)
+        self.addCleanup(evaluator.close)
+        result = evaluator.evaluate_all(context.pop_dirty_rule_templates())
+        # same satisfied rules, in the same order
+        self.assertEqual([satisfied_rule.rule for satisfied_rule in result],
+                         [satisfied_rule.rule for satisfied_rule in expected])
+        self.assertTrue(all(satisfied_rule.rule_template in context.rule_templates for satisfied_rule in result))
+        self.assertFalse(any(rule_template.evaluate for rule_template in context.rule_templates))
+        # nothing to evaluate anymore
+        self.assertEqual(evaluator.evaluate_all(context.rule_templates), [])
+
+    def test_workers_reused(self):
+        # the workers are forked once, and get the changes of the facts (new values included) before each round
+        expected_context = self._get_context()
+        expected_evaluator = Evaluator(expected_context)
+        context = self._get_context()
+        evaluator = ParallelEvaluator(context, processes=3, min_rule_templates=2, min_round_seconds=0)
+        self.addCleanup(evaluator.close)
+        changes = [
+            (True, ["parent('larry','emma')", "woman('emma')", "parent('sophia','tom')"]),
+            (False, ["man('george')"]),
+            (True, ["man('george')", "parent('emma','zoe')"]),
+            (False, ["parent('peter','jacqueline')", "woman('emma')"]),
+        ]
+        for current_context, current_evaluator in ((expected_context, expected_evaluator), (context, evaluator)):
+            current_evaluator.evaluate_all(current_context.pop_dirty_rule_templates())
+        for is_added, facts in changes:
+            results = []
+            for current_context, current_evaluator in ((expected_context, expected_evaluator), (context, evaluator)):
+                if is_added:
+                    current_context.add_facts([Fact.parse(fact) for fact in facts])
+                else:
+                    current_context.remove_facts([Fact.parse(fact) for fact in facts])
+                satisfied_rules = current_evaluator.evaluate_all(current_context.pop_dirty_rule_templates())
+                for satisfied_rule in satisfied_rules:
+                    current_context.add_satisfied_rule(satisfied_rule)
+                results.append([satisfied_rule.rule for satisfied_rule in satisfied_rules])
+            self.assertEqual(results[1], results[0])
+        self.assertEqual(evaluator.nb_forks, 1)
+        # the workers are stopped, and forked again by the next round
+        evaluator.close()
+        self.assertNotIn(evaluator, context.fact_listeners)
+        context.add_facts([Fact.parse("parent('zoe','max')")])
+        self.assertEqual([satisfied_rule.rule for satisfied_rule in
+                          evaluator.evaluate_all(context.pop_dirty_rule_templates())],
+                         ["rule6:parent('emma','zoe') and parent('zoe','max') => add:grand_parent('emma','max')"])
+        self.assertEqual(evaluator.nb_forks, 2)
+
+    def test_engine(self):
+        expected_context = self._get_context()
+        expected_firings = [firing.satisfied_rule.rule for firing in RuleEngine(expected_context).run_until_quiescent()]
+        context = self._get_context()
+        engine = RuleEngine(context, processes=3)
+        firings = [firing.satisfied_rule.rule for firing in engine.run_until_quiescent()]
+        self.assertEqual(firings, expected_firings)
+        self.assertEqual(set(context.facts), set(expected_context.facts))
+        self.assertIn(context.goal, context.facts)
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
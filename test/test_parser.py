@@ -3,11 +3,13 @@ import logging
 
 import unittest  # https://docs.python.org/3/library/unittest.html
 
+from condition import CompiledLeftExpression
 from expression import LeftExpression, RightExpression
 from fact import Fact
 from predicate import Predicate
 from functions_handler import auto_register_functions
 from rule import RuleTemplate, BoundRule, SatisfiedRule
+from elements.symbol import symbol_table
 
 auto_register_functions('functions_root')
 
@@ -88,6 +90,21 @@ class TestParser(unittest.TestCase):
         left_str = "op1(X) or op2(Y)"
         self.assertRaises(Exception, LeftExpression.parse, left_str)
 
+    def test_compiled_left_expression(self):
+        compiled = CompiledLeftExpression.compile("parent(A,B) and parent(A, C) and B!=C and not married(A,'bob')")
+        self.assertEqual(compiled.variables, ['A', 'B', 'C'])
+        a, b, c, x, bob = (symbol_table.get_id(value) for value in ("'a'", "'b'", "'c'", "'x'", "'bob'"))
+        self.assertEqual(compiled.bind((a, b, c)),
+                         "parent('a','b') and parent('a', 'c') and 'b'!='c' and not married('a','bob')")
+        facts = {('married', (a, bob))}
+        has_fact = lambda name, symbol_ids: (name, symbol_ids) in facts
+        self.assertTrue(compiled.check(has_fact, (x, b, c)))
+        self.assertFalse(compiled.check(has_fact, (x, b, b)))
+        self.assertFalse(compiled.check(has_fact, (a, b, c)))
+
+        # predicate values can only be string literals or variables
+        self.assertRaises(Exception, CompiledLeftExpression.compile, "op1(X) and op2(X, 1)")
+
     def test_right_expression_parser(self):
         pass
 
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import types
+
+from context import Context
+from elements.fact import Fact
+from query import Query
+from snapshot import Snapshot
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestQuery(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    @staticmethod
+    def _get_context() -> Context:
+        context = Context()
+        context.set_facts([Fact.parse(fact) for fact in [
+            "parent('george','john')", "parent('john','sophia')", "parent('john','larry')", "man('larry')",
+            "man('george')", "same('a','a')", "same('a','b')", "flag()"]])
+        return context
+
+    def test_query(self):
+        context = self._get_context()
+        self.assertEqual([{'X': "'john'", 'Y': "'sophia'"}],
+                         list(context.query("parent('george',X) and parent(X,Y) and not man(Y)")))
+        self.assertEqual([{'X': "'larry'"}, {'X': "'sophia'"}],
+                         sorted(context.query("parent('john',X)"), key=lambda result: result['X']))
+        self.assertEqual([{'X': "'sophia'"}], list(context.query("parent('john',X) and X!='larry'")))
+        # the same variable must have the same value
+        self.assertEqual([{'X': "'a'"}], list(context.query("same(X,X)")))
+        # without variables: one empty result when the query is true
+        self.assertEqual([{}], list(context.query("man('george') and flag()")))
+        self.assertEqual([], list(context.query("man('john')")))
+        self.assertEqual([], list(context.query("unknown(X)")))
+
+    def test_query_is_lazy(self):
+        context = self._get_context()
+        context.set_facts([Fact.parse(f"number('n{i}')") for i in range(10000)])
+        results = context.query("number(X) and number(Y)")
+        self.assertIsInstance(results, types.GeneratorType)
+        # only the first results are computed, not the 10^8 combinations
+        self.assertEqual(3, len([next(results) for _ in range(3)]))
+
+    def test_get_facts(self):
+        context = self._get_context()
+        self.assertEqual({Fact.parse("parent('john','sophia')"), Fact.parse("parent('john','larry')")},
+                         set(Query("parent('john',X)").get_facts(context)))
+        self.assertEqual([Fact.parse("same('a','a')")], list(Query("same(X,X)").get_facts(context)))
+        with self.assertRaises(Exception):
+            list(Query("man(X) and parent(X,Y)").get_facts(context))
+
+    def test_query_snapshot(self):
+        file_descriptor, file_path = tempfile.mkstemp(suffix=".snapshot")
+        os.close(file_descriptor)
+        self.addCleanup(os.remove, file_path)
+        context = self._get_context()
+        context.save_snapshot(file_path)
+        with Snapshot(file_path) as snapshot:
+            self.assertEqual([{'X': "'john'", 'Y': "'sophia'"}],
+                             list(Query("parent('george',X) and parent(X,Y) and not man(Y)").run(snapshot)))
+
+    def test_invalid_query(self):
+        with self.assertRaises(Exception):
+            Query("man(X) and not parent(X,Y)")
+        with self.assertRaises(Exception):
+            Query("man(X) or woman(X)")
+
+    def test(self):
+        pass
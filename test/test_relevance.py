@@ -0,0 +1,87 @@
+import copy
+
+from elements.fact import Fact
+from engine import RuleEngine
+from context import Context
+from elements.rule import RuleTemplate
+from relevance import get_relevant_rule_templates
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestRelevance(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    rule_templates = [
+        RuleTemplate.parse_rule_template("rule1:parent(A,B) and parent(B,C) => add:grand_parent(A,C)"),
+        RuleTemplate.parse_rule_template("rule2:grand_parent(A,B) and not man(A) => add:grand_mother(A,B)"),
+        RuleTemplate.parse_rule_template("rule3:parent(A,B) => add:person(A), add:person(B)"),
+        RuleTemplate.parse_rule_template("rule4:person(A) and intruder(A) => add:man(A)"),
+        RuleTemplate.parse_rule_template("rule5:grand_mother(A,B) => add:ancestor(A,B)"),
+        RuleTemplate.parse_rule_template("rule6:grand_parent(A,B) and old(A) => remove:parent(A,B)"),
+    ]
+
+    def _get_context(self, goal: str) -> Context:
+        context = Context()
+        context.rule_templates = copy.deepcopy(self.rule_templates)
+        context.set_facts([Fact.parse(f"parent('p{i}','p{i + 1}')") for i in range(8)] + [Fact.parse("man('p0')")])
+        context.goal = Fact.parse(goal)
+        return context
+
+    def test_get_relevant_rule_templates(self):
+        names = lambda rule_templates: [rule_template.name for rule_template in rule_templates]
+        # rule3 is relevant because rule4 can add a "man" fact used by a 'not' in rule2
+        # rule6 is relevant because it removes "parent" facts
+        self.assertEqual(names(get_relevant_rule_templates(self.rule_templates, Fact.parse("grand_mother('p1','p3')"))),
+                         ["rule1", "rule2", "rule3", "rule4", "rule6"])
+        # rule1 is relevant because the "grand_parent" facts are used by rule6, which removes "parent" facts
+        self.assertEqual(names(get_relevant_rule_templates(self.rule_templates, Fact.parse("person('p1')"))),
+                         ["rule1", "rule3", "rule6"])
+        self.assertEqual(names(get_relevant_rule_templates(self.rule_templates, Fact.parse("unknown('p1')"))), [])
+
+    def test_goal_directed(self):
+        for use_rete in (False, True):
+            context = self._get_context("grand_parent('p0','p2')")
+            engine = RuleEngine(context, use_rete=use_rete, goal_directed=True)
+            firings = list(engine.run_until_quiescent())
+            # the engine stops as soon as the goal is added, and the other rules are not evaluated
+            self.assertEqual([firing.satisfied_rule.name for firing in firings], ["rule1"])
+            self.assertIn(context.goal, context.facts)
+            self.assertFalse(any(fact.name == "person" for fact in context.facts))
+
+            context = self._get_context("grand_mother('p1','p3')")
+            self.assertTrue(RuleEngine(context, use_rete=use_rete, goal_directed=True).run())
+            self.assertFalse(any(fact.name == "ancestor" for fact in context.facts))
+            context = self._get_context("grand_mother('p0','p2')")
+            self.assertFalse(RuleEngine(context, use_rete=use_rete, goal_directed=True).run())
+
+        # the delta facts of the rule templates that are not relevant don't grow (rule2 was evaluated by the first run)
+        context = self._get_context("person('unknown')")
+        RuleEngine(context).run()
+        engine = RuleEngine(context, goal_directed=True)
+        engine.assert_facts([Fact.parse("parent('p8','p9')"), Fact.parse("parent('p9','p10')")])
+        self.assertFalse(engine.run())
+        self.assertIn(Fact.parse("grand_parent('p8','p10')"), context.facts)
+        self.assertIsNone(context.rule_templates[1].delta_facts)
+
+        # the goal is already in the knowledge base: nothing is fired
+        context = self._get_context("parent('p0','p1')")
+        self.assertEqual(list(RuleEngine(context, goal_directed=True).run_until_quiescent()), [])
+        context.goal = None
+        self.assertRaises(Exception, RuleEngine, context, goal_directed=True)
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import copy
+
+from elements.fact import Fact
+from engine import RuleEngine
+from context import Context
+from elements.rule import RuleTemplate, SatisfiedRule
+from rete import ReteNetwork
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestRete(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    def test_join(self):
+        context = Context()
+        context.rule_templates = [
+            RuleTemplate.parse_rule_template("rule:parent(A,B) and parent(B,C) => add:grand_parent(A,C)")
+        ]
+        context.set_facts([
+            Fact.parse("parent('a','b')"), Fact.parse("parent('b','c')"), Fact.parse("parent('c','d')")
+        ])
+        network = ReteNetwork(context)
+        self.assertEqual(set(network.get_satisfied_rules(context.rule_templates[0])), {
+            SatisfiedRule.parse_satisfied_rule("rule:parent('a','b') and parent('b','c') => add:grand_parent('a', 'c')"),
+            SatisfiedRule.parse_satisfied_rule("rule:parent('b','c') and parent('c','d') => add:grand_parent('b', 'd')"),
+        })
+        # activations are only returned once...
+        self.assertEqual(network.get_satisfied_rules(context.rule_templates[0]), [])
+        # ... and only the new fact goes through the network
+        context.add_facts([Fact.parse("parent('d','e')")])
+        self.assertEqual(network.get_satisfied_rules(context.rule_templates[0]), [
+            SatisfiedRule.parse_satisfied_rule("rule:parent('c','d') and parent('d','e') => add:grand_parent('c', 'e')"),
+        ])
+        # removing a fact retracts its activations, adding it again creates a new activation
+        context.remove_facts([Fact.parse("parent('a','b')")])
+        context.add_facts([Fact.parse("parent('a','b')")])
+        self.assertEqual(network.get_satisfied_rules(context.rule_templates[0]), [
+            SatisfiedRule.parse_satisfied_rule("rule:parent('a','b') and parent('b','c') => add:grand_parent('a', 'c')"),
+        ])
+
+    def test_not_and_tests(self):
+        context = Context()
+        context.rule_templates = [
+            RuleTemplate.parse_rule_template("rule:op1(X) and op1(Y) and X!=Y and not op2(X) => add:op3(X,Y)")
+        ]
+        context.set_facts([
+            Fact.parse("op1('val11')"), Fact.parse("op1('val12')"), Fact.parse("op2('val11')")
+        ])
+        network = ReteNetwork(context)
+        self.assertEqual(network.get_satisfied_rules(context.rule_templates[0]), [
+            SatisfiedRule.parse_satisfied_rule(
+                "rule:op1('val12') and op1('val11') and 'val12'!='val11' and not op2('val12') => add:op3('val12', 'val11')"),
+        ])
+        context.remove_facts([Fact.parse("op2('val11')")])
+        self.assertEqual(len(network.get_satisfied_rules(context.rule_templates[0])), 1)
+        # op2('val12') retracts the activation where X='val12'
+        context.add_facts([Fact.parse("op2('val12')")])
+        self.assertEqual(list(network.terminal_nodes[context.rule_templates[0]].activations), [
+            (Fact.parse("op1('val11')"), Fact.parse("op1('val12')"))
+        ])
+
+    def test_engine(self):
+        rule_templates = [
+            RuleTemplate.parse_rule_template("rule1:man(A) and parent(A,B) => add:father(A,B)"),
+            RuleTemplate.parse_rule_template("rule2:woman(A) and parent(A,B) => add:mother(A,B)"),
+            RuleTemplate.parse_rule_template("rule3:man(A) and parent(B,A) => add:son(A,B)"),
+            RuleTemplate.parse_rule_template("rule4:parent(A,B) and parent(B,C) => add:grand_parent(A,C)"),
+            RuleTemplate.parse_rule_template("rule5:woman(A) and grand_parent(A,B) => add:grand_mother(A,B)"),
+        ]
+        facts = [
+            Fact.parse("man('george')"), Fact.parse("man('larry')"), Fact.parse("man('peter')"),
+            Fact.parse("woman('sophia')"), Fact.parse("woman('jacqueline')"), Fact.parse("woman('catherine')"),
+            Fact.parse("parent('george','larry')"), Fact.parse("parent('george','sophia')"),
+            Fact.parse("parent('jacqueline','larry')"), Fact.parse("parent('jacqueline','sophia')"),
+            Fact.parse("parent('peter','jacqueline')"), Fact.parse("parent('catherine','jacqueline')")
+        ]
+        results = []
+        for use_rete in (False, True):
+            context = Context()
+            context.rule_templates = copy.deepcopy(rule_templates)
+            context.set_facts(facts)
+            context.goal = Fact.parse("grand_mother('catherine','larry')")
+            self.assertTrue(RuleEngine(context, use_rete=use_rete).run())
+            results.append(context.facts)
+        self.assertEqual(results[0], results[1])
+
+    def test_initial_negated_facts(self):
+        # the negated fact is loaded after the fact it blocks: no activation must be pushed to the agenda
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template("rule:item(X) and not excluded(X) => add:kept(X)")]
+        context.set_facts([Fact.parse("item('a')"), Fact.parse("excluded('a')"), Fact.parse("item('b')")])
+        engine = RuleEngine(context, use_rete=True)
+        self.assertEqual(["rule"], [firing.satisfied_rule.rule_template.name for firing in engine.run_until_quiescent()])
+        self.assertNotIn(Fact.parse("kept('a')"), context.facts)
+        self.assertIn(Fact.parse("kept('b')"), context.facts)
+
+    def test_mixed_batch(self):
+        # a batch with a fact and the fact that blocks it: the activation retracted by the batch is not pushed
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template("rule:item(X) and not excluded(X) => add:kept(X)")]
+        engine = RuleEngine(context, use_rete=True)
+        engine.assert_facts([Fact.parse("item('a')"), Fact.parse("excluded('a')"), Fact.parse("item('b')")])
+        self.assertEqual([firing.added_facts for firing in engine.run_until_quiescent()], [[Fact.parse("kept('b')")]])
+        context.load_facts([Fact.parse("item('c')"), Fact.parse("excluded('c')")])
+        self.assertIsNone(engine.step())
+        self.assertNotIn(Fact.parse("kept('c')"), context.facts)
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import pickle
+import tempfile
+
+from elements.fact import Fact
+from engine import RuleEngine
+from context import Context
+from elements.rule import RuleTemplate
+from elements.symbol import symbol_table
+from ruleset_cache import load_rule_templates, read_rule_templates, get_cache_path
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestRulesetCache(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    rules = [
+        "rule1:parent(A,B) and parent(B,C) and A!='p3' => add:grand_parent(A,C)",
+        "rule2:grand_parent(A,B) and not man(A) => add:grand_mother(A,B), remove:parent(A,'p1')",
+    ]
+
+    def _run(self, rule_templates: list[RuleTemplate]) -> set[Fact]:
+        context = Context()
+        context.rule_templates = rule_templates
+        context.set_facts([Fact.parse(f"parent('p{i}','p{i + 1}')") for i in range(6)] + [Fact.parse("man('p2')")])
+        RuleEngine(context).run()
+        return set(context.facts)
+
+    def test_load_rule_templates(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            rule_templates = load_rule_templates(self.rules, cache_dir)
+            cache_path = get_cache_path(self.rules, cache_dir)
+            self.assertTrue(os.path.exists(cache_path))
+            # the next time, the rule templates are read from the cache file
+            cached_rule_templates = read_rule_templates(cache_path)
+            self.assertEqual([rule_template.rule for rule_template in cached_rule_templates], self.rules)
+            self.assertEqual(self._run(cached_rule_templates), self._run(rule_templates))
+            self.assertEqual([rule_template.rule for rule_template in load_rule_templates(self.rules, cache_dir)],
+                             self.rules)
+            # another ruleset has another cache file
+            self.assertNotEqual(get_cache_path(self.rules[:1], cache_dir), cache_path)
+
+            # an invalid cache file is replaced
+            with open(cache_path, 'wb') as file:
+                file.write(b"not a cache file")
+            self.assertEqual(len(load_rule_templates(self.rules, cache_dir)), 2)
+            self.assertIsNotNone(read_rule_templates(cache_path))
+
+            # a cache file whose symbol ids are already used for other values can't be used
+            with open(cache_path, 'wb') as file:
+                pickle.dump(("'not the first symbol'", "'a new symbol'"), file)
+            nb_symbols = len(symbol_table)
+            self.assertIsNone(read_rule_templates(cache_path))
+            # ... and its symbols aren't added to the symbol table
+            self.assertEqual(len(symbol_table), nb_symbols)
+            self.assertIsNone(symbol_table.find_id("'not the first symbol'"))
+            self.assertEqual(len(load_rule_templates(self.rules, cache_dir)), 2)
+
+    def test_load_from_file(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for _ in range(2):
+                context = Context()
+                context.load_from_file("./config/family.ini", cache_dir=cache_dir)
+                self.assertTrue(RuleEngine(context).run())
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
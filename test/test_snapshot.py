@@ -0,0 +1,153 @@
+import copy
+import os
+import tempfile
+
+from elements.fact import Fact
+from elements.predicate import Predicate
+from engine import RuleEngine
+from context import Context
+from elements.rule import RuleTemplate
+from snapshot import Snapshot
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestSnapshot(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    rule_templates = [
+        RuleTemplate.parse_rule_template("rule1:parent(A,B) and parent(B,C) => add:grand_parent(A,C)"),
+        RuleTemplate.parse_rule_template("rule2:grand_parent(A,B) and not man(A) => add:grand_mother(A,B)"),
+    ]
+
+    def _get_context(self) -> Context:
+        context = Context()
+        context.rule_templates = copy.deepcopy(self.rule_templates)
+        context.set_facts([Fact.parse(f"parent('p{i}','p{i + 1}')") for i in range(8)] +
+                          [Fact.parse("man('p0')"), Fact.parse("flag()"), Fact.parse("parent('p0')")])
+        context.goal = Fact.parse("grand_mother('p1','p3')")
+        return context
+
+    def _get_file_path(self) -> str:
+        file_descriptor, file_path = tempfile.mkstemp(suffix=".snapshot")
+        os.close(file_descriptor)
+        self.addCleanup(os.remove, file_path)
+        return file_path
+
+    def test_restore_snapshot(self):
+        context = self._get_context()
+        self.assertTrue(RuleEngine(context).run())
+        file_path = self._get_file_path()
+        context.save_snapshot(file_path)
+
+        restored_context = Context()
+        restored_context.rule_templates = copy.deepcopy(self.rule_templates)
+        restored_context.restore_snapshot(file_path)
+        self.assertEqual(restored_context.facts, context.facts)
+        self.assertEqual(restored_context.goal, context.goal)
+        for name, facts in context.facts_by_name.items():
+            self.assertEqual(list(restored_context.facts_by_name[name]), list(facts))
+        self.assertEqual(len(restored_context.get_matching_facts(Predicate.parse("parent('p3',X)"))), 1)
+        for rule_template, restored_rule_template in zip(context.rule_templates, restored_context.rule_templates):
+            self.assertEqual({satisfied_rule.rule for satisfied_rule in restored_rule_template.satisfied_rules},
+                             {satisfied_rule.rule for satisfied_rule in rule_template.satisfied_rules})
+
+        # nothing is fired again, and only the new facts are matched
+        engine = RuleEngine(restored_context)
+        self.assertEqual(list(engine.run_until_quiescent()), [])
+        engine.assert_facts([Fact.parse("parent('p8','p9')")])
+        self.assertEqual([firing.satisfied_rule.rule for firing in engine.run_until_quiescent()],
+                         ["rule1:parent('p7','p8') and parent('p8','p9') => add:grand_parent('p7','p9')",
+                          "rule2:grand_parent('p7','p9') and not man('p7') => add:grand_mother('p7','p9')"])
+
+        # another ruleset can't use the satisfied rules
+        other_context = Context()
+        other_context.rule_templates = copy.deepcopy(self.rule_templates[:1])
+        self.assertRaises(Exception, other_context.restore_snapshot, file_path)
+
+    def test_remove_actions(self):
+        # the "move" rule removes one of its own facts: its satisfied rules aren't part of the snapshot
+        rule_templates = [RuleTemplate.parse_rule_template(
+            "move:current_position(X) and connection(X,Y) => remove:current_position(X), add:current_position(Y)")]
+        context = Context()
+        context.rule_templates = copy.deepcopy(rule_templates)
+        context.set_facts([Fact.parse("connection('R1','R2')"), Fact.parse("connection('R2','R3')"),
+                           Fact.parse("current_position('R1')")])
+        context.goal = Fact.parse("current_position('R3')")
+        self.assertTrue(RuleEngine(context).run())
+        file_path = self._get_file_path()
+        context.save_snapshot(file_path)
+
+        restored_context = Context()
+        restored_context.rule_templates = copy.deepcopy(rule_templates)
+        restored_context.restore_snapshot(file_path)
+        self.assertEqual(restored_context.facts, context.facts)
+        self.assertEqual(restored_context.rule_templates[0].satisfied_rules, set())
+        engine = RuleEngine(restored_context)
+        engine.assert_facts([Fact.parse("connection('R3','R4')")])
+        self.assertEqual([firing.satisfied_rule.rule for firing in engine.run_until_quiescent()],
+                         ["move:current_position('R3') and connection('R3','R4') => remove:current_position('R3'), "
+                          "add:current_position('R4')"])
+
+    def test_restore_used_context(self):
+        context = self._get_context()
+        RuleEngine(context).run()
+        file_path = self._get_file_path()
+        context.save_snapshot(file_path)
+
+        used_context = Context()
+        used_context.rule_templates = copy.deepcopy(self.rule_templates)
+        used_context.set_facts([Fact.parse(f"parent('q{i}','q{i + 1}')") for i in range(4)])
+        RuleEngine(used_context).run()
+        # the agenda of the engine is still listening to the context
+        self.assertRaises(Exception, used_context.restore_snapshot, file_path)
+        used_context.fact_listeners = []
+        used_context.restore_snapshot(file_path)
+        self.assertEqual(used_context.facts, context.facts)
+        # the satisfied rules of the previous facts are gone
+        for rule_template, restored_rule_template in zip(context.rule_templates, used_context.rule_templates):
+            self.assertEqual({satisfied_rule.rule for satisfied_rule in restored_rule_template.satisfied_rules},
+                             {satisfied_rule.rule for satisfied_rule in rule_template.satisfied_rules})
+        engine = RuleEngine(used_context)
+        self.assertEqual(list(engine.run_until_quiescent()), [])
+        # the facts of the previous knowledge base fire the rules again
+        engine.assert_facts([Fact.parse("parent('q0','q1')"), Fact.parse("parent('q1','q2')")])
+        self.assertEqual([firing.satisfied_rule.name for firing in engine.run_until_quiescent()], ["rule1", "rule2"])
+
+    def test_query_snapshot(self):
+        context = self._get_context()
+        RuleEngine(context).run()
+        file_path = self._get_file_path()
+        context.save_snapshot(file_path)
+        with Snapshot(file_path) as snapshot:
+            self.assertEqual(len(snapshot), len(context.facts))
+            self.assertEqual(set(snapshot.facts()), context.facts)
+            self.assertEqual(list(snapshot.get_matching_facts(Predicate.parse("grand_parent('p2',X)"))),
+                             [Fact.parse("grand_parent('p2','p4')")])
+            self.assertEqual(list(snapshot.get_matching_facts(Predicate.parse("grand_parent(X,'p4')"))),
+                             [Fact.parse("grand_parent('p2','p4')")])
+            self.assertEqual(list(snapshot.get_matching_facts(Predicate.parse("parent('p0')"))),
+                             [Fact.parse("parent('p0')")])
+            self.assertEqual(len(list(snapshot.get_matching_facts(Predicate.parse("grand_mother(X,Y)")))), 6)
+            self.assertEqual(list(snapshot.get_matching_facts(Predicate.parse("parent('unknown',X)"))), [])
+            self.assertEqual(list(snapshot.get_matching_facts(Predicate.parse("flag()"))), [Fact.parse("flag()")])
+
+        with open(file_path, 'wb') as file:
+            file.write(b"not a snapshot file")
+        self.assertRaises(Exception, Snapshot, file_path)
+
+    def test(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
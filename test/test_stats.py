@@ -0,0 +1,82 @@
+import json
+
+from context import Context
+from elements.fact import Fact
+from elements.rule import RuleTemplate
+from engine import RuleEngine
+from functions_handler import register_function
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+@register_function()
+def stats_test_function(rule_name: str, *args):
+    pass
+
+
+class TestStats(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    @staticmethod
+    def _get_context() -> Context:
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in [
+            "rule1:parent(A,B) and parent(B,C) => add:grand_parent(A,C)",
+            "rule2:grand_parent(A,B) and not man(A) => add:grand_mother(A,B), function:stats_test_function(A)",
+            "rule3:man(A) and grand_mother(A,B) => remove:man(A)",
+        ]]
+        context.set_facts([Fact.parse(fact) for fact in [
+            "parent('sophia','john')", "parent('george','john')", "parent('john','larry')", "parent('larry','tom')",
+            "man('george')"]])
+        return context
+
+    def test_stats(self):
+        for use_rete in [False, True]:
+            engine = RuleEngine(self._get_context(), use_rete, collect_stats=True)
+            engine.run()
+            stats = {rule_stats.name: rule_stats for rule_stats in engine.stats().get_sorted()}
+            self.assertEqual(["rule1", "rule2", "rule3"], sorted(stats))
+            self.assertEqual((3, 3, 0), (stats["rule1"].firings, stats["rule1"].added_facts,
+                                         stats["rule1"].removed_facts))
+            self.assertEqual((2, 2), (stats["rule2"].firings, stats["rule2"].added_facts))
+            self.assertEqual(0, stats["rule3"].firings)
+            self.assertGreater(stats["rule2"].callbacks_time, 0)
+            self.assertEqual(0, stats["rule1"].callbacks_time)
+            if not use_rete:
+                # the matching counters are collected by the Evaluator
+                self.assertEqual(3, stats["rule1"].candidates)
+                self.assertEqual(3, stats["rule1"].satisfied_rules)
+                self.assertEqual(3, stats["rule2"].candidates)
+                self.assertEqual(2, stats["rule2"].satisfied_rules)
+                self.assertGreater(stats["rule1"].matching_time, 0)
+
+    def test_report(self):
+        engine = RuleEngine(self._get_context(), collect_stats=True)
+        engine.run()
+        report = json.loads(engine.stats().to_json(sort_by="firings"))
+        self.assertEqual(["rule1", "rule2", "rule3"], [rule_stats["name"] for rule_stats in report])
+        self.assertEqual(3, report[0]["firings"])
+        lines = engine.stats().to_text(sort_by="candidates", limit=2).splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[0].startswith("rule "))
+        self.assertTrue(lines[1].startswith("rule1 "))
+        with self.assertRaises(Exception):
+            engine.stats().get_sorted("unknown")
+
+    def test_stats_disabled(self):
+        engine = RuleEngine(self._get_context())
+        engine.run()
+        with self.assertRaises(Exception):
+            engine.stats()
+
+    def test(self):
+        pass
@@ -0,0 +1,89 @@
+from context import Context
+from elements.fact import Fact
+from elements.rule import RuleTemplate
+from engine import RuleEngine
+import logging
+
+import unittest  # https://docs.python.org/3/library/unittest.html
+
+
+class TestTruthMaintenance(unittest.TestCase):
+
+    # https://docs.python.org/3/library/unittest.html#unittest.TestCase.setUpClass
+    # Yes, for unittests, logging needs to be configured here
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(filename='test_logs.log',
+                            filemode="w",
+                            level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+
+    @staticmethod
+    def _get_engine(rules: list[str], facts: list[str], use_rete: bool = False) -> RuleEngine:
+        context = Context()
+        context.rule_templates = [RuleTemplate.parse_rule_template(rule) for rule in rules]
+        context.set_facts([Fact.parse(fact) for fact in facts])
+        return RuleEngine(context, use_rete, truth_maintenance=True)
+
+    def test_cascading_retraction(self):
+        for use_rete in [False, True]:
+            engine = self._get_engine(["rule1:parent(A,B) and parent(B,C) => add:grand_parent(A,C)",
+                                       "rule2:grand_parent(A,B) and not man(A) => add:grand_mother(A,B)",
+                                       "rule3:grand_mother(A,B) => add:has_grand_mother(B)"],
+                                      ["parent('sophia','john')", "parent('john','larry')"], use_rete)
+            engine.run()
+            self.assertIn(Fact.parse("has_grand_mother('larry')"), engine.context.facts)
+            self.assertTrue(engine.truth_maintenance.is_derived(Fact.parse("grand_parent('sophia','larry')")))
+            self.assertFalse(engine.truth_maintenance.is_derived(Fact.parse("parent('john','larry')")))
+            # removing a base fact removes the facts derived from it
+            engine.retract_facts([Fact.parse("parent('john','larry')")])
+            self.assertEqual({Fact.parse("parent('sophia','john')")}, engine.context.facts)
+            # ... which are derived again when the fact is added again
+            engine.assert_facts([Fact.parse("parent('john','larry')")])
+            engine.run()
+            self.assertEqual(5, len(engine.context.facts))
+            # adding a fact used by a negation removes the facts derived from that negation
+            engine.assert_facts([Fact.parse("man('sophia')")])
+            self.assertNotIn(Fact.parse("grand_mother('sophia','larry')"), engine.context.facts)
+            self.assertNotIn(Fact.parse("has_grand_mother('larry')"), engine.context.facts)
+            self.assertIn(Fact.parse("grand_parent('sophia','larry')"), engine.context.facts)
+
+    def test_several_justifications(self):
+        engine = self._get_engine(["rule1:parent(A,B) => add:person(A), add:person(B)",
+                                   "rule2:edge(A,B) => add:path(A,B)",
+                                   "rule3:path(A,B) and edge(B,C) => add:path(A,C)"],
+                                  ["parent('a','b')", "parent('b','c')", "edge('a','b')", "edge('b','a')",
+                                   "edge('b','c')"])
+        engine.run()
+        # person('b') is still justified by parent('b','c')
+        engine.retract_facts([Fact.parse("parent('a','b')")])
+        self.assertNotIn(Fact.parse("person('a')"), engine.context.facts)
+        self.assertIn(Fact.parse("person('b')"), engine.context.facts)
+        self.assertEqual(2, len(engine.truth_maintenance.get_justifications(Fact.parse("path('a','b')"))))
+        # the paths that justify each other (through the a <-> b cycle) are removed too
+        engine.retract_facts([Fact.parse("edge('a','b')")])
+        engine.run()
+        self.assertEqual({"path('b','a')", "path('b','c')"},
+                         {fact.to_string() for fact in engine.context.facts if fact.name == "path"})
+
+    def test_state_changes(self):
+        # the facts added by a rule that removes its own facts are not justified (like config/maze.ini)
+        engine = self._get_engine(
+            ["move:current_position(X) and connection(X,Y) => remove:current_position(X), add:current_position(Y)"],
+            ["connection('R1','R2')", "connection('R2','R3')", "current_position('R1')"])
+        engine.run()
+        self.assertEqual({Fact.parse("connection('R1','R2')"), Fact.parse("connection('R2','R3')"),
+                          Fact.parse("current_position('R3')")}, engine.context.facts)
+        engine.retract_facts([Fact.parse("connection('R1','R2')")])
+        self.assertIn(Fact.parse("current_position('R3')"), engine.context.facts)
+
+    def test_asserted_derived_fact(self):
+        engine = self._get_engine(["rule1:op1(X) => add:op2(X)"], ["op1('a')"])
+        engine.run()
+        # a derived fact that is asserted is a base fact
+        engine.assert_facts([Fact.parse("op2('a')")])
+        engine.retract_facts([Fact.parse("op1('a')")])
+        self.assertEqual({Fact.parse("op2('a')")}, engine.context.facts)
+
+    def test(self):
+        pass